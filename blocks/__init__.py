@@ -3,16 +3,48 @@ __all__ = ['aesECB',
            'aesCFB', 
            'aesOFB', 
            'aesCTR', 
+           'aesGCM',
+           'aesXTS',
+           'aesTable',
+           'backends',
            'padding', 
            'xor', 
-           'chunk']
+           'chunk',
+           'cache',
+           'keystream',
+           'ghash',
+           'parallel',
+           'stream',
+           'fileio',
+           'batch',
+           'multistream',
+           'cmac',
+           'base',
+           'compat',
+           'instrument']
 
 from blocks import aesECB
 from blocks import aesCBC
 from blocks import aesCFB
 from blocks import aesOFB
 from blocks import aesCTR
+from blocks import aesGCM
+from blocks import aesXTS
+from blocks import aesTable
+from blocks import backends
 from blocks import padding
 from blocks import xor
 from blocks import chunk
+from blocks import cache
+from blocks import keystream
+from blocks import ghash
+from blocks import parallel
+from blocks import stream
+from blocks import fileio
+from blocks import batch
+from blocks import multistream
+from blocks import cmac
+from blocks import base
+from blocks import compat
+from blocks import instrument
 
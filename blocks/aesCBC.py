@@ -1,168 +1,183 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from chunk import chunkData
-from padding import padData
-from xor import xorData
+from .base import blockMode
+from .batch import batchResult, offsetsOf
+from .multistream import CBCMultiStream
+from .stream import CBCEncryptStream, CBCDecryptStream
+from .chunk import blockView
+from .compat import byteView
+from .xor import xorData
 
 
-class CBCMode(object):
+class CBCMode(blockMode):
     '''
     This class is used to implment CBC mode using python cryptography. The
-    chunkData, padData, and xorData are custom classes that are used to build
-    functionality that python cryptography would normally handle in the
-    backend. Educational purposes only.
+    blockView and xorData classes and the padding schemes are custom code
+    used to build functionality that python cryptography would
+    normally handle in the backend. Educational purposes only.
+
+    The padding, block handling and batching are done by blockMode, see
+    blocks/base.py. The kernel chains the blocks to the IV.
     '''
-    def __init__(self, key, iv):
+    modeName = 'cbc'
+    encryptStream = CBCEncryptStream
+    decryptStream = CBCDecryptStream
+
+    def __init__(self, key, iv, padding='pkcs7', backend='cryptography'):
         '''
-        This constructor initilizes the key and initialization vector. The key
-        and the IV should be the same length, either 16, 24, or 32 bytes long.
+        This constructor initilizes the key, initialization vector and padding
+        scheme. The key can be 16, 24, or 32 bytes long. The IV is one AES
+        block, 16 bytes. padding is a name from blocks/padding.py
+        paddingSchemes: pkcs7, x923, iso7816, zero, none or cts (ciphertext
+        stealing). backend is a name from blocks/backends.py: cryptography,
+        native, numpy or auto.
         '''
         self.key = key
         self.iv = iv
+        self.padding = padding
+        self.backend = backend
 
-    # Input validation for the key
-    @property
-    def key(self):
-        return self._key
-
-    @key.setter
-    def key(self, key):
-        if (len(key) not in [16, 24, 32]):
-            raise Exception('The key must be 16, 24, or 32 bytes long.')
-        self._key = key
-
-    # Input validation for the IV
-    @property
-    def iv(self):
-        return self._iv
-
-    @iv.setter
-    def iv(self, iv):
-        if (len(iv) not in [16, 24, 32]):
-            raise Exception('The iv must be 16, 24, or 32 bytes long.')
-        self._iv = iv
-
-    def pad(self, data):
-        '''
-        This constructor takes in the string that needs to be padded.
-        Calls the custom pad class in the block/padding.py and returns the
-        padded string.
-        '''
-        padding = padData(data)
-        paddedData = padding.padString()
-        return paddedData
-
-    def unPad(self, data):
-        '''
-        This constructor takes in the padded string that needs to be unpadded
-        by the reciever of the message.
-        '''
-        try:
-            unPadding = padData(data)
-            unPaddedData = unPadding.unPadString()
-            return unPaddedData
-        except ValueError:
-            return data
-
-    def preProcess(self, data):
-        '''
-        The preProcess constructor takes the plaintext. Then pads and chunks if
-        needed. Returns a list.
-        '''
-        if (len(data) == 0):
-            raise ValueError('Plaintext string can not be empty')
-        elif (len(data) < 16):
-            paddedList = [self.pad(data)]
-            return paddedList
-        elif (len(data) == 16):
-            dataList = [data]
-            return dataList
-        elif(len(data) % 16 == 0):
-            divList = chunkData(data)
-            return divList.getChunk()
-        else:
-            chunk = chunkData(data)
-            chunkedData = chunk.getChunk()
-            shortBlock = self.pad(chunkedData.pop(-1))
-            chunkedData.append(shortBlock)
-            return chunkedData
-
-    def postProcess(self, data):
-        '''
-        The postProcess constructor is used to validate and chunk the
-        ciphertext. Returns a list.
-        '''
-        if (len(data) == 0 or len(data) < 16):
-            raise ValueError('Invalid ciphertext byte length.')
-        else:
-            chunk = chunkData(data)
-            return chunk.getChunk()
-
-    def encrypt(self, plaintext):
-        '''
-        This encrypt constructor takes the plaintext string, sends it to the
-        preProcess class to be padded and chunked. The blocks are then
-        encrypted using python cryptography library ECB mode. The chaining
-        of ciphertexts is done manually.
-        '''
-        # Send the plaintext string to be padded and chunked
-        plaintext = self.preProcess(plaintext)
-
-        # Initilize the python cryptography ECB mode
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        encryptor = cipher.encryptor()
-        
-        # Loop through the elements, special treatment for block 1
+    def encryptBlocks(self, blocks):
+        '''
+        The encryptBlocks constructor chains and encrypts the blocks of a
+        blockView. Block 1 is xored with the IV, every other block with the
+        ciphertext block before it, then encrypted using python cryptography
+        library ECB mode. A backend running CBC itself gets the slabs.
+        '''
+        context = self.nativeContext('encrypt')
+        if (context is not None):
+            return [context.update(slab)
+                    for slab in blocks.slabs(self.slabSize // 16)]
+
+        # Fetch the cached ECB mode context of the backend
+        encryptor = self.getEncryptor()
+
+        # Loop through the blocks, block 1 is chained to the IV
         # https://en.wikipedia.org/wiki/Block_cipher_mode_of_operation
         ciphertextList = []
-        for i in range(0, len(plaintext)):
-            if (i == 0):
-                xor = xorData(self.iv, plaintext[i])
-                initialXor = xor.getXor() 
-                firstElement = encryptor.update(initialXor)
-                ciphertextList.append(firstElement)
-            elif (i >= 1):
-                xor = xorData(ciphertextList[i-1], plaintext[i])
-                nElementXor = xor.getXor()
-                nEncryption = encryptor.update(nElementXor)
-                ciphertextList.append(nEncryption)
-        return ''.join(ciphertextList)
-
-    def decrypt(self, ciphertext):
-        '''
-        This decrypt constructor takes the ciphertext string, sends it to the
-        postProcess class to be chunked. The blocks are sent to the python
-        cryptography ECB mode for decryption. The first block is then xored
-        with the IV. The remaining blocks are xored with the previous
-        ciphertext in the list. The last element in the plaintextList is
-        then unpadded.
-        '''
-        # Send the ciphertext string to be chunked
-        ciphertext = self.postProcess(ciphertext)
-        
-        # Initilize the python cryptography ECB mode
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        decryptor = cipher.decryptor()
-        
-        # Loop through the ciphertext list, special treatment for block 1
-        plaintextList = []
-        for i in range(0, len(ciphertext)):
-            if (i == 0):
-                firstElement = decryptor.update(ciphertext[i])
-                xor = xorData(self.iv, firstElement)
-                firstPlaintext = xor.getXor()
-                plaintextList.append(firstPlaintext)
-            elif (i >= 1):
-                nElement = decryptor.update(ciphertext[i])
-                xor = xorData(ciphertext[i-1], nElement)
-                nPlaintext = xor.getXor()
-                plaintextList.append(nPlaintext)
-        paddedElement = self.unPad(plaintextList.pop(-1))
-        plaintextList.append(paddedElement)
-        return ''.join(plaintextList)
+        previous = self.iv
+        for block in blocks:
+            xor = xorData(previous, block)
+            previous = encryptor.update(xor.getXor())
+            ciphertextList.append(previous)
+        return ciphertextList
+
+    def decryptSlabs(self, ciphertext, start, end):
+        '''
+        The decryptSlabs constructor yields the plaintext of the blocks of
+        ciphertext between the block aligned byte offsets start and end, a
+        slab of slabSize bytes at a time. Plaintext block i only needs
+        ciphertext blocks i and i-1, so each slab is decrypted with one
+        backend call and xored with a view of the ciphertext shifted by one
+        block (the IV for the first block of the message). Only one slab of
+        output is held at a time.
+        '''
+        view = byteView(ciphertext)
+
+        # Fetch the cached ECB mode context of the backend
+        decryptor = self.getDecryptor()
+        slabBytes = max(16, self.slabSize // 16 * 16)
+        for slabStart in range(start, end, slabBytes):
+            slabEnd = min(end, slabStart + slabBytes)
+            decrypted = decryptor.update(view[slabStart:slabEnd])
+
+            # The previous ciphertext block for every block in the slab
+            if (slabStart == 0):
+                previous = self.iv + view[:slabEnd - 16].tobytes()
+            else:
+                previous = view[slabStart - 16:slabEnd - 16]
+            yield xorData(decrypted, previous).getXor()
+
+    def decryptSegment(self, ciphertext, start, end):
+        '''
+        The decryptSegment constructor returns the plaintext of the blocks of
+        ciphertext between the block aligned byte offsets start and end, see
+        decryptSlabs.
+        '''
+        return b''.join(self.decryptSlabs(ciphertext, start, end))
+
+    def decryptBlocks(self, blocks):
+        '''
+        The decryptBlocks constructor decrypts the blocks slab by slab with
+        decryptSlabs, or hands the slabs to a backend running CBC itself.
+        '''
+        context = self.nativeContext('decrypt')
+        if (context is not None):
+            return [context.update(slab)
+                    for slab in blocks.slabs(self.slabSize // 16)]
+        return list(self.decryptSlabs(blocks.view, 0, len(blocks.view)))
+
+    def encryptStealing(self, plaintext):
+        '''
+        The encryptStealing constructor encrypts a plaintext that ends in a
+        short block with ciphertext stealing (CBC-CS2). The short block is
+        padded with zero bytes and the message is chained as usual. The last
+        two ciphertext blocks are then swapped, and the one that moves to
+        the end is cut down to the length of the short block.
+        '''
+        view = byteView(plaintext)
+        if (len(view) < 16):
+            raise ValueError('Ciphertext stealing needs at least one block.')
+        split = len(view) - len(view) % 16
+        tail = view[split:].tobytes()
+        ciphertext = b''.join(self.encryptBlocks(blockView(view[:split],
+                tail + b'\x00' * (16 - len(tail)))))
+        return (ciphertext[:split - 16] + ciphertext[split:] +
+                ciphertext[split - 16:split - 16 + len(tail)])
+
+    def decryptStealing(self, ciphertext):
+        '''
+        The decryptStealing constructor reverses encryptStealing. The last
+        whole ciphertext block decrypts to the short plaintext block xored
+        with the zero padded ciphertext before it, so the decryption also
+        gives back the bytes that were cut from that block. The plain CBC
+        ciphertext is rebuilt and decrypted in one batch.
+        '''
+        view = byteView(ciphertext)
+        if (len(view) < 16):
+            raise ValueError('Invalid ciphertext byte length.')
+        split = len(view) - len(view) % 16
+        tail = view[split:].tobytes()
+
+        # Fetch the cached ECB mode context of the backend
+        decryptor = self.getDecryptor()
+        last = view[split - 16:split].tobytes()
+        decrypted = decryptor.update(last)
+        rebuilt = (view[:split - 16].tobytes() + tail +
+                decrypted[len(tail):] + last)
+        plaintext = self.decryptSegment(rebuilt, 0, len(rebuilt))
+        return plaintext[:len(view)]
+
+    def encryptMany(self, buffer, lengths, ivs):
+        '''
+        The encryptMany constructor encrypts padded messages packed into one
+        buffer, each chained from its own IV. The chains advance in lockstep
+        with one backend call per block position, see blocks/multistream.py.
+        '''
+        offsets = offsetsOf(lengths)
+        buffers = [buffer[start:end] for start, end in offsets]
+        multiStream = CBCMultiStream(self.key, ivs,
+                backend=self.backendName())
+        ciphertexts = multiStream.encryptBlocks(buffers)
+        return batchResult(b''.join(ciphertexts), offsets)
+
+    def decryptMany(self, buffer, lengths, ivs):
+        '''
+        The decryptMany constructor decrypts ciphertexts packed into one
+        buffer, each chained from its own IV. Every ciphertext block only
+        needs the block before it, so the whole batch is decrypted with one
+        backend call and xored with the previous blocks in one pass.
+        '''
+        offsets = offsetsOf(lengths)
+        if (len(buffer) == 0):
+            return batchResult(b'', offsets)
+
+        # Fetch the cached ECB mode context of the backend
+        decryptor = self.getDecryptor()
+        decrypted = decryptor.update(buffer)
+
+        # The previous ciphertext block for every block of every message
+        previous = b''.join([iv + buffer[start:end - 16]
+            for (start, end), iv in zip(offsets, ivs)])
+        xor = xorData(decrypted, previous)
+        return batchResult(xor.getXor(), offsets)
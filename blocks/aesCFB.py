@@ -1,101 +1,253 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from xor import xorData
+from .base import blockMode
+from .batch import batchResult, checkIvs, offsetsOf, packMessages
+from .chunk import blockView
+from .compat import asBytes, byteView, writeInto
+from .padding import getPadding
+from .stream import CFBStream, CFBDecryptStream
+from .xor import xorData
 
 
-class CFBMode(object):
+class CFBMode(blockMode):
     '''
-    This class is used to implment CFB8 mode using python cryptography. The
+    This class is used to implment CFB mode using python cryptography. The
     base encryption library function used is ECB mode. Specific block function
     is done manually. Educational purposes only.
+
+    The segment size is given in bits, a multiple of 8 up to 128. The default
+    of 8 is CFB8, which makes one AES call per byte. CFB128 makes one AES call
+    per block, see CFB128Mode.
+
+    The key, IV, backend context, stream and asyncio handling come from
+    blockMode, see blocks/base.py. CFB works on segments rather than padded
+    blocks, so it supplies its own encrypt, decrypt, encrypt_into,
+    decrypt_into and batch calls.
     '''
-    def __init__(self, key, iv):
+    # Number of segments decrypted with one backend call
+    batchSegments = 4096
+    blockAligned = False
+    modeName = 'cfb'
+    encryptStream = CFBStream
+    decryptStream = CFBDecryptStream
+    # CFB never pads
+    padding = getPadding('none')
+
+    def __init__(self, key, iv, segmentSize=8, backend='cryptography'):
         '''
         This constructor initilizes the key and initialization vector. The key
-        and the IV should be the same length, either 16, 24, or 32 bytes long.
+        can be 16, 24, or 32 bytes long. The IV is one AES block, 16 bytes.
+        segmentSize is the number of bits fed back per AES call. backend is
+        a name from blocks/backends.py: cryptography, native, numpy or auto.
         '''
         self.key = key
         self.iv = iv
+        self.segmentSize = segmentSize
+        self.backend = backend
 
-    # Input validation for the key
+    # Input validation for the segment size
     @property
-    def key(self):
-        return self._key
+    def segmentSize(self):
+        return self._segmentSize
 
-    @key.setter
-    def key(self, key):
-        if (len(key) not in [16, 24, 32]):
-            raise Exception('The key must be 16, 24, or 32 bytes long.')
-        self._key = key
+    @segmentSize.setter
+    def segmentSize(self, segmentSize):
+        if (segmentSize not in range(8, 136, 8)):
+            raise ValueError('The segment size must be 8 to 128 bits, in '
+                             'steps of 8.')
+        self._segmentSize = segmentSize
 
-    # Input validation for the IV
-    @property
-    def iv(self):
-        return self._iv
+    def encryptSegments(self, register, plaintext):
+        '''
+        The encryptSegments constructor encrypts the plaintext a segment at a
+        time starting from the 16 byte shift register. Each ciphertext
+        segment is shifted into the register before the next AES call, so
+        encryption is serial. A short last segment uses the front of its
+        keystream block. Returns the ciphertext and the new register.
+        '''
+        # Fetch the cached ECB mode context of the backend
+        encryptor = self.getEncryptor()
+
+        segmentBytes = self.segmentSize // 8
+        ciphertextList = []
+        # Loop through the plaintext segments, return ciphertext string
+        for i in range(0, len(plaintext), segmentBytes):
+            segment = plaintext[i:i + segmentBytes]
+            outputBlock = encryptor.update(register)
+            xor = xorData(segment, outputBlock)
+            ciphertextSegment = xor.getXor()
+            ciphertextList.append(ciphertextSegment)
+            register = (register + ciphertextSegment)[-16:]
+        return b''.join(ciphertextList), register
+
+    def segmentRegisters(self, register, ciphertext):
+        '''
+        The segmentRegisters constructor returns the shift register value for
+        every segment of the ciphertext, joined. Each one is a 16 byte window
+        over the starting register followed by the ciphertext.
+        '''
+        segmentBytes = self.segmentSize // 8
+        count = -(-len(ciphertext) // segmentBytes)
+        source = register + ciphertext
+        if (segmentBytes == 16):
+            return source[:16 * count]
+        return b''.join([source[i:i + 16] for i in
+            range(0, count * segmentBytes, segmentBytes)])
 
-    @iv.setter
-    def iv(self, iv):
-        if (len(iv) not in [16, 24, 32]):
-            raise Exception('The iv must be 16, 24, or 32 bytes long.')
-        self._iv = iv
+    def segmentKeystream(self, outputBlocks):
+        '''
+        The segmentKeystream constructor returns the keystream held in the
+        encrypted shift registers, the front segment of every block.
+        '''
+        segmentBytes = self.segmentSize // 8
+        if (segmentBytes == 16):
+            return outputBlocks
+        return b''.join([outputBlocks[i:i + segmentBytes] for i in
+            range(0, len(outputBlocks), 16)])
+
+    def decryptSegments(self, register, ciphertext):
+        '''
+        The decryptSegments constructor decrypts the ciphertext starting from
+        the 16 byte shift register. Every register value is a window over the
+        register and the known ciphertext, so batchSegments registers are
+        built at once and encrypted with one backend call. Returns the
+        plaintext and the new register.
+        '''
+        # Fetch the cached ECB mode context of the backend
+        # CFB uses encryption algorithm for decryption
+        encryptor = self.getEncryptor()
+
+        batchBytes = self.batchSegments * (self.segmentSize // 8)
+        plaintextList = []
+        for start in range(0, len(ciphertext), batchBytes):
+            batch = ciphertext[start:start + batchBytes]
+            outputBlocks = encryptor.update(
+                self.segmentRegisters(register, batch))
+            xor = xorData(batch, self.segmentKeystream(outputBlocks))
+            plaintextList.append(xor.getXor())
+            register = (register + batch)[-16:]
+        return b''.join(plaintextList), register
 
     def encrypt(self, plaintext):
         '''
         This encrypt constructor takes the plaintext string, and loops through
-        it encrypting using a 8 bit shift register.
+        it encrypting a segment at a time through the shift register. A
+        backend running CFB8 or CFB128 itself gets the whole plaintext.
         Note: CFB does not use padding.
         '''
-        # Initilize the python cryptography ECB mode
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        encryptor = cipher.encryptor()
-
-        ciphertextList = []
-        # Loop through the plaintext elements, return ciphertext string
-        for i in range(0, len(plaintext)):
-            if (i == 0):
-                outputBlock = encryptor.update(self.iv)
-                xor = xorData(outputBlock[0], plaintext[i])
-                firstCiphertextByte = xor.getXor()
-                ciphertextList.append(firstCiphertextByte)
-                sbitShift = self.iv[1:] + ciphertextList[i]
-            elif (i >= 1):
-                nBlock = encryptor.update(sbitShift)
-                xor = xorData(nBlock[0], plaintext[i])
-                nCiphertextByte = xor.getXor()
-                ciphertextList.append(nCiphertextByte)
-                sbitShift = sbitShift[1:] + ciphertextList[i]
-        return ''.join(ciphertextList)
+        plaintext = byteView(plaintext)
+        if (len(plaintext) == 0):
+            return b''
+        context = self.nativeContext('encrypt')
+        if (context is not None):
+            return context.update(plaintext)
+        return self.encryptSegments(self.iv, plaintext)[0]
 
     def decrypt(self, ciphertext):
         '''
-        This decrypt constructor takes the ciphertext string, loops through
-        decrypting using a 8 bit shift register.
+        This decrypt constructor takes the ciphertext string and decrypts it
+        in batches, see decryptSegments, or hands it to a backend running
+        CFB8 or CFB128 itself.
         Note: CFB does not use padding.
         '''
-        # Initilize the python cryptography ECB mode
-        # CFB uses encryption algorithm for decryption
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        encryptor = cipher.encryptor()
+        ciphertext = byteView(ciphertext)
+        if (len(ciphertext) == 0):
+            return b''
+        context = self.nativeContext('decrypt')
+        if (context is not None):
+            return context.update(ciphertext)
+        # The registers are windows over the ciphertext, joined as bytes
+        return self.decryptSegments(self.iv, asBytes(ciphertext))[0]
 
-        plaintextList = []
-        # Loop through the ciphertext list, return plaintext string
-        for i in range(0, len(ciphertext)):
-            if (i == 0):
-                outputBlock = encryptor.update(self.iv)
-                xor = xorData(outputBlock[0], ciphertext[i])
-                firstPlaintextByte = xor.getXor()
-                plaintextList.append(firstPlaintextByte)
-                sbitShift = self.iv[1:] + ciphertext[i]
-            elif (i >= 1):
-                nBlock = encryptor.update(sbitShift)
-                xor = xorData(nBlock[0], ciphertext[i])
-                nPlaintextByte = xor.getXor()
-                plaintextList.append(nPlaintextByte)
-                sbitShift = sbitShift[1:] + ciphertext[i]
-        return ''.join(plaintextList)
+    def encrypt_into(self, plaintext, output):
+        '''
+        The encrypt_into constructor writes the ciphertext of encrypt into the
+        caller supplied bytearray output. Returns the number of bytes
+        written.
+        '''
+        return writeInto([self.encrypt(plaintext)], output)
+
+    def decrypt_into(self, ciphertext, output):
+        '''
+        The decrypt_into constructor writes the plaintext of decrypt into the
+        caller supplied bytearray output. Returns the number of bytes
+        written.
+        '''
+        return writeInto([self.decrypt(ciphertext)], output)
+
+    def encrypt_many(self, messages, ivs=None):
+        '''
+        The encrypt_many constructor encrypts a sequence of independent
+        messages, each from its own IV (the IV of the mode when ivs is None).
+        The shift registers of all messages advance in lockstep, each round
+        encrypts the register of every message that still has a segment left
+        with a single backend call. Returns a batchResult, see
+        blocks/batch.py.
+        Note: CFB does not use padding.
+        '''
+        ivs = checkIvs(self, messages, ivs)
+        messages = [byteView(message) for message in messages]
+
+        # Fetch the cached ECB mode context of the backend
+        encryptor = self.getEncryptor()
+        segmentBytes = self.segmentSize // 8
+        registers = list(ivs)
+        outputs = [[] for iv in ivs]
+        longest = max([len(message) for message in messages] or [0])
+        for start in range(0, longest, segmentBytes):
+            active = [i for i in range(0, len(messages))
+                      if len(messages[i]) > start]
+            outputBlocks = encryptor.update(
+                b''.join([registers[i] for i in active]))
+            for k in range(0, len(active)):
+                i = active[k]
+                segment = messages[i][start:start + segmentBytes]
+                xor = xorData(segment, outputBlocks[16 * k:16 * k + 16])
+                ciphertextSegment = xor.getXor()
+                outputs[i].append(ciphertextSegment)
+                registers[i] = (registers[i] + ciphertextSegment)[-16:]
+        return packMessages([b''.join(output) for output in outputs])
+
+    def decrypt_many(self, ciphertexts, ivs=None):
+        '''
+        The decrypt_many constructor decrypts a sequence of ciphertexts. The
+        shift registers of every message are known ciphertext, so the whole
+        batch is encrypted in one buffer, batchSegments registers per backend
+        call. Returns a batchResult.
+        '''
+        ivs = checkIvs(self, ciphertexts, ivs)
+        ciphertexts = [asBytes(ciphertext) for ciphertext in ciphertexts]
+        lengths = [len(ciphertext) for ciphertext in ciphertexts]
+        buffer = b''.join(ciphertexts)
+        if (len(buffer) == 0):
+            return batchResult(b'', offsetsOf(lengths))
+        registers = b''.join([self.segmentRegisters(iv, ciphertext)
+            for ciphertext, iv in zip(ciphertexts, ivs)])
+
+        # Fetch the cached ECB mode context of the backend
+        encryptor = self.getEncryptor()
+        outputList = self.cryptSlabs(encryptor, blockView(registers))
+        keystream = self.segmentKeystream(b''.join(outputList))
+
+        # A short last segment only uses the front of its keystream
+        segmentBytes = self.segmentSize // 8
+        keystreamList = []
+        segmentStart = 0
+        for length in lengths:
+            keystreamList.append(keystream[segmentStart:segmentStart + length])
+            segmentStart += -(-length // segmentBytes) * segmentBytes
+        xor = xorData(buffer, b''.join(keystreamList))
+        return batchResult(xor.getXor(), offsetsOf(lengths))
+
+
+class CFB128Mode(CFBMode):
+    '''
+    This class is used to implement CFB128, CFB mode with a full 16 byte
+    segment. Each AES call covers a whole block of the message.
+    '''
+    def __init__(self, key, iv, backend='cryptography'):
+        '''
+        This constructor initilizes the key and initialization vector like
+        CFBMode, with a 128 bit segment size.
+        '''
+        CFBMode.__init__(self, key, iv, 128, backend)
@@ -1,179 +1,132 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from chunk import chunkData
-from padding import padData
-from xor import xorData
+from .base import blockMode
+from .batch import batchResult, offsetsOf
+from .stream import CTRStream, CTRDecryptStream
+from .keystream import ctrKeystream
+from .chunk import blockView
+from .compat import byteView
+from .xor import xorData
 
 
-class CTRMode(object):
+class CTRMode(blockMode):
     '''
     This class is used to implment CTR mode using python cryptography. The
-    chunkData, padData, and xorData are custom classes that are used to build
-    functionality that python cryptography would normally handle in the
-    backend. Educational purposes only.
+    blockView and xorData classes and the padding schemes are custom code
+    used to build functionality that python cryptography would
+    normally handle in the backend. Educational purposes only.
+
+    The padding, block handling and batching are done by blockMode, see
+    blocks/base.py. The kernel xors the blocks with the keystream, built in
+    batches a slab at a time. Encryption and decryption are the same
+    operation.
+    Note: CTR does not normally use padding, see padding='none'. See issue
+    related to #12.
     '''
-    def __init__(self, key, iv):
+    blockAligned = False
+    modeName = 'ctr'
+    encryptStream = CTRStream
+    decryptStream = CTRDecryptStream
+
+    def __init__(self, key, iv, padding='pkcs7', backend='cryptography'):
         '''
-        This constructor initilizes the key and initialization vector. The key
-        and the IV should be the same length, either 16, 24, or 32 bytes long.
+        This constructor initilizes the key, initialization vector and padding
+        scheme. The key can be 16, 24, or 32 bytes long. The IV is one AES
+        block, 16 bytes. padding is a name from blocks/padding.py
+        paddingSchemes: pkcs7, x923, iso7816, zero or none, which keeps the
+        ciphertext the length of the plaintext. backend is a name from
+        blocks/backends.py: cryptography, native, numpy or auto.
         '''
         self.key = key
         self.iv = iv
+        self.padding = padding
+        self.backend = backend
 
-    # Input validation for the key
-    @property
-    def key(self):
-        return self._key
-
-    @key.setter
-    def key(self, key):
-        if (len(key) not in [16, 24, 32]):
-            raise Exception('The key must be 16, 24, or 32 bytes long.')
-        self._key = key
-
-    # Input validation for the IV
-    @property
-    def iv(self):
-        return self._iv
-
-    @iv.setter
-    def iv(self, iv):
-        if (len(iv) not in [16, 24, 32]):
-            raise Exception('The iv must be 16, 24, or 32 bytes long.')
-        self._iv = iv
-
-    def pad(self, data):
+    def keystream(self, offset, length):
         '''
-        This constructor takes in the string that needs to be padded.
-        Calls the custom pad class in the block/padding.py and returns the
-        padded string.
+        The keystream constructor returns length bytes of CTR keystream
+        starting at byte offset. The IV is used as a 128 bit big endian
+        counter, see blocks/keystream.py.
         '''
-        padding = padData(data)
-        paddedData = padding.padString()
-        return paddedData
+        generator = ctrKeystream(self.key, self.iv, backend=self.backendName())
+        return generator.getKeystream(offset, length)
 
-    def unPad(self, data):
+    def decryptRange(self, data, offset):
         '''
-        This constructor takes in the padded string that needs to be unpadded
-        by the reciever of the message.
+        The decryptRange constructor xors data with the keystream starting at
+        byte offset of the message. This decrypts any slice of a ciphertext
+        without touching the blocks before it. Padding is not removed. In CTR
+        encryption is the same operation.
         '''
-        try:
-            unPadding = padData(data)
-            unPaddedData = unPadding.unPadString()
-            return unPaddedData
-        except ValueError:
-            return data
+        data = byteView(data)
+        if (len(data) == 0):
+            return b''
+        xor = xorData(data, self.keystream(offset, len(data)))
+        return xor.getXor()
 
-    def preProcess(self, data):
+    def encryptBlocks(self, blocks):
         '''
-        The preProcess constructor takes the plaintext. Then pads and chunks if
-        needed. Returns a list.
+        The encryptBlocks constructor xors the blocks with the keystream a
+        slab at a time. A backend running CTR itself gets the slabs.
         '''
-        if (len(data) == 0):
-            raise ValueError('Plaintext string can not be empty')
-        elif (len(data) < 16):
-            paddedList = [self.pad(data)]
-            return paddedList
-        elif (len(data) == 16):
-            dataList = [data]
-            return dataList
-        elif(len(data) % 16 == 0):
-            divList = chunkData(data)
-            return divList.getChunk()
-        else:
-            chunk = chunkData(data)
-            chunkedData = chunk.getChunk()
-            shortBlock = self.pad(chunkedData.pop(-1))
-            chunkedData.append(shortBlock)
-            return chunkedData
-
-    def postProcess(self, data):
+        context = self.nativeContext('encrypt')
+        if (context is not None):
+            return [context.update(slab)
+                    for slab in blocks.slabs(self.slabSize // 16)]
+        outputList = []
+        offset = 0
+        for slab in blocks.slabs(self.slabSize // 16):
+            outputList.append(self.decryptRange(slab, offset))
+            offset += len(slab)
+        return outputList
+
+    def decryptBlocks(self, blocks):
         '''
-        The postProcess constructor is used to validate and chunk the
-        ciphertext. Returns a list.
+        The decryptBlocks constructor is encryptBlocks, in CTR encryption and
+        decryption are the same operation.
         '''
-        if (len(data) == 0 or len(data) < 16):
-            raise ValueError('Invalid ciphertext byte length.')
-        else:
-            chunk = chunkData(data)
-            return chunk.getChunk()
+        return self.encryptBlocks(blocks)
 
-    def encrypt(self, plaintext):
+    def cryptMany(self, buffer, lengths, ivs):
         '''
-        This encrypt constructor takes the plaintext string, sends it to the
-        preProcess class to be padded and chunked. The blocks are then
-        encrypted using python cryptography library ECB mode.
-        Note: CTR does not normally use padding. See issue related to #12.
+        The cryptMany constructor xors messages packed back to back in buffer
+        with their keystreams. The counter blocks of every message are built
+        into one buffer and encrypted in slabs. Returns a batchResult.
         '''
-        # Send the plaintext string to be padded and chunked
-        plaintext = self.preProcess(plaintext)
-
-        # Initilize the python cryptography ECB mode
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        encryptor = cipher.encryptor()
-
-        ciphertextList = []
-        # Loop through the plaintext elements, return ciphertext string
-        # NIST 800-38A first block does not get incremented with the counter
-        for i in range(0, len(plaintext)):
-            if (i == 0):
-                firstBlock = encryptor.update(self.iv)
-                xor = xorData(firstBlock, plaintext[i])
-                firstElement = xor.getXor()
-                ciphertextList.append(firstElement)
-            elif (i >= 1):
-                # There will be an error here if ord(preCount) > 256 
-                # Need to come up with a fix
-                preCount = self.iv[-1]
-                countElement = chr(ord(preCount) + i) 
-                count = self.iv[:-1] + str(countElement)
-                nBlock = encryptor.update(count)
-                xor = xorData(nBlock, plaintext[i])
-                nElement = xor.getXor()
-                ciphertextList.append(nElement)
-        return ''.join(ciphertextList)
-
-    def decrypt(self, ciphertext):
+        offsets = offsetsOf(lengths)
+        if (len(buffer) == 0):
+            return batchResult(b'', offsets)
+        counterList = []
+        for length, iv in zip(lengths, ivs):
+            generator = ctrKeystream(self.key, iv, backend=self.backendName())
+            counterList.append(generator.counterBlocks(0, -(-length // 16)))
+        counters = b''.join(counterList)
+
+        # Encrypt the counter blocks in slabs
+        keystream = b''.join(self.cryptSlabs(self.getEncryptor(),
+            blockView(counters)))
+
+        # A short last block only uses the front of its keystream block
+        if (len(keystream) != len(buffer)):
+            keystreamList = []
+            blockStart = 0
+            for length in lengths:
+                keystreamList.append(
+                    keystream[blockStart:blockStart + length])
+                blockStart += -(-length // 16) * 16
+            keystream = b''.join(keystreamList)
+        xor = xorData(buffer, keystream)
+        return batchResult(xor.getXor(), offsets)
+
+    def encryptMany(self, buffer, lengths, ivs):
         '''
-        This decrypt constructor takes the ciphertext string, sends it to the
-        postProcess class to be chunked. The blocks are sent to the python
-        cryptography ECB mode for encryption. In CTR, the decryption of the
-        blocks uses the encryption of the IV + counter and the key, xored with the
-        ciphertext to get the plaintext.
-        Note: CTR does not normally use padding. See issue related to #12.
+        The encryptMany constructor encrypts padded messages packed into one
+        buffer, each counting from its own IV, see cryptMany.
         '''
-        # Send the ciphertext string to be chunked
-        ciphertext = self.postProcess(ciphertext)
+        return self.cryptMany(buffer, lengths, ivs)
 
-        # Initilize the python cryptography ECB mode
-        # CTR uses encryption algorithm
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        encryptor = cipher.encryptor()
-
-        plaintextList = []
-        # Loop through the ciphertext list, return plaintext string
-        for i in range(0, len(ciphertext)):
-            if (i == 0):
-                firstBlock = encryptor.update(self.iv)
-                xor = xorData(firstBlock, ciphertext[i])
-                firstElement = xor.getXor()
-                plaintextList.append(firstElement)
-            elif (i >= 1):
-                # There will be an error here if ord(preCount) > 256 
-                # Need to come up with a fix
-                preCount = self.iv[-1]
-                countElement = chr(ord(preCount) + i) 
-                count = self.iv[:-1] + str(countElement)
-                nBlock = encryptor.update(count)
-                xor = xorData(nBlock, ciphertext[i])
-                nElement = xor.getXor()
-                plaintextList.append(nElement)
-        paddedElement = self.unPad(plaintextList.pop(-1))
-        plaintextList.append(paddedElement)
-        return ''.join(plaintextList)
+    def decryptMany(self, buffer, lengths, ivs):
+        '''
+        The decryptMany constructor is encryptMany.
+        '''
+        return self.cryptMany(buffer, lengths, ivs)
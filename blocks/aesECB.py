@@ -1,141 +1,114 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from chunk import chunkData
-from padding import padData
+from .base import blockMode
+from .batch import batchResult, offsetsOf
+from .stream import ECBEncryptStream, ECBDecryptStream
+from .chunk import blockView
+from .compat import byteView
 
 
-class ECBMode(object):
+class ECBMode(blockMode):
     '''
     This class is used to implement ECB mode using python cryptography. The
-    chunkData and padData are custom classes that are used to build
-    functionality that python cryptography would normally handle in the
-    backend. Educational purposes only.
+    blockView class and the padding schemes are custom code used to build
+    functionality that python cryptography would normally handle in
+    the backend. Educational purposes only.
+
+    The padding, block handling and batching are done by blockMode, see
+    blocks/base.py. ECB blocks do not depend on each other, so the kernel
+    sends them to python cryptography in slabs of slabSize bytes instead of
+    a block at a time.
     '''
-    def __init__(self, key):
+    usesIv = False
+    modeName = 'ecb'
+    encryptStream = ECBEncryptStream
+    decryptStream = ECBDecryptStream
+
+    def __init__(self, key, padding='pkcs7', backend='cryptography'):
         '''
         This constructor initilizes the key to be used for encryption and
-        decryption. The key can be 16, 24 or 32 bytes long.
+        decryption and the padding scheme. The key can be 16, 24 or 32 bytes
+        long. padding is a name from blocks/padding.py paddingSchemes: pkcs7,
+        x923, iso7816, zero, none or cts (ciphertext stealing). backend is
+        a name from blocks/backends.py: cryptography, native, numpy or auto.
         '''
         self.key = key
+        self.padding = padding
+        self.backend = backend
 
-    # Input validation for the key
-    @property
-    def key(self):
-        return self._key
+    def encryptBlocks(self, blocks):
+        '''
+        The encryptBlocks constructor encrypts the blocks in slabs, without
+        copying them out of the plaintext.
+        '''
+        return self.cryptSlabs(self.getEncryptor(), blocks)
 
-    @key.setter
-    def key(self, key):
-        if (len(key) not in [16, 24, 32]):
-            raise Exception('The key must be 16, 24, or 32 bytes long.')
-        self._key = key
+    def encryptBlocksInto(self, blocks, output):
+        '''
+        The encryptBlocksInto constructor encrypts the blocks in slabs
+        straight into output, see encrypt_into.
+        '''
+        return self.cryptSlabsInto(self.getEncryptor(), blocks, output)
 
-    def pad(self, data):
+    def decryptBlocks(self, blocks):
         '''
-        This constructor takes in the string that needs to be padded.
-        Calls the custom pad class in the block/padding.py and returns the
-        padded string.
+        The decryptBlocks constructor decrypts the blocks in slabs.
         '''
-        padding = padData(data)
-        paddedData = padding.padString()
-        return paddedData
+        return self.cryptSlabs(self.getDecryptor(), blocks)
 
-    def unPad(self, data):
+    def encryptStealing(self, plaintext):
         '''
-        This constructor takes in the padded string that needs to be unpadded
-        by the receiver of the message.
+        The encryptStealing constructor encrypts a plaintext that ends in a
+        short block with ciphertext stealing. The short block is completed
+        with the end of the ciphertext of the block before it, and takes its
+        place. The stolen ciphertext is cut down to the length of the short
+        block and moved to the end.
         '''
-        try:
-            unPadding = padData(data)
-            unPaddedData = unPadding.unPadString()
-            return unPaddedData
-        except ValueError:
-            return data
+        view = byteView(plaintext)
+        if (len(view) < 16):
+            raise ValueError('Ciphertext stealing needs at least one block.')
+        split = len(view) - len(view) % 16
+        tail = view[split:].tobytes()
+        head = self.encrypt(view[:split])
 
-    def preProcess(self, data):
-        '''
-        The preProcess constructor takes the plaintext. Then pads and chunks if
-        needed. Returns a list.
-        '''
-        if (len(data) == 0):
-            raise ValueError('Plaintext string can not be empty.')
-        elif (len(data) < 16):
-            paddedList = [self.pad(data)]
-            return paddedList
-        elif (len(data) == 16):
-            dataList = [data]
-            return dataList
-        elif (len(data) % 16 == 0):
-            divList = chunkData(data)
-            return divList.getChunk()
-        else:
-            chunk = chunkData(data)
-            chunkedData = chunk.getChunk()
-            shortBlock = self.pad(chunkedData.pop(-1))
-            chunkedData.append(shortBlock)
-            return chunkedData
+        # Fetch the cached ECB mode context of the backend
+        encryptor = self.getEncryptor()
+        stolen = head[-16:]
+        last = encryptor.update(tail + stolen[len(tail):])
+        return head[:-16] + last + stolen[:len(tail)]
 
-    def postProcess(self, data):
+    def decryptStealing(self, ciphertext):
         '''
-        The postProcess constructor is used to validate and chunk the
-        ciphertext. Returns a list.
+        The decryptStealing constructor reverses encryptStealing. The last
+        whole block decrypts to the short plaintext block and the stolen
+        bytes, which complete the ciphertext of the block before it.
         '''
-        if (len(data) == 0 or len(data) < 16):
+        view = byteView(ciphertext)
+        if (len(view) < 16):
             raise ValueError('Invalid ciphertext byte length.')
-        else:
-            chunk = chunkData(data)
-            return chunk.getChunk()
+        split = len(view) - len(view) % 16
+        tail = view[split:].tobytes()
 
-    def encrypt(self, plaintext):
-        '''
-        The encrypt constructor takes the plaintext string, sends it to the
-        preProcess class to be padded and chunked. The blocks are then
-        encrypted using the python cryptography library. Returns a ciphertext
-        string.
-        '''
-        # Send the plaintext string to be padded and chunked
-        plaintext = self.preProcess(plaintext)
-        
-        # Initilize the python cryptography ECB mode
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        encryptor = cipher.encryptor()
-        
-        # Loop through and encrypt the plaintext list
-        ciphertextList = []
-        for i in range(0, len(plaintext)):
-            ciphertext = encryptor.update(plaintext[i])
-            ciphertextList.append(ciphertext)
-        return ''.join(ciphertextList)
-    
-    def decrypt(self, ciphertext):
-        '''
-        The decrypt constructor takes the ciphertext string, sends it to
-        the postProcess class to be chunked. The blocks are then decrypted
-        and unpadded using the python cryptography library. Returns a
-        ciphertext string.
-        '''
-        # Send the ciphertext string to be chunked
-        ciphertext = self.postProcess(ciphertext)
-        
-        # Initilize the python cryptography ECB mode
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        decryptor = cipher.decryptor()
+        # Fetch the cached ECB mode context of the backend
+        decryptor = self.getDecryptor()
+        last = decryptor.update(view[split - 16:split])
+        stolen = decryptor.update(tail + last[len(tail):])
+        head = decryptor.update(view[:split - 16])
+        return head + stolen + last[:len(tail)]
 
-        # Loop through decrypt the ciphertext and then unpad.
-        plaintextList = []
-        if (len(ciphertext) == 1):
-            plaintext = decryptor.update(ciphertext[0])
-            unPaddedPt = self.unPad(plaintext)
-            return unPaddedPt
-        else:
-            for i in range(0, len(ciphertext)):
-                plaintext = decryptor.update(ciphertext[i])
-                plaintextList.append(plaintext)
-            paddedElement = self.unPad(plaintextList.pop(-1))
-            plaintextList.append(paddedElement)
-            return ''.join(plaintextList)
+    def encryptMany(self, buffer, lengths, ivs):
+        '''
+        The encryptMany constructor encrypts padded messages packed into one
+        buffer. The buffer is encrypted in slabs, so the batch takes as few
+        backend calls as one message of the same total size.
+        '''
+        ciphertextList = self.encryptBlocks(blockView(buffer))
+        return batchResult(b''.join(ciphertextList), offsetsOf(lengths))
+
+    def decryptMany(self, buffer, lengths, ivs):
+        '''
+        The decryptMany constructor decrypts ciphertexts packed into one
+        buffer in slabs.
+        '''
+        plaintextList = self.decryptBlocks(blockView(buffer))
+        return batchResult(b''.join(plaintextList), offsetsOf(lengths))
@@ -0,0 +1,277 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import copy
+import hmac
+from .backends import resolve
+from .base import blockMode
+from .batch import packMessages
+from .cache import contextCache
+from .compat import asBytes, byteView, bytesToInt, intToBytes, writeInto
+from .ghash import ghashState, ghashTable
+from .keystream import ctrKeystream
+from .padding import getPadding
+from .stream import GCMEncryptStream, GCMDecryptStream
+from .xor import xorData
+
+
+class GCMMode(blockMode):
+    '''
+    This class is used to implement GCM, CTR mode encryption authenticated
+    with GHASH (NIST 800-38D), using python cryptography ECB for the AES
+    calls. Educational purposes only.
+
+    The message is encrypted with the batched CTR keystream of
+    blocks/keystream.py, counting in the low 32 bits from the block after
+    the pre-counter block J0. The ciphertext and the additional data are
+    hashed with the GHASH tables of the key, see blocks/ghash.py, which are
+    built once and kept in the context cache next to the ECB contexts.
+    encrypt returns the ciphertext followed by the tag, like python
+    cryptography AESGCM, and decrypt raises ValueError when the tag does not
+    match. A message is at most maxLength bytes, past it the 32 bit counter
+    would wrap and reuse the keystream.
+    '''
+    blockAligned = False
+    modeName = 'gcm'
+    # GCM never pads
+    padding = getPadding('none')
+    # The longest message of NIST 800-38D, 2^32 - 2 blocks
+    maxLength = ((1 << 32) - 2) * 16
+
+    def __init__(self, key, iv, tagLength=16, backend='cryptography'):
+        '''
+        This constructor initilizes the key, initialization vector and tag
+        length. The key can be 16, 24, or 32 bytes long. The IV can be any
+        length, 12 bytes is the recommended one and the fastest. tagLength
+        is the length of the tag in bytes, 16, 15, 14, 13, 12, 8 or 4.
+        backend is a name from blocks/backends.py: cryptography, native,
+        numpy or auto.
+        '''
+        self.key = key
+        self.iv = iv
+        self.tagLength = tagLength
+        self.backend = backend
+
+    # Input validation for the IV, GCM takes any length
+    @property
+    def iv(self):
+        return self._iv
+
+    @iv.setter
+    def iv(self, iv):
+        if (len(iv) == 0):
+            raise ValueError('The iv can not be empty.')
+        self._iv = asBytes(iv)
+
+    # Input validation for the tag length
+    @property
+    def tagLength(self):
+        return self._tagLength
+
+    @tagLength.setter
+    def tagLength(self, tagLength):
+        if (tagLength not in [4, 8, 12, 13, 14, 15, 16]):
+            raise ValueError('The tag length must be 16, 15, 14, 13, 12, 8 '
+                             'or 4 bytes.')
+        self._tagLength = tagLength
+
+    def backendName(self):
+        '''
+        Returns the name of the backend. The AES work of GCM is the CTR
+        keystream, auto uses the backend picked for CTR.
+        '''
+        return resolve(self.backend, 'ctr')
+
+    def buildHashTable(self):
+        '''
+        Builds the GHASH tables of the key. The hash key is the encryption of
+        the zero block.
+        '''
+        return ghashTable(self.getEncryptor().update(b'\x00' * 16))
+
+    def hashTable(self):
+        '''
+        Returns the GHASH tables of the key, cached with its contexts.
+        '''
+        return contextCache.getTable(self.key, 'ghash', self.buildHashTable,
+                self.backendName())
+
+    def preCounter(self):
+        '''
+        Returns the pre-counter block J0. A 12 byte IV is followed by the
+        counter 1, any other IV is hashed with its length.
+        '''
+        if (len(self.iv) == 12):
+            return self.iv + b'\x00\x00\x00\x01'
+        state = ghashState(self.hashTable())
+        state.update(self.iv)
+        return state.digest(0, len(self.iv))
+
+    def counterStream(self):
+        '''
+        Returns the ctrKeystream of the message, counting in the low 32 bits
+        from the block after J0.
+        '''
+        preCounter = self.preCounter()
+        low = (bytesToInt(preCounter[12:]) + 1) & 0xffffffff
+        return ctrKeystream(self.key, preCounter[:12] + intToBytes(low, 4),
+                backend=self.backendName(), counterBits=32)
+
+    def tagFromHash(self, digest):
+        '''
+        Returns the tag of a GHASH digest: the digest xored with the
+        encryption of J0, cut down to tagLength bytes.
+        '''
+        mask = self.getEncryptor().update(self.preCounter())
+        return xorData(digest, mask).getXor()[:self.tagLength]
+
+    def checkTagLength(self, tag):
+        '''
+        Returns the tag as bytes after checking its length.
+        '''
+        if (len(tag) != self.tagLength):
+            raise ValueError('The tag must be %d bytes long.' %
+                             self.tagLength)
+        return asBytes(tag)
+
+    def checkLength(self, length):
+        '''
+        Raises ValueError when a message of length bytes is longer than
+        maxLength.
+        '''
+        if (length > self.maxLength):
+            raise ValueError('A GCM message can be at most 2**32 - 2 blocks '
+                             'long.')
+
+    def verifyTag(self, computed, tag):
+        '''
+        Raises ValueError when the tags differ. The comparison takes the same
+        time wherever they differ.
+        '''
+        if (not hmac.compare_digest(computed, tag)):
+            raise ValueError('The authentication tag does not match.')
+
+    def cryptText(self, data):
+        '''
+        Xors data with the keystream of the message, from its start.
+        '''
+        if (len(data) == 0):
+            return b''
+        keystream = self.counterStream().getKeystream(0, len(data))
+        return xorData(data, keystream).getXor()
+
+    def computeTag(self, aad, ciphertext):
+        '''
+        Returns the tag of the additional data and the ciphertext.
+        '''
+        state = ghashState(self.hashTable())
+        state.update(aad)
+        state.pad()
+        state.update(ciphertext)
+        return self.tagFromHash(state.digest(len(aad), len(ciphertext)))
+
+    def encrypt(self, plaintext, aad=b''):
+        '''
+        The encrypt constructor encrypts the plaintext and authenticates it
+        together with the additional data aad. Returns the ciphertext
+        followed by the tag. The plaintext can be empty, the tag then only
+        authenticates aad (GMAC).
+        '''
+        plaintext = byteView(plaintext)
+        self.checkLength(len(plaintext))
+        ciphertext = self.cryptText(plaintext)
+        return ciphertext + self.computeTag(byteView(aad), ciphertext)
+
+    def decrypt(self, ciphertext, aad=b''):
+        '''
+        The decrypt constructor checks the tag at the end of the ciphertext
+        against the ciphertext and aad, then decrypts it. Raises ValueError
+        when the tag does not match, nothing is decrypted then.
+        '''
+        ciphertext = byteView(ciphertext)
+        if (len(ciphertext) < self.tagLength):
+            raise ValueError('Invalid ciphertext byte length.')
+        split = len(ciphertext) - self.tagLength
+        self.checkLength(split)
+        self.verifyTag(self.computeTag(byteView(aad), ciphertext[:split]),
+                ciphertext[split:].tobytes())
+        return self.cryptText(ciphertext[:split])
+
+    def encrypt_into(self, plaintext, output, aad=b''):
+        '''
+        The encrypt_into constructor writes the output of encrypt, the
+        ciphertext and the tag, into the caller supplied bytearray output.
+        Returns the number of bytes written.
+        '''
+        return writeInto([self.encrypt(plaintext, aad)], output)
+
+    def decrypt_into(self, ciphertext, output, aad=b''):
+        '''
+        The decrypt_into constructor writes the plaintext of decrypt into the
+        caller supplied bytearray output. Returns the number of bytes
+        written.
+        '''
+        return writeInto([self.decrypt(ciphertext, aad)], output)
+
+    def withIv(self, iv):
+        '''
+        Returns a copy of the mode with another IV.
+        '''
+        mode = copy.copy(self)
+        mode.iv = iv
+        return mode
+
+    def checkMany(self, messages, ivs, aads):
+        '''
+        Returns the IVs and the additional data of a batch call. GCM must
+        never use an IV twice with a key, so every message needs its own.
+        '''
+        if (ivs is None or len(ivs) != len(messages)):
+            raise ValueError('There must be one iv per message.')
+        if (aads is None):
+            aads = [b''] * len(messages)
+        if (len(aads) != len(messages)):
+            raise ValueError('There must be one aad per message.')
+        return list(ivs), list(aads)
+
+    def encrypt_many(self, messages, ivs, aads=None):
+        '''
+        The encrypt_many constructor encrypts a sequence of independent
+        messages, each with its own IV and additional data (none when aads
+        is None). Returns a batchResult of ciphertexts followed by their
+        tags, see blocks/batch.py.
+        '''
+        ivs, aads = self.checkMany(messages, ivs, aads)
+        return packMessages([self.withIv(iv).encrypt(message, aad)
+            for message, iv, aad in zip(messages, ivs, aads)])
+
+    def decrypt_many(self, ciphertexts, ivs, aads=None):
+        '''
+        The decrypt_many constructor decrypts a sequence of ciphertexts with
+        their tags. Raises ValueError when any tag does not match. Returns
+        a batchResult.
+        '''
+        ivs, aads = self.checkMany(ciphertexts, ivs, aads)
+        plaintexts = [self.withIv(iv).decrypt(ciphertext, aad)
+            for ciphertext, iv, aad in zip(ciphertexts, ivs, aads)]
+        return packMessages(plaintexts)
+
+    def encryptor(self, joined=False):
+        '''
+        The encryptor constructor returns a stream object that encrypts the
+        message in pieces. Pass the additional data with
+        authenticate_additional_data(data), then the message with
+        update(data). finalize() sets the tag attribute of the stream, and
+        returns it too when joined is True, so the joined output matches
+        encrypt. See blocks/stream.py.
+        '''
+        return GCMEncryptStream(self, joined)
+
+    def decryptor(self, tag=None):
+        '''
+        The decryptor constructor returns a stream object that decrypts the
+        message in pieces and checks it against tag. With no tag the input
+        is the output of encrypt, the tag is held back from the end of it.
+        finalize() raises ValueError when the tag does not match, the
+        plaintext returned by update can not be trusted before then.
+        '''
+        return GCMDecryptStream(self, tag)
@@ -1,173 +1,158 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from chunk import chunkData
-from padding import padData
-from xor import xorData
+from .base import blockMode
+from .batch import batchResult, offsetsOf
+from .cache import contextCache
+from .compat import byteView
+from .keystream import ofbCache
+from .stream import OFBStream, OFBDecryptStream
+from .xor import xorData
 
 
-class OFBMode(object):
+class OFBMode(blockMode):
     '''
     This class is used to implment OFB mode using python cryptography. The
-    chunkData, padData, and xorData are custom classes that are used to build
-    functionality that python cryptography would normally handle in the
-    backend. Educational purposes only.
+    blockView and xorData classes and the padding schemes are custom code
+    used to build functionality that python cryptography would
+    normally handle in the backend. Educational purposes only.
+
+    The padding, block handling and batching are done by blockMode, see
+    blocks/base.py. The kernel xors the blocks with the keystream, the chain
+    of encryptions of the IV, which is shared between calls through the
+    cache. Encryption and decryption are the same operation.
+    Note: OFB does not normally use padding, see padding='none'. See issue
+    #12.
     '''
-    def __init__(self, key, iv):
+    blockAligned = False
+    modeName = 'ofb'
+    encryptStream = OFBStream
+    decryptStream = OFBDecryptStream
+
+    def __init__(self, key, iv, padding='pkcs7', backend='cryptography'):
         '''
-        This constructor initilizes the key and initialization vector. The key
-        and the IV should be the same length, either 16, 24, or 32 bytes long.
+        This constructor initilizes the key, initialization vector and padding
+        scheme. The key can be 16, 24, or 32 bytes long. The IV is one AES
+        block, 16 bytes. padding is a name from blocks/padding.py
+        paddingSchemes: pkcs7, x923, iso7816, zero or none, which keeps the
+        ciphertext the length of the plaintext. backend is a name from
+        blocks/backends.py: cryptography, native, numpy or auto.
         '''
         self.key = key
         self.iv = iv
+        self.padding = padding
+        self.backend = backend
 
-    # Input validation for the key
-    @property
-    def key(self):
-        return self._key
+    def dropKey(self, key):
+        '''
+        Drops the cached contexts and keystreams of a key that is no longer
+        used.
+        '''
+        contextCache.invalidate(key)
+        ofbCache.invalidate(key)
 
-    @key.setter
-    def key(self, key):
-        if (len(key) not in [16, 24, 32]):
-            raise Exception('The key must be 16, 24, or 32 bytes long.')
-        self._key = key
+    def precompute(self, length):
+        '''
+        The precompute constructor computes length bytes of the keystream of
+        the key and IV on the backend of the mode ahead of time into the
+        shared cache, see blocks/keystream.py.
+        '''
+        ofbCache.get(self.key, self.iv, length,
+                self.backendName()).precompute(length)
 
-    # Input validation for the IV
-    @property
-    def iv(self):
-        return self._iv
+    def keystream(self, offset, length):
+        '''
+        The keystream constructor returns length bytes of OFB keystream
+        starting at byte offset. The chain is only computed past what the
+        cache already holds for the key and IV.
+        '''
+        return ofbCache.getKeystream(self.key, self.iv, offset, length,
+                self.backendName())
+
+    def decryptRange(self, data, offset):
+        '''
+        The decryptRange constructor xors data with the keystream starting at
+        byte offset of the message. Padding is not removed. In OFB encryption
+        is the same operation.
+        '''
+        data = byteView(data)
+        if (len(data) == 0):
+            return b''
+        xor = xorData(data, self.keystream(offset, len(data)))
+        return xor.getXor()
 
-    @iv.setter
-    def iv(self, iv):
-        if (len(iv) not in [16, 24, 32]):
-            raise Exception('The iv must be 16, 24, or 32 bytes long.')
-        self._iv = iv
+    def keystreamSlabs(self, blocks):
+        '''
+        The keystreamSlabs constructor xors each slab of a blockView with its
+        part of the keystream. Returns the list of xored slabs.
+        '''
+        generator = ofbCache.get(self.key, self.iv, blocks.byteLength(),
+                self.backendName())
+        outputList = []
+        offset = 0
+        for slab in blocks.slabs(self.slabSize // 16):
+            xor = xorData(slab, generator.getKeystream(offset, len(slab)))
+            outputList.append(xor.getXor())
+            offset += len(slab)
+        return outputList
+
+    def encryptBlocks(self, blocks):
+        '''
+        The encryptBlocks constructor xors the blocks with the keystream, see
+        keystreamSlabs. A backend running OFB itself gets the slabs.
+        '''
+        context = self.nativeContext('encrypt')
+        if (context is not None):
+            return [context.update(slab)
+                    for slab in blocks.slabs(self.slabSize // 16)]
+        return self.keystreamSlabs(blocks)
 
-    def pad(self, data):
+    def decryptBlocks(self, blocks):
         '''
-        This constructor takes in the string that needs to be padded.
-        Calls the custom pad class in the block/padding.py and returns the
-        padded string.
+        The decryptBlocks constructor is encryptBlocks, in OFB encryption and
+        decryption are the same operation.
         '''
-        padding = padData(data)
-        paddedData = padding.padString()
-        return paddedData
+        return self.encryptBlocks(blocks)
 
-    def unPad(self, data):
+    def cryptMany(self, buffer, lengths, ivs):
+        '''
+        The cryptMany constructor xors messages packed back to back in buffer
+        with their keystreams. The feedback chains of all messages advance in
+        lockstep, each round encrypts the next block of every message that
+        still needs one with a single backend call. Returns a batchResult.
         '''
-        This constructor takes in the padded string that needs to be unpadded
-        by the reciever of the message.
+        offsets = offsetsOf(lengths)
+        if (len(buffer) == 0):
+            return batchResult(b'', offsets)
+
+        # Fetch the cached ECB mode context of the backend
+        encryptor = self.getEncryptor()
+        blockCounts = [-(-length // 16) for length in lengths]
+        feedback = list(ivs)
+        keystreams = [[] for iv in ivs]
+        for blockIndex in range(0, max(blockCounts)):
+            active = [i for i in range(0, len(blockCounts))
+                      if blockCounts[i] > blockIndex]
+            output = encryptor.update(b''.join([feedback[i] for i in active]))
+            for k in range(0, len(active)):
+                i = active[k]
+                feedback[i] = output[16 * k:16 * k + 16]
+                keystreams[i].append(feedback[i])
+
+        # A short last block only uses the front of its keystream block
+        keystream = b''.join([b''.join(keystreams[i])[:lengths[i]]
+            for i in range(0, len(lengths))])
+        xor = xorData(buffer, keystream)
+        return batchResult(xor.getXor(), offsets)
+
+    def encryptMany(self, buffer, lengths, ivs):
         '''
-        try:
-            unPadding = padData(data)
-            unPaddedData = unPadding.unPadString()
-            return unPaddedData
-        except ValueError:
-            return data
+        The encryptMany constructor encrypts padded messages packed into one
+        buffer, each with the keystream of its own IV, see cryptMany.
+        '''
+        return self.cryptMany(buffer, lengths, ivs)
 
-    def preProcess(self, data):
+    def decryptMany(self, buffer, lengths, ivs):
         '''
-        The preProcess constructor takes the plaintext. Then pads and chunks if
-        needed. Returns a list.
+        The decryptMany constructor is encryptMany.
         '''
-        if (len(data) == 0):
-            raise ValueError('Plaintext string can not be empty')
-        elif (len(data) < 16):
-            paddedList = [self.pad(data)]
-            return paddedList
-        elif (len(data) == 16):
-            dataList = [data]
-            return dataList
-        elif(len(data) % 16 == 0):
-            divList = chunkData(data)
-            return divList.getChunk()
-        else:
-            chunk = chunkData(data)
-            chunkedData = chunk.getChunk()
-            shortBlock = self.pad(chunkedData.pop(-1))
-            chunkedData.append(shortBlock)
-            return chunkedData
-
-    def postProcess(self, data):
-        '''
-        The postProcess constructor is used to validate and chunk the
-        ciphertext. Returns a list.
-        '''
-        if (len(data) == 0 or len(data) < 16):
-            raise ValueError('Invalid ciphertext byte length.')
-        else:
-            chunk = chunkData(data)
-            return chunk.getChunk()
-
-    def encrypt(self, plaintext):
-        '''
-        This encrypt constructor takes the plaintext string, sends it to the
-        preProcess class to be padded and chunked. The blocks are then
-        encrypted using python cryptography library ECB mode.
-        Note: OFB does not normally use padding. See issue #12.
-        '''
-        # Send the plaintext string to be padded and chunked
-        plaintext = self.preProcess(plaintext)
-
-        # Initilize the python cryptography ECB mode
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        encryptor = cipher.encryptor()
-
-        ciphertextList = []
-        tmpBlockList = []
-        # Loop through the plaintext elements, return ciphertext string
-        for i in range(0, len(plaintext)):
-            if (i == 0):
-                firstBlock = encryptor.update(self.iv)
-                tmpBlockList.append(firstBlock)
-                xor = xorData(tmpBlockList[i], plaintext[i])
-                firstElement = xor.getXor()
-                ciphertextList.append(firstElement)
-            elif (i >= 1):
-                nBlock = encryptor.update(tmpBlockList[i-1])
-                tmpBlockList.append(nBlock)
-                xor = xorData(tmpBlockList[i], plaintext[i])
-                nElement = xor.getXor()
-                ciphertextList.append(nElement)
-        return ''.join(ciphertextList)
-
-    def decrypt(self, ciphertext):
-        '''
-        This decrypt constructor takes the ciphertext string, sends it to the
-        postProcess class to be chunked. The blocks are sent to the python
-        cryptography ECB mode for encryption. In OFB, the decryption of the
-        blocks uses the encryption of the IV and the key, xored with the
-        ciphertext to get the plaintext.
-        '''
-        # Send the ciphertext string to be chunked
-        ciphertext = self.postProcess(ciphertext)
-
-        # Initilize the python cryptography ECB mode
-        # OFB uses encryption algorithm
-        backend = default_backend()
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB(),
-                backend = backend)
-        encryptor = cipher.encryptor()
-
-        plaintextList = []
-        tmpBlockList = []
-        # Loop through the ciphertext list, return plaintext string
-        for i in range(0, len(ciphertext)):
-            if (i == 0):
-                firstBlock = encryptor.update(self.iv)
-                tmpBlockList.append(firstBlock)
-                xor = xorData(tmpBlockList[i], ciphertext[i])
-                firstElement = xor.getXor()
-                plaintextList.append(firstElement)
-            elif (i >= 1):
-                nBlock = encryptor.update(tmpBlockList[i-1])
-                tmpBlockList.append(nBlock)
-                xor = xorData(tmpBlockList[i], ciphertext[i])
-                nElement = xor.getXor()
-                plaintextList.append(nElement)
-        paddedElement = self.unPad(plaintextList.pop(-1))
-        plaintextList.append(paddedElement)
-        return ''.join(plaintextList)
+        return self.cryptMany(buffer, lengths, ivs)
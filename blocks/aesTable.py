@@ -0,0 +1,268 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+from .compat import PY3, asBytes, outputView
+try:
+    import numpy
+except ImportError:
+    numpy = None
+'''
+A table driven AES core over NumPy arrays. The rounds are the 32 bit T-table
+formulation of FIPS-197 (see the rijndael-alg-fst reference code): every
+round of every block is four table lookups and four xors per column. The
+lookups and xors are done on whole arrays of blocks, so a call covers
+thousands of blocks without a Python loop per block.
+
+Used by the modes when they are built with backend='numpy'. The contexts
+returned by tableCipher have the update and update_into calls of the python
+cryptography ECB contexts, so the modes and the context cache use them the
+same way. numpy is optional, available() tells whether it is installed.
+
+Note: table lookups are not constant time. Educational purposes only.
+'''
+
+# Blocks run through the rounds per array operation
+batchBlocks = 1 << 14
+
+
+def available():
+    '''
+    Returns whether numpy is installed.
+    '''
+    return numpy is not None
+
+
+def xtime(value):
+    '''
+    Multiplies a byte by x in GF(2^8) with the AES polynomial.
+    '''
+    value <<= 1
+    if (value & 0x100):
+        value ^= 0x11b
+    return value
+
+
+def multiply(a, b):
+    '''
+    Multiplies two bytes in GF(2^8).
+    '''
+    result = 0
+    while (b):
+        if (b & 1):
+            result ^= a
+        a = xtime(a)
+        b >>= 1
+    return result
+
+
+def buildSbox():
+    '''
+    Returns the AES S-box and its inverse as lists of 256 bytes. The S-box
+    is the multiplicative inverse followed by the affine map of FIPS-197.
+    The inverses come from log and antilog tables over the generator 3.
+    '''
+    exponents = [0] * 255
+    logarithms = [0] * 256
+    value = 1
+    for i in range(0, 255):
+        exponents[i] = value
+        logarithms[value] = i
+        value ^= xtime(value)
+    sbox = [0] * 256
+    inverse = [0] * 256
+    for value in range(0, 256):
+        # The inverse of 0 is taken as 0
+        product = 0
+        if (value):
+            product = exponents[(255 - logarithms[value]) % 255]
+        result = product
+        for shift in range(1, 5):
+            result ^= ((product << shift) | (product >> (8 - shift))) & 0xff
+        result ^= 0x63
+        sbox[value] = result
+        inverse[result] = value
+    return sbox, inverse
+
+
+def rotate(word, bits):
+    '''
+    Rotates a 32 bit word right by bits.
+    '''
+    return ((word >> bits) | (word << (32 - bits))) & 0xffffffff
+
+
+def buildTables():
+    '''
+    Returns the S-boxes and the encryption and decryption T-tables. Te[n]
+    and Td[n] are Te[0] and Td[0] rotated right by 8n bits.
+    '''
+    sbox, inverse = buildSbox()
+    te0 = [(multiply(s, 2) << 24) | (s << 16) | (s << 8) | multiply(s, 3)
+           for s in sbox]
+    td0 = [(multiply(s, 14) << 24) | (multiply(s, 9) << 16) |
+           (multiply(s, 13) << 8) | multiply(s, 11) for s in inverse]
+    te = [[rotate(word, 8 * n) for word in te0] for n in range(0, 4)]
+    td = [[rotate(word, 8 * n) for word in td0] for n in range(0, 4)]
+    return sbox, inverse, te, td
+
+
+sbox, inverseSbox, encryptTables, decryptTables = buildTables()
+
+
+def expandKey(key):
+    '''
+    Returns the encryption round keys of a 16, 24 or 32 byte key as a list
+    of 32 bit words, four per round.
+    '''
+    key = bytearray(key)
+    if (len(key) not in [16, 24, 32]):
+        raise ValueError('The key must be 16, 24, or 32 bytes long.')
+    keyWords = len(key) // 4
+    rounds = keyWords + 6
+    words = [(key[i] << 24) | (key[i + 1] << 16) | (key[i + 2] << 8) |
+             key[i + 3] for i in range(0, len(key), 4)]
+    roundConstant = 1
+    for i in range(keyWords, 4 * (rounds + 1)):
+        word = words[i - 1]
+        if (i % keyWords == 0):
+            word = subWord(rotate(word, 24)) ^ (roundConstant << 24)
+            roundConstant = xtime(roundConstant)
+        elif (keyWords > 6 and i % keyWords == 4):
+            word = subWord(word)
+        words.append(words[i - keyWords] ^ word)
+    return words
+
+
+def subWord(word):
+    '''
+    Runs the four bytes of a word through the S-box.
+    '''
+    return ((sbox[word >> 24] << 24) | (sbox[(word >> 16) & 0xff] << 16) |
+            (sbox[(word >> 8) & 0xff] << 8) | sbox[word & 0xff])
+
+
+def inverseKey(words):
+    '''
+    Returns the round keys of the equivalent inverse cipher: the rounds in
+    reverse order, with InvMixColumns applied to all but the first and last.
+    '''
+    rounds = len(words) // 4 - 1
+    td = decryptTables
+    result = []
+    for roundIndex in range(rounds, -1, -1):
+        for word in words[4 * roundIndex:4 * roundIndex + 4]:
+            if (0 < roundIndex < rounds):
+                word = (td[0][sbox[word >> 24]] ^
+                        td[1][sbox[(word >> 16) & 0xff]] ^
+                        td[2][sbox[(word >> 8) & 0xff]] ^
+                        td[3][sbox[word & 0xff]])
+            result.append(word)
+    return result
+
+
+def cryptWords(state, roundKeys, tables, lastBox, order):
+    '''
+    Runs an (n, 4) array of big endian column words through the rounds.
+    order gives the column each table reads from for every output column,
+    ShiftRows for encryption and InvShiftRows for decryption.
+    '''
+    rounds = len(roundKeys) // 4 - 1
+    columns = [state[:, i] ^ roundKeys[i] for i in range(0, 4)]
+    for roundIndex in range(1, rounds):
+        key = roundKeys[4 * roundIndex:4 * roundIndex + 4]
+        columns = [tables[0][columns[order[i][0]] >> 24] ^
+                   tables[1][(columns[order[i][1]] >> 16) & 0xff] ^
+                   tables[2][(columns[order[i][2]] >> 8) & 0xff] ^
+                   tables[3][columns[order[i][3]] & 0xff] ^ key[i]
+                   for i in range(0, 4)]
+    key = roundKeys[4 * rounds:]
+    output = numpy.empty_like(state)
+    for i in range(0, 4):
+        output[:, i] = ((lastBox[columns[order[i][0]] >> 24] << 24) |
+                        (lastBox[(columns[order[i][1]] >> 16) & 0xff] << 16) |
+                        (lastBox[(columns[order[i][2]] >> 8) & 0xff] << 8) |
+                        lastBox[columns[order[i][3]] & 0xff]) ^ key[i]
+    return output
+
+
+# Column read by table n for output column i
+encryptOrder = [[i, (i + 1) % 4, (i + 2) % 4, (i + 3) % 4]
+                for i in range(0, 4)]
+decryptOrder = [[i, (i + 3) % 4, (i + 2) % 4, (i + 1) % 4]
+                for i in range(0, 4)]
+
+
+class tableContext(object):
+    '''
+    This class is used to run blocks through the table driven rounds in one
+    direction. It stands in for a python cryptography ECB context: update
+    takes block aligned data and returns the output as bytes, update_into
+    writes it into a buffer.
+    '''
+    def __init__(self, roundKeys, tables, lastBox, order):
+        self.roundKeys = numpy.array(roundKeys, dtype=numpy.uint32)
+        self.tables = [numpy.array(table, dtype=numpy.uint32)
+                       for table in tables]
+        self.lastBox = numpy.array(lastBox, dtype=numpy.uint32)
+        self.order = order
+
+    def cryptArray(self, data):
+        '''
+        Returns the output of block aligned data as an (n, 4) array of big
+        endian words, batchBlocks blocks per pass through the rounds.
+        '''
+        if (len(data) % 16 != 0):
+            raise ValueError('The data must be a multiple of 16 bytes.')
+        if (not PY3):
+            # numpy on Python 2 only reads strings and bytearrays
+            data = asBytes(data)
+        state = numpy.frombuffer(data, dtype='>u4').astype(numpy.uint32)
+        state = state.reshape(-1, 4)
+        output = numpy.empty(state.shape, dtype='>u4')
+        for start in range(0, len(state), batchBlocks):
+            end = start + batchBlocks
+            output[start:end] = cryptWords(state[start:end], self.roundKeys,
+                    self.tables, self.lastBox, self.order)
+        return output
+
+    def update(self, data):
+        '''
+        Encrypts or decrypts block aligned data, returns bytes.
+        '''
+        if (len(data) == 0):
+            return b''
+        return self.cryptArray(data).tobytes()
+
+    def update_into(self, data, output):
+        '''
+        Encrypts or decrypts block aligned data into the buffer output.
+        Returns the number of bytes written.
+        '''
+        view = outputView(output, len(data))
+        view[:len(data)] = self.update(data)
+        return len(data)
+
+    def finalize(self):
+        return b''
+
+
+class tableCipher(object):
+    '''
+    This class is used to hold the expanded key of the table driven AES core.
+    encryptor() and decryptor() return its contexts.
+    '''
+    def __init__(self, key):
+        '''
+        This constructor expands the key. The key can be 16, 24 or 32 bytes
+        long.
+        '''
+        if (numpy is None):
+            raise ImportError('The numpy backend needs numpy installed.')
+        self.roundKeys = expandKey(key)
+
+    def encryptor(self):
+        return tableContext(self.roundKeys, encryptTables, sbox,
+                encryptOrder)
+
+    def decryptor(self):
+        return tableContext(inverseKey(self.roundKeys), decryptTables,
+                inverseSbox, decryptOrder)
@@ -0,0 +1,419 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import struct
+from .backends import resolve
+from .base import blockMode
+from .batch import packMessages
+from .cache import contextCache
+from .chunk import blockView
+from .compat import asBytes, byteView, writeInto
+from .padding import getPadding
+from .parallel import mapSegments, workerSettings
+from .xor import xorData
+try:
+    import numpy
+except ImportError:
+    numpy = None
+'''
+XTS-AES (IEEE 1619, NIST 800-38E), the mode for sector addressed storage.
+The key is two AES keys of the same size: the first encrypts the data, the
+second encrypts the sector number into the first tweak of the sector. Block
+j of a sector is xored with the tweak times alpha^j in GF(2^128) before and
+after its ECB encryption, so every block is bound to its sector and its
+place in it, and any sector can be read or written alone.
+
+The tweaks are built with numpy when it is installed: the first tweaks of
+all the sectors of a call are multiplied by alpha^0 to alpha^55 in one
+shift and reduction over uint64 arrays, so a 4096 byte sector takes five
+steps whatever the number of sectors. Without numpy, and for calls of
+fewer than numpyTweakCount tweaks where the numpy setup costs more than it
+saves, every tweak is doubled in a python loop, one step per block of every
+sector. On large runs that loop costs more than the AES and xor work of the
+call.
+'''
+
+# The low 64 bits, and the reduction of alpha^128 for the little endian
+# tweaks of IEEE 1619
+lowWord = 0xffffffffffffffff
+reduction = 0x87
+# The most doublings done in one numpy step, the bits shifted out of the
+# high word and their reduction must fit in the low word
+shiftStep = 56
+# The fewest tweaks of a call that are built with numpy
+numpyTweakCount = 64
+
+
+def pythonTweaks(firstTweaks, blocks):
+    '''
+    Returns the tweaks of blocks blocks of every sector from the first
+    tweaks, 16 little endian bytes per sector, each doubled along its
+    sector one block at a time.
+    '''
+    wordCount = len(firstTweaks) // 8
+    firstWords = struct.unpack('<%dQ' % wordCount, firstTweaks)
+    words = []
+    append = words.append
+    for i in range(0, wordCount, 2):
+        tweak = firstWords[i] | (firstWords[i + 1] << 64)
+        for j in range(0, blocks):
+            append(tweak & lowWord)
+            append(tweak >> 64)
+            # Multiply by alpha, the carry out of bit 127 is reduced
+            carry = tweak >> 127
+            tweak = ((tweak << 1) & ((1 << 128) - 1)) ^ (
+                reduction if carry else 0)
+    return struct.pack('<%dQ' % len(words), *words)
+
+
+def shiftTweaks(low, high, shifts):
+    '''
+    Returns the low and high words of the tweaks low and high, uint64
+    arrays of one column, multiplied by alpha^shift for every shift of
+    shifts, 0 to shiftStep. The bits shifted out of bit 127 are reduced in
+    one go, times 0x87 (x^7 + x^2 + x + 1) is four shifts and xors.
+    '''
+    one = numpy.uint64(1)
+    # x >> 1 >> (63 - shift) is x >> (64 - shift), and 0 for a shift of 0
+    back = numpy.uint64(63) - shifts
+    carry = (high >> one) >> back
+    high = (high << shifts) | ((low >> one) >> back)
+    low = (low << shifts) ^ carry ^ (carry << one) ^ (
+        carry << numpy.uint64(2)) ^ (carry << numpy.uint64(7))
+    return low, high
+
+
+def numpyTweaks(firstTweaks, blocks):
+    '''
+    Returns the same tweaks as pythonTweaks. Up to shiftStep blocks of all
+    the sectors are done per step, see shiftTweaks.
+    '''
+    words = numpy.frombuffer(firstTweaks, dtype='<u8').reshape(-1, 2)
+    output = numpy.empty((len(words), blocks, 2), dtype='<u8')
+    low, high = words[:, 0:1], words[:, 1:2]
+    shifts = numpy.arange(0, shiftStep + 1, dtype=numpy.uint64)
+    for start in range(0, blocks, shiftStep):
+        end = min(blocks, start + shiftStep)
+        output[:, start:end, 0], output[:, start:end, 1] = shiftTweaks(
+            low, high, shifts[:end - start])
+        low, high = shiftTweaks(low, high, shifts[shiftStep:])
+    return output.tobytes()
+
+
+class XTSMode(workerSettings, blockMode):
+    '''
+    This class is used to implement XTS mode using python cryptography ECB.
+    Educational purposes only.
+
+    The sectors of a call are encrypted together: the first tweaks of all
+    of them come from one backend call with the tweak key, the tweaks of
+    the blocks of every sector are built in one pass and xored with the data
+    in one wide xor, and the data goes through the ECB context in slabs. Runs
+    of threshold bytes or more are split on sector boundaries over a pool of
+    worker threads, see blocks/parallel.py. A sector whose length is not a
+    multiple of 16 bytes ends with ciphertext stealing.
+    '''
+    blockAligned = False
+    usesIv = False
+    modeName = 'xts'
+    # XTS never pads, short last blocks are stolen
+    padding = getPadding('none')
+
+    def __init__(self, key, sectorSize=512, workers=None, threshold=1 << 20,
+            segmentSize=1 << 20, backend='cryptography'):
+        '''
+        This constructor initilizes the key, the sector size and the worker
+        settings. The key is 32 or 64 bytes long, the data key followed by
+        the tweak key, which must differ. sectorSize is the bytes per sector,
+        a multiple of 16. workers is the number of worker threads (one per
+        core by default), threshold the input size that switches to the
+        parallel path and segmentSize the bytes per worker task, rounded down
+        to whole sectors. backend is a name from blocks/backends.py.
+        '''
+        self.key = key
+        self.sectorSize = sectorSize
+        self.initWorkers(workers, threshold,
+                max(1, segmentSize // sectorSize) * sectorSize)
+        self.backend = backend
+
+    # Input validation for the key, two AES keys
+    @property
+    def key(self):
+        return self._key
+
+    @key.setter
+    def key(self, key):
+        if (len(key) not in [32, 64]):
+            raise Exception('The key must be 32 or 64 bytes long.')
+        key = asBytes(key)
+        half = len(key) // 2
+        if (key[:half] == key[half:]):
+            raise ValueError('The data key and the tweak key must differ.')
+        # Drop the cached contexts of a key that is being replaced
+        if (getattr(self, '_key', key) != key):
+            self.dropKey(self._key)
+        self._key = key
+        self.dataKey = key[:half]
+        self.tweakKey = key[half:]
+
+    def dropKey(self, key):
+        '''
+        Drops the cached contexts of both halves of a key that is no longer
+        used.
+        '''
+        half = len(key) // 2
+        contextCache.invalidate(key[:half])
+        contextCache.invalidate(key[half:])
+
+    # Input validation for the sector size
+    @property
+    def sectorSize(self):
+        return self._sectorSize
+
+    @sectorSize.setter
+    def sectorSize(self, sectorSize):
+        if (sectorSize < 16 or sectorSize % 16 != 0):
+            raise ValueError('The sector size must be a multiple of 16.')
+        self._sectorSize = sectorSize
+
+    def backendName(self):
+        '''
+        Returns the name of the backend. The AES work of XTS is ECB, auto
+        uses the backend picked for ECB.
+        '''
+        return resolve(self.backend, 'ecb')
+
+    def getEncryptor(self):
+        '''
+        Returns the cached ECB encryptor of the data key.
+        '''
+        return contextCache.getEncryptor(self.dataKey, self.backendName())
+
+    def getDecryptor(self):
+        '''
+        Returns the cached ECB decryptor of the data key.
+        '''
+        return contextCache.getDecryptor(self.dataKey, self.backendName())
+
+    def sectorTweaks(self, firstSector, count, blocks):
+        '''
+        The sectorTweaks constructor returns the tweaks of blocks blocks of
+        count sectors from firstSector, joined. The sector numbers are
+        encrypted with the tweak key in one backend call, then each first
+        tweak is doubled along its sector, with numpy when it is installed.
+        '''
+        if (firstSector < 0 or firstSector + count > 1 << 128):
+            raise ValueError('The sector number must be 0 to 2**128 - 1.')
+        encryptor = contextCache.getEncryptor(self.tweakKey,
+                self.backendName())
+        numbers = [0, 0] * count
+        numbers[0::2] = [sector & lowWord for sector in
+                         range(firstSector, firstSector + count)]
+        numbers[1::2] = [sector >> 64 for sector in
+                         range(firstSector, firstSector + count)]
+        firstTweaks = encryptor.update(struct.pack('<%dQ' % (2 * count),
+                                                   *numbers))
+        if (numpy is None or count * blocks < numpyTweakCount):
+            return pythonTweaks(firstTweaks, blocks)
+        return numpyTweaks(firstTweaks, blocks)
+
+    def xex(self, data, tweaks, decrypting):
+        '''
+        Xors block aligned data with its tweaks, runs it through the ECB
+        context and xors it with the tweaks again.
+        '''
+        context = self.getDecryptor() if decrypting else self.getEncryptor()
+        xored = xorData(data, tweaks).getXor()
+        crypted = b''.join(self.cryptSlabs(context, blockView(xored)))
+        return xorData(crypted, tweaks).getXor()
+
+    def cryptRun(self, firstSector, data, decrypting):
+        '''
+        The cryptRun constructor encrypts or decrypts whole sectors from
+        firstSector in one pass, see sectorTweaks and xex.
+        '''
+        count = len(data) // self.sectorSize
+        tweaks = self.sectorTweaks(firstSector, count, self.sectorSize // 16)
+        return self.xex(data, tweaks, decrypting)
+
+    def cryptSector(self, sector, data, decrypting):
+        '''
+        The cryptSector constructor encrypts or decrypts the data of one
+        sector, at least one block. A short last block is handled with
+        ciphertext stealing: it is completed with the end of the ciphertext
+        of the block before it and takes its place, and the ciphertext of
+        that block, cut down, moves to the end.
+        '''
+        data = byteView(data)
+        if (len(data) < 16):
+            raise ValueError('A sector must hold at least one block.')
+        remainder = len(data) % 16
+        blocks = len(data) // 16
+        tweaks = self.sectorTweaks(sector, 1, blocks + (remainder > 0))
+        if (remainder == 0):
+            return self.xex(data, tweaks, decrypting)
+        split = 16 * (blocks - 1)
+        head = b''
+        if (split):
+            head = self.xex(data[:split], tweaks[:split], decrypting)
+        last = data[split:split + 16]
+        tail = data[split + 16:].tobytes()
+        # Decryption undoes the stolen block first, with the last tweak
+        tweakOrder = [tweaks[split:split + 16], tweaks[split + 16:]]
+        if (decrypting):
+            tweakOrder.reverse()
+        stolen = self.xex(last, tweakOrder[0], decrypting)
+        whole = self.xex(tail + stolen[remainder:], tweakOrder[1],
+                decrypting)
+        return head + whole + stolen[:remainder]
+
+    def cryptSectors(self, firstSector, data, decrypting):
+        '''
+        The cryptSectors constructor encrypts or decrypts consecutive sectors
+        from firstSector. The whole sectors are split into segments of whole
+        sectors over the worker threads once there are threshold bytes, a
+        short last sector is stolen on its own.
+        '''
+        view = byteView(data)
+        whole = len(view) - len(view) % self.sectorSize
+        if (len(view) == 0 or 0 < len(view) - whole < 16):
+            raise ValueError('Invalid sector data byte length.')
+        output = bytearray(len(view))
+
+        def cryptSegment(start, end):
+            output[start:end] = self.cryptRun(
+                firstSector + start // self.sectorSize, view[start:end],
+                decrypting)
+
+        workers = self.workers if len(view) >= self.threshold else 1
+        mapSegments(cryptSegment, whole, self.segmentSize, workers)
+        if (whole != len(view)):
+            output[whole:] = self.cryptSector(
+                firstSector + whole // self.sectorSize, view[whole:],
+                decrypting)
+        return bytes(output)
+
+    def encrypt_sector(self, sector, plaintext):
+        '''
+        The encrypt_sector constructor encrypts the plaintext of one sector,
+        16 bytes or more. Returns a ciphertext string of the same length.
+        '''
+        return self.cryptSector(sector, plaintext, False)
+
+    def decrypt_sector(self, sector, ciphertext):
+        '''
+        The decrypt_sector constructor decrypts the ciphertext of one sector.
+        '''
+        return self.cryptSector(sector, ciphertext, True)
+
+    def encrypt_sectors(self, firstSector, plaintext):
+        '''
+        The encrypt_sectors constructor encrypts consecutive sectors starting
+        at firstSector. The plaintext is whole sectors, the last one can be
+        short but not under 16 bytes.
+        '''
+        return self.cryptSectors(firstSector, plaintext, False)
+
+    def decrypt_sectors(self, firstSector, ciphertext):
+        '''
+        The decrypt_sectors constructor decrypts consecutive sectors starting
+        at firstSector.
+        '''
+        return self.cryptSectors(firstSector, ciphertext, True)
+
+    def encrypt(self, plaintext, firstSector=0):
+        '''
+        This encrypt constructor encrypts the plaintext as consecutive
+        sectors starting at firstSector, see encrypt_sectors.
+        Note: XTS does not use padding.
+        '''
+        return self.encrypt_sectors(firstSector, plaintext)
+
+    def decrypt(self, ciphertext, firstSector=0):
+        '''
+        This decrypt constructor decrypts the ciphertext as consecutive
+        sectors starting at firstSector, see decrypt_sectors.
+        '''
+        return self.decrypt_sectors(firstSector, ciphertext)
+
+    def encrypt_into(self, plaintext, output, firstSector=0):
+        '''
+        The encrypt_into constructor writes the output of encrypt into the
+        caller supplied bytearray output. Returns the number of bytes
+        written.
+        '''
+        return writeInto([self.encrypt(plaintext, firstSector)], output)
+
+    def decrypt_into(self, ciphertext, output, firstSector=0):
+        '''
+        The decrypt_into constructor writes the output of decrypt into the
+        caller supplied bytearray output. Returns the number of bytes
+        written.
+        '''
+        return writeInto([self.decrypt(ciphertext, firstSector)], output)
+
+    def encrypt_many(self, messages, sectors):
+        '''
+        The encrypt_many constructor encrypts a sequence of single sectors
+        that need not be consecutive, one sector number per message. Returns
+        a batchResult, see blocks/batch.py.
+        '''
+        sectors = list(sectors)
+        if (len(sectors) != len(messages)):
+            raise ValueError('There must be one sector number per message.')
+        return packMessages([self.encrypt_sector(sector, message)
+            for message, sector in zip(messages, sectors)])
+
+    def decrypt_many(self, ciphertexts, sectors):
+        '''
+        The decrypt_many constructor decrypts a sequence of single sectors,
+        one sector number per ciphertext. Returns a batchResult.
+        '''
+        sectors = list(sectors)
+        if (len(sectors) != len(ciphertexts)):
+            raise ValueError('There must be one sector number per message.')
+        return packMessages([self.decrypt_sector(sector, ciphertext)
+            for ciphertext, sector in zip(ciphertexts, sectors)])
+
+    def read_sectors(self, image, firstSector, count=1):
+        '''
+        The read_sectors constructor reads count sectors from firstSector of
+        the encrypted image, an open binary file, and returns their
+        plaintext. Only the bytes of those sectors are read, a last sector
+        cut short by the end of the image is decrypted as it is.
+        '''
+        image.seek(firstSector * self.sectorSize)
+        ciphertext = image.read(count * self.sectorSize)
+        if (len(ciphertext) == 0):
+            raise ValueError('The sectors are past the end of the image.')
+        return self.decrypt_sectors(firstSector, ciphertext)
+
+    def write_sectors(self, image, firstSector, plaintext):
+        '''
+        The write_sectors constructor encrypts the plaintext, whole sectors,
+        and writes it over the sectors from firstSector of the image, an
+        open binary file. The sectors around them are not read or written.
+        Returns the number of bytes written.
+        '''
+        if (len(plaintext) == 0 or len(plaintext) % self.sectorSize != 0):
+            raise ValueError('Only whole sectors can be written.')
+        ciphertext = self.encrypt_sectors(firstSector, plaintext)
+        image.seek(firstSector * self.sectorSize)
+        image.write(ciphertext)
+        return len(ciphertext)
+
+    def encryptor(self):
+        '''
+        XTS has no stream object: a tweak belongs to a sector number, not to
+        a place in a message, so the data must come as whole sectors. Raises
+        TypeError, use encrypt_sectors or write_sectors instead.
+        '''
+        raise TypeError('XTS only works on whole sectors, see '
+                        'encrypt_sectors.')
+
+    def decryptor(self):
+        '''
+        Raises TypeError like encryptor, use decrypt_sectors or read_sectors
+        instead.
+        '''
+        raise TypeError('XTS only works on whole sectors, see '
+                        'decrypt_sectors.')
@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import asyncio
+from .fileio import modeStream
+'''
+asyncio counterparts of the mode calls, for running the ciphers inside event
+loops without stalling them. Python 3 only, the mode classes import this
+module when encrypt_async or decrypt_async is called.
+
+Payloads shorter than threshold bytes are processed inline on the event
+loop, where handing them to a thread would cost more than the AES work.
+Longer payloads run on executor, the default executor of the loop unless
+one is given. The cipher contexts are cached per thread (see
+blocks/cache.py), so the executor threads do not share backend state.
+
+The stream wrappers run a mode's update/finalize stream (see
+blocks/stream.py) over an asyncio StreamReader or StreamWriter a chunk at a
+time. Every write waits on drain(), so a slow peer holds back the reading
+side instead of letting output pile up in memory.
+'''
+
+# Payloads up to this many bytes are processed on the event loop
+inlineThreshold = 1 << 16
+
+# Bytes read from a StreamReader per chunk
+defaultChunkSize = 1 << 20
+
+# The loop of the running coroutine, get_event_loop is deprecated there
+# from Python 3.7 on
+getRunningLoop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+async def cryptAsync(function, data, executor=None, threshold=None):
+    '''
+    Returns function(data), called inline when data is shorter than
+    threshold bytes (inlineThreshold by default), else on executor.
+    '''
+    if (threshold is None):
+        threshold = inlineThreshold
+    if (len(data) < threshold):
+        return function(data)
+    loop = getRunningLoop()
+    return await loop.run_in_executor(executor, function, data)
+
+
+class CryptWriter(object):
+    '''
+    This class is used to write through an update/finalize stream to an
+    asyncio StreamWriter. write(data) sends the output of every completed
+    block and waits for the writer to drain, finalize() sends the rest.
+    '''
+    def __init__(self, writer, stream, executor=None, threshold=None):
+        '''
+        This constructor takes the StreamWriter, the stream returned by
+        mode.encryptor() or mode.decryptor(), and the executor and
+        threshold used for each chunk.
+        '''
+        self.writer = writer
+        self.stream = stream
+        self.executor = executor
+        self.threshold = threshold
+
+    async def write(self, data):
+        '''
+        Processes data and writes the output, waiting for the writer to
+        drain before returning.
+        '''
+        output = await cryptAsync(self.stream.update, data, self.executor,
+                self.threshold)
+        if (output):
+            self.writer.write(output)
+        await self.writer.drain()
+
+    async def finalize(self):
+        '''
+        Ends the stream and writes the last of the output.
+        '''
+        output = self.stream.finalize()
+        if (output):
+            self.writer.write(output)
+        await self.writer.drain()
+
+    async def close(self):
+        '''
+        Finalizes the stream and closes the writer.
+        '''
+        await self.finalize()
+        self.writer.close()
+        if (hasattr(self.writer, 'wait_closed')):
+            await self.writer.wait_closed()
+
+
+class CryptReader(object):
+    '''
+    This class is used to read through an update/finalize stream from an
+    asyncio StreamReader. read() returns the output of the next chunk, and
+    an empty string once the reader is at EOF and the stream is finalized.
+    Also usable with async for.
+    '''
+    def __init__(self, reader, stream, chunkSize=None, executor=None,
+            threshold=None):
+        '''
+        This constructor takes the StreamReader, the stream returned by
+        mode.encryptor() or mode.decryptor(), the bytes read per chunk and
+        the executor and threshold used for each chunk.
+        '''
+        self.reader = reader
+        self.stream = stream
+        self.chunkSize = chunkSize or defaultChunkSize
+        self.executor = executor
+        self.threshold = threshold
+        self._done = False
+
+    async def read(self):
+        '''
+        Reads the next chunk and returns its output, which may be empty
+        while a block is being completed.
+        '''
+        if (self._done):
+            return b''
+        data = await self.reader.read(self.chunkSize)
+        if (not data):
+            self._done = True
+            return self.stream.finalize()
+        return await cryptAsync(self.stream.update, data, self.executor,
+                self.threshold)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while (not self._done):
+            output = await self.read()
+            if (output):
+                return output
+        raise StopAsyncIteration
+
+
+async def cryptStream(reader, writer, stream, chunkSize, executor,
+        threshold):
+    '''
+    Pumps reader through stream into writer a chunk at a time. Returns the
+    number of bytes written.
+    '''
+    source = CryptReader(reader, stream, chunkSize, executor, threshold)
+    written = 0
+    async for output in source:
+        writer.write(output)
+        written += len(output)
+        # Backpressure, the next chunk is only read once the writer drained
+        await writer.drain()
+    return written
+
+
+async def encrypt_stream(mode, reader, writer, chunkSize=None, executor=None,
+        threshold=None):
+    '''
+    Encrypts everything read from the StreamReader into the StreamWriter
+    with an instance of one of the mode classes. The output matches
+    mode.encrypt of the whole input. Returns the number of bytes written.
+    '''
+    return await cryptStream(reader, writer, modeStream(mode, False),
+            chunkSize, executor, threshold)
+
+
+async def decrypt_stream(mode, reader, writer, chunkSize=None, executor=None,
+        threshold=None):
+    '''
+    Decrypts everything read from the StreamReader into the StreamWriter,
+    the reverse of encrypt_stream. A GCM tag that does not match raises
+    ValueError once the input ends.
+    '''
+    return await cryptStream(reader, writer, modeStream(mode, True),
+            chunkSize, executor, threshold)
@@ -0,0 +1,314 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import os
+import platform
+import threading
+from collections import OrderedDict
+from timeit import default_timer
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+from . import aesTable
+try:
+    # OFB and CFB moved out of the main modes in newer python cryptography
+    from cryptography.hazmat.decrepit.ciphers import modes as decrepitModes
+except ImportError:
+    decrepitModes = modes
+'''
+The AES backends the mode classes are built on. A backend supplies the ECB
+contexts every mode uses (see blocks/cache.py), and may also take over a
+whole mode of operation. The registered backends are:
+
+    cryptography   python cryptography ECB, the modes chain the blocks
+    native         python cryptography ECB, and the chained single message
+                   calls of CBC, CTR, OFB and CFB8/CFB128 are handed to the
+                   matching python cryptography mode
+    numpy          the table driven core of blocks/aesTable.py, only
+                   available when numpy is installed
+
+A mode built with backend='auto' uses the fastest backend for its mode of
+operation on this host. The choice comes from probe(), which times every
+available backend on a short message. It runs the first time an 'auto' mode
+needs a context, and the result is saved to cachePath so later processes
+start without probing again.
+'''
+
+# Bytes encrypted and decrypted per timed probe call, and calls per backend
+probeBytes = 2048
+probeRepeat = 3
+
+# The layout of the saved probe results, bumped whenever the probe changes
+# so that results saved by an older probe are not trusted
+cacheFormat = 2
+
+# Where the probe results are kept between processes
+cachePath = os.environ.get('AESBLOCKS_BACKEND_CACHE', os.path.join(
+    os.path.expanduser('~'), '.cache', 'aesblocks', 'backends.json'))
+
+
+class aesBackend(object):
+    '''
+    This class is the base of the backends. cipher(key) returns an object
+    whose encryptor() and decryptor() give ECB contexts with update and
+    update_into. modeContext returns a context running a whole mode of
+    operation, or None when the backend leaves the chaining to the mode
+    classes.
+    '''
+    name = None
+
+    def available(self):
+        '''
+        Returns whether the backend can be used on this host.
+        '''
+        return True
+
+    def cipher(self, key):
+        raise NotImplementedError
+
+    def modeContext(self, mode, direction):
+        '''
+        Returns a context running the mode of operation of mode, for the key
+        and IV of mode, or None.
+        '''
+        return None
+
+
+class cryptographyBackend(aesBackend):
+    '''
+    python cryptography ECB.
+    '''
+    name = 'cryptography'
+
+    def cipher(self, key):
+        return Cipher(algorithms.AES(key), modes.ECB(),
+                backend = default_backend())
+
+
+class nativeBackend(cryptographyBackend):
+    '''
+    python cryptography ECB, with the chained modes delegated to python
+    cryptography as well.
+    '''
+    name = 'native'
+
+    def nativeMode(self, mode):
+        '''
+        Returns the python cryptography mode object matching mode, or None
+        when there is none (CFB with a segment size other than 8 or 128).
+        '''
+        modeName = mode.modeName
+        if (modeName == 'cbc'):
+            return modes.CBC(mode.iv)
+        if (modeName == 'ctr'):
+            return modes.CTR(mode.iv)
+        if (modeName == 'ofb'):
+            return decrepitModes.OFB(mode.iv)
+        if (modeName == 'cfb' and mode.segmentSize == 8):
+            return decrepitModes.CFB8(mode.iv)
+        if (modeName == 'cfb' and mode.segmentSize == 128):
+            return decrepitModes.CFB(mode.iv)
+        return None
+
+    def modeContext(self, mode, direction):
+        nativeMode = self.nativeMode(mode)
+        if (nativeMode is None):
+            return None
+        cipher = Cipher(algorithms.AES(mode.key), nativeMode,
+                backend = default_backend())
+        if (direction == 'encrypt'):
+            return cipher.encryptor()
+        return cipher.decryptor()
+
+
+class numpyBackend(aesBackend):
+    '''
+    The table driven AES core of blocks/aesTable.py.
+    '''
+    name = 'numpy'
+
+    def available(self):
+        return aesTable.available()
+
+    def cipher(self, key):
+        return aesTable.tableCipher(key)
+
+
+# The registered backends by name
+backends = OrderedDict()
+
+
+def register(backend):
+    '''
+    Adds an aesBackend instance to the registry, replacing any backend of
+    the same name.
+    '''
+    backends[backend.name] = backend
+
+
+def backendNames():
+    '''
+    Returns the names a mode can be built with: the registered backends and
+    auto.
+    '''
+    return list(backends) + ['auto']
+
+
+def getBackend(name):
+    '''
+    Returns the registered backend with the given name.
+    '''
+    if (name not in backends):
+        raise ValueError('Unknown backend %s, use one of %s.' % (
+            name, ', '.join(backendNames())))
+    return backends[name]
+
+
+def checkBackend(name):
+    '''
+    Raises ValueError when name is not a backend a mode can be built with:
+    unknown, or registered but not available on this host.
+    '''
+    if (name == 'auto'):
+        return
+    if (not getBackend(name).available()):
+        raise ValueError('The %s backend is not available on this host.' %
+                         name)
+
+
+register(cryptographyBackend())
+register(nativeBackend())
+register(numpyBackend())
+
+
+def probe():
+    '''
+    Times every available backend with every mode of operation, encrypting
+    and decrypting probeBytes bytes probeRepeat times. Returns the fastest
+    backend name for each mode of operation.
+    '''
+    from .aesECB import ECBMode
+    from .aesCBC import CBCMode
+    from .aesCTR import CTRMode
+    from .aesOFB import OFBMode
+    from .aesCFB import CFBMode
+    from .cache import contextCache
+    from .keystream import ofbCache
+    key = os.urandom(16)
+    iv = os.urandom(16)
+    data = os.urandom(probeBytes)
+    modeClasses = {
+        'ecb': lambda backend: ECBMode(key, backend=backend),
+        'cbc': lambda backend: CBCMode(key, iv, backend=backend),
+        'ctr': lambda backend: CTRMode(key, iv, backend=backend),
+        'ofb': lambda backend: OFBMode(key, iv, backend=backend),
+        'cfb': lambda backend: CFBMode(key, iv, backend=backend),
+    }
+    choices = {}
+    for modeName in sorted(modeClasses):
+        timings = []
+        for name in backends:
+            if (not backends[name].available()):
+                continue
+            mode = modeClasses[modeName](name)
+            # The first call builds the contexts, it is not timed
+            mode.decrypt(mode.encrypt(data))
+            best = None
+            for i in range(0, probeRepeat):
+                start = default_timer()
+                mode.decrypt(mode.encrypt(data))
+                elapsed = default_timer() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append((best, name))
+        choices[modeName] = min(timings)[1]
+    contextCache.invalidate(key)
+    ofbCache.invalidate(key)
+    return choices
+
+
+def hostKey():
+    '''
+    Returns what the saved probe results are only valid for: the format of
+    the results, the Python version, the platform and the available
+    backends.
+    '''
+    return {
+        'format': cacheFormat,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backends': [name for name in backends if backends[name].available()],
+    }
+
+
+def loadChoices(path):
+    '''
+    Returns the saved probe results at path, or None when there are none
+    for this host.
+    '''
+    try:
+        with open(path) as cacheFile:
+            saved = json.load(cacheFile)
+    except (IOError, OSError, ValueError):
+        return None
+    if (not isinstance(saved, dict) or saved.get('host') != hostKey()):
+        return None
+    choices = saved.get('choices')
+    if (not isinstance(choices, dict)):
+        return None
+    for name in choices.values():
+        if (name not in backends):
+            return None
+    return choices
+
+
+def saveChoices(path, choices):
+    '''
+    Writes the probe results to path. Failing to write is not an error, the
+    probe then runs again in the next process.
+    '''
+    try:
+        directory = os.path.dirname(path)
+        if (directory and not os.path.isdir(directory)):
+            os.makedirs(directory)
+        temporary = '%s.%d' % (path, os.getpid())
+        with open(temporary, 'w') as cacheFile:
+            json.dump({'host': hostKey(), 'choices': choices}, cacheFile,
+                    indent=2, sort_keys=True)
+        os.rename(temporary, path)
+    except (IOError, OSError):
+        pass
+
+
+# The backend picked for each mode of operation, filled on first use
+_choices = None
+_choicesLock = threading.Lock()
+
+
+def selectBackends(path=None, refresh=False):
+    '''
+    Returns the fastest backend name for each mode of operation. The saved
+    results at path (cachePath by default) are used when they match this
+    host, otherwise probe() runs and its results are saved. refresh probes
+    again regardless.
+    '''
+    global _choices
+    if (path is None):
+        path = cachePath
+    with _choicesLock:
+        if (_choices is not None and not refresh):
+            return _choices
+        choices = None if refresh else loadChoices(path)
+        if (choices is None):
+            choices = probe()
+            saveChoices(path, choices)
+        _choices = choices
+        return choices
+
+
+def resolve(name, modeName):
+    '''
+    Returns the backend name a mode of operation runs on: name itself, or
+    the probed choice when name is auto.
+    '''
+    if (name != 'auto'):
+        return name
+    return selectBackends().get(modeName, 'cryptography')
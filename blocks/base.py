@@ -0,0 +1,344 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+from .batch import checkIvs, padMessages, packCiphertexts, stealMessages, \
+        unPadMessages
+from .backends import checkBackend, getBackend, resolve
+from .cache import contextCache
+from .chunk import blockView
+from .compat import asBytes, byteView, outputView, writeInto
+from .padding import getPadding
+'''
+The base class of the mode classes. It owns everything the modes have in
+common: key, IV and padding validation, the cached backend contexts, padding
+and viewing the plaintext as blocks, validating the ciphertext, unpadding,
+the batch calls, the streams and the asyncio calls.
+
+Plaintexts, ciphertexts, keys and IVs can be any buffer: bytes, bytearray,
+memoryview and so on. The calls return bytes, or write into a caller
+supplied bytearray with encrypt_into and decrypt_into.
+
+A mode only supplies its chaining kernel:
+
+    encryptBlocks(blocks)   encrypts a blockView of the padded plaintext
+    decryptBlocks(blocks)   decrypts a blockView of the ciphertext
+    encryptMany(buffer, lengths, ivs)
+    decryptMany(buffer, lengths, ivs)
+                            the same for a batch of messages packed back to
+                            back in buffer, returning a batchResult
+
+encryptBlocks and decryptBlocks return the output as a list of strings, so a
+large message is never joined more than once and only the last piece has to
+be looked at for padding.
+'''
+
+
+class blockMode(object):
+    '''
+    This class holds the pipeline shared by the mode classes. blockAligned
+    is set for the modes that only process whole blocks (ECB and CBC),
+    usesIv is cleared for the modes without an IV (ECB). encryptStream and
+    decryptStream are the stream classes returned by encryptor() and
+    decryptor(), see blocks/stream.py. modeName is the mode of operation
+    the backends know the mode by.
+
+    backend names the AES backend the mode runs on, see blocks/backends.py:
+    python cryptography by default, native, numpy, or auto for the fastest
+    one on this host.
+    '''
+    # Largest run of bytes handed to the backend in one update call, must be
+    # a multiple of the 16 byte block size
+    slabSize = 1 << 20
+    blockAligned = True
+    usesIv = True
+    modeName = None
+    encryptStream = None
+    decryptStream = None
+
+    # Input validation for the key
+    @property
+    def key(self):
+        return self._key
+
+    @key.setter
+    def key(self, key):
+        if (len(key) not in [16, 24, 32]):
+            raise Exception('The key must be 16, 24, or 32 bytes long.')
+        # Held as bytes, the key is part of the cache keys
+        key = asBytes(key)
+        # Drop the cached contexts of a key that is being replaced
+        if (getattr(self, '_key', key) != key):
+            self.dropKey(self._key)
+        self._key = key
+
+    def dropKey(self, key):
+        '''
+        Drops everything cached for a key that is no longer used.
+        '''
+        contextCache.invalidate(key)
+
+    # Input validation for the IV
+    @property
+    def iv(self):
+        return self._iv
+
+    @iv.setter
+    def iv(self, iv):
+        if (len(iv) != 16):
+            raise Exception('The iv must be 16 bytes long.')
+        self._iv = asBytes(iv)
+
+    # Input validation for the AES backend
+    @property
+    def backend(self):
+        return getattr(self, '_backend', 'cryptography')
+
+    @backend.setter
+    def backend(self, backend):
+        checkBackend(backend)
+        self._backend = backend
+
+    def backendName(self):
+        '''
+        Returns the name of the backend the mode runs on, with auto resolved
+        to the backend picked for the mode of operation.
+        '''
+        return resolve(self.backend, self.modeName)
+
+    def nativeContext(self, direction):
+        '''
+        Returns a context of the backend running the whole mode of operation
+        for the key and IV, direction being 'encrypt' or 'decrypt', or None
+        when the chaining is left to the mode. See the native backend.
+        '''
+        return getBackend(self.backendName()).modeContext(self, direction)
+
+    # Input validation for the padding scheme
+    @property
+    def padding(self):
+        return self._padding
+
+    @padding.setter
+    def padding(self, padding):
+        padding = getPadding(padding)
+        if (padding.stealing and not self.blockAligned):
+            raise ValueError(
+                    'Ciphertext stealing is only used by ECB and CBC.')
+        self._padding = padding
+
+    def getEncryptor(self):
+        '''
+        Returns the cached ECB encryptor of the backend for the key.
+        '''
+        return contextCache.getEncryptor(self.key, self.backendName())
+
+    def getDecryptor(self):
+        '''
+        Returns the cached ECB decryptor of the backend for the key.
+        '''
+        return contextCache.getDecryptor(self.key, self.backendName())
+
+    def cryptSlabs(self, context, blocks):
+        '''
+        Runs the blocks of a blockView through a backend context in slabs
+        of slabSize bytes, without copying them. Returns the list of outputs.
+        '''
+        return [context.update(slab)
+                for slab in blocks.slabs(self.slabSize // 16)]
+
+    def cryptSlabsInto(self, context, blocks, output):
+        '''
+        Runs the blocks through a backend context like cryptSlabs, writing
+        straight into the buffer output with update_into. The backend wants
+        room for one more block than it writes, so a slab without that room
+        at the end of output is copied in instead. Returns the number of
+        bytes written.
+        '''
+        length = blocks.byteLength()
+        view = outputView(output, length)
+        position = 0
+        for slab in blocks.slabs(self.slabSize // 16):
+            if (position + len(slab) + 15 <= len(view)):
+                context.update_into(slab, view[position:])
+            else:
+                view[position:position + len(slab)] = context.update(slab)
+            position += len(slab)
+        return length
+
+    def pad(self, data):
+        '''
+        This constructor takes in the short tail block that needs to be
+        padded. Calls the padding scheme of the mode, see block/padding.py,
+        and returns the padded string. The block aligned modes can only
+        encrypt whole blocks, so none and cts raise ValueError there.
+        '''
+        if (self.blockAligned):
+            return self.padding.padBlock(data)
+        return self.padding.pad(data)
+
+    def unPad(self, data):
+        '''
+        This constructor takes in the padded string that needs to be unpadded
+        by the receiver of the message. Only the last block is checked, so
+        the whole plaintext can be passed. Data without valid padding is
+        returned unchanged.
+        '''
+        return self.padding.unPad(data)
+
+    def preProcess(self, data):
+        '''
+        The preProcess constructor takes the plaintext and pads the short
+        tail block if needed. Returns a blockView over the plaintext, the
+        blocks are not copied.
+        '''
+        view = byteView(data)
+        if (len(view) == 0):
+            raise ValueError('Plaintext string can not be empty')
+        aligned = len(view) - len(view) % 16
+        if (aligned == len(view)):
+            return blockView(view)
+        return blockView(view[:aligned], self.pad(view[aligned:].tobytes()))
+
+    def postProcess(self, data):
+        '''
+        The postProcess constructor is used to validate the ciphertext.
+        Returns a blockView over the ciphertext.
+        '''
+        data = byteView(data)
+        # Without padding a keystream ciphertext can be shorter than a block
+        if (len(data) == 0 or (len(data) < 16 and self.padding.padsTail) or
+                (self.blockAligned and len(data) % 16 != 0)):
+            raise ValueError('Invalid ciphertext byte length.')
+        return blockView(data)
+
+    def encrypt(self, plaintext):
+        '''
+        The encrypt constructor takes the plaintext string and sends it to
+        preProcess, which pads only the short tail block, then to the
+        chaining kernel of the mode. Returns a ciphertext string.
+        '''
+        if (self.padding.stealing and len(byteView(plaintext)) % 16 != 0):
+            return self.encryptStealing(plaintext)
+
+        # Send the plaintext string to be padded and viewed as blocks
+        plaintext = self.preProcess(plaintext)
+        return b''.join(self.encryptBlocks(plaintext))
+
+    def decrypt(self, ciphertext):
+        '''
+        The decrypt constructor takes the ciphertext string, sends it to
+        postProcess to be validated, then to the chaining kernel of the mode.
+        The last block is then unpadded. Returns a plaintext string.
+        '''
+        if (self.padding.stealing and len(byteView(ciphertext)) % 16 != 0):
+            return self.decryptStealing(ciphertext)
+
+        # Send the ciphertext string to be validated and viewed as blocks
+        ciphertext = self.postProcess(ciphertext)
+        plaintextList = self.decryptBlocks(ciphertext)
+
+        # Only the last block of the last piece can hold padding
+        plaintextList[-1] = self.unPad(plaintextList[-1])
+        return b''.join(plaintextList)
+
+    def encryptBlocksInto(self, blocks, output):
+        '''
+        Writes the output of encryptBlocks into the buffer output. Returns the
+        number of bytes written. The modes that can write straight into the
+        output override this.
+        '''
+        return writeInto(self.encryptBlocks(blocks), output)
+
+    def encrypt_into(self, plaintext, output):
+        '''
+        The encrypt_into constructor encrypts like encrypt, but writes the
+        ciphertext into the caller supplied bytearray (or writable memoryview)
+        output instead of returning it, so the pieces of a large message are
+        never joined. output must hold the padded ciphertext, ValueError is
+        raised before anything is written when it is too small. Returns the
+        number of bytes written.
+        '''
+        if (self.padding.stealing and len(byteView(plaintext)) % 16 != 0):
+            return writeInto([self.encryptStealing(plaintext)], output)
+        return self.encryptBlocksInto(self.preProcess(plaintext), output)
+
+    def decrypt_into(self, ciphertext, output):
+        '''
+        The decrypt_into constructor decrypts like decrypt, but writes the
+        unpadded plaintext into the caller supplied bytearray output. Returns
+        the number of bytes written, the length of the plaintext.
+        '''
+        if (self.padding.stealing and len(byteView(ciphertext)) % 16 != 0):
+            return writeInto([self.decryptStealing(ciphertext)], output)
+        plaintextList = self.decryptBlocks(self.postProcess(ciphertext))
+        plaintextList[-1] = self.unPad(plaintextList[-1])
+        return writeInto(plaintextList, output)
+
+    def batchIvs(self, messages, ivs):
+        '''
+        Returns one IV per message for the batch calls, see checkIvs in
+        blocks/batch.py. The modes without an IV get None.
+        '''
+        if (not self.usesIv):
+            return None
+        return checkIvs(self, messages, ivs)
+
+    def encrypt_many(self, messages, ivs=None):
+        '''
+        The encrypt_many constructor encrypts a sequence of independent
+        messages, each from its own IV (the IV of the mode when ivs is None,
+        ECB takes none). The padded messages are packed into one buffer for
+        the kernel of the mode. With ciphertext stealing the messages are
+        encrypted one at a time instead. Returns a batchResult, see
+        blocks/batch.py.
+        '''
+        ivs = self.batchIvs(messages, ivs)
+        if (self.padding.stealing):
+            return stealMessages(self, messages, ivs, False)
+        buffer, lengths = padMessages(self, messages)
+        return self.encryptMany(buffer, lengths, ivs)
+
+    def decrypt_many(self, ciphertexts, ivs=None):
+        '''
+        The decrypt_many constructor decrypts a sequence of ciphertexts packed
+        into one buffer, then unpads each message. Returns a batchResult.
+        '''
+        ivs = self.batchIvs(ciphertexts, ivs)
+        if (self.padding.stealing):
+            return stealMessages(self, ciphertexts, ivs, True)
+        buffer, lengths = packCiphertexts(ciphertexts, self.blockAligned,
+                16 if self.padding.padsTail else 1)
+        plaintext = self.decryptMany(buffer, lengths, ivs)
+        return unPadMessages(self, plaintext.buffer, lengths)
+
+    def encryptor(self):
+        '''
+        The encryptor constructor returns a stream object that encrypts the
+        message in pieces. Feed it with update(data) and end it with
+        finalize(), the joined output matches encrypt. See blocks/stream.py.
+        '''
+        return self.encryptStream(self)
+
+    def decryptor(self):
+        '''
+        The decryptor constructor returns a stream object that decrypts the
+        message in pieces with update(data) and finalize(), the joined output
+        matches decrypt.
+        '''
+        return self.decryptStream(self)
+
+    def encrypt_async(self, plaintext, executor=None, threshold=None):
+        '''
+        The encrypt_async constructor returns an awaitable of encrypt for
+        asyncio code. Plaintexts of threshold bytes or more are encrypted on
+        executor instead of the event loop. See blocks/aio.py, Python 3 only.
+        '''
+        from .aio import cryptAsync
+        return cryptAsync(self.encrypt, plaintext, executor, threshold)
+
+    def decrypt_async(self, ciphertext, executor=None, threshold=None):
+        '''
+        The decrypt_async constructor returns an awaitable of decrypt, see
+        encrypt_async.
+        '''
+        from .aio import cryptAsync
+        return cryptAsync(self.decrypt, ciphertext, executor, threshold)
@@ -0,0 +1,151 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import copy
+from .compat import asBytes, byteView, joinBytes
+'''
+Helpers for the encrypt_many and decrypt_many batch calls of the mode
+classes. The messages of a batch are packed back to back into one buffer so
+the AES work for all of them runs in as few backend calls as possible, and
+the results come back the same way, as offsets into one output buffer.
+'''
+
+
+class batchResult(object):
+    '''
+    This class is used to return the output of a batch call. buffer holds
+    every message back to back, offsets holds the (start, end) of each
+    message in buffer. Indexing and iteration return the messages.
+    '''
+    def __init__(self, buffer, offsets):
+        '''
+        This constructor takes the packed output buffer and the offsets of
+        the messages in it.
+        '''
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        '''
+        Returns message number index as a string.
+        '''
+        start, end = self.offsets[index]
+        return self.buffer[start:end]
+
+    def __iter__(self):
+        for start, end in self.offsets:
+            yield self.buffer[start:end]
+
+    def view(self, index):
+        '''
+        Returns message number index as a memoryview of the buffer, without
+        copying it.
+        '''
+        start, end = self.offsets[index]
+        return memoryview(self.buffer)[start:end]
+
+
+def offsetsOf(lengths):
+    '''
+    Returns the (start, end) offsets of messages of the given lengths packed
+    back to back.
+    '''
+    offsets = []
+    start = 0
+    for length in lengths:
+        offsets.append((start, start + length))
+        start += length
+    return offsets
+
+
+def packMessages(messages):
+    '''
+    Packs a list of strings into a batchResult.
+    '''
+    return batchResult(b''.join(messages),
+            offsetsOf([len(message) for message in messages]))
+
+
+def checkIvs(mode, messages, ivs):
+    '''
+    Returns one IV per message. With no ivs every message uses the IV of the
+    mode. Every IV must be 16 bytes long.
+    '''
+    if (ivs is None):
+        return [mode.iv] * len(messages)
+    ivs = list(ivs)
+    if (len(ivs) != len(messages)):
+        raise ValueError('There must be one iv per message.')
+    for iv in ivs:
+        if (len(iv) != 16):
+            raise Exception('The iv must be 16 bytes long.')
+    return [asBytes(iv) for iv in ivs]
+
+
+def padMessages(mode, messages):
+    '''
+    Pads the short tail block of every message with the pad of the mode and
+    packs them into one buffer. Returns the buffer and the padded lengths.
+    '''
+    pieces = []
+    lengths = []
+    for message in messages:
+        message = byteView(message)
+        if (len(message) == 0):
+            raise ValueError('Plaintext string can not be empty')
+        length = len(message) - len(message) % 16
+        pieces.append(message[:length])
+        if (length != len(message)):
+            tail = mode.pad(message[length:].tobytes())
+            pieces.append(tail)
+            length += len(tail)
+        lengths.append(length)
+    return joinBytes(pieces), lengths
+
+
+def stealMessages(mode, messages, ivs, decrypting):
+    '''
+    Runs a batch of a mode with ciphertext stealing one message at a time,
+    each through encrypt or decrypt of a copy of the mode holding its IV
+    (ivs is None for ECB). A stolen message ends in a short block that can
+    not be packed with the others. Returns a batchResult.
+    '''
+    mode = copy.copy(mode)
+    outputs = []
+    for i in range(0, len(messages)):
+        if (ivs is not None):
+            mode.iv = ivs[i]
+        if (decrypting):
+            outputs.append(mode.decrypt(messages[i]))
+        else:
+            outputs.append(mode.encrypt(messages[i]))
+    return packMessages(outputs)
+
+
+def packCiphertexts(ciphertexts, aligned, minimum=16):
+    '''
+    Validates the ciphertexts of a batch and packs them into one buffer.
+    aligned requires whole blocks, as ECB and CBC do. minimum is the
+    shortest valid ciphertext, a padded message takes at least one block.
+    Returns the buffer and the lengths.
+    '''
+    lengths = []
+    for ciphertext in ciphertexts:
+        if (len(ciphertext) < max(minimum, 1) or
+                (aligned and len(ciphertext) % 16 != 0)):
+            raise ValueError('Invalid ciphertext byte length.')
+        lengths.append(len(ciphertext))
+    return joinBytes(ciphertexts), lengths
+
+
+def unPadMessages(mode, buffer, lengths):
+    '''
+    Unpads every decrypted message packed in buffer and returns them as a
+    batchResult.
+    '''
+    messages = []
+    for start, end in offsetsOf(lengths):
+        messages.append(mode.unPad(buffer[start:end]))
+    return packMessages(messages)
@@ -0,0 +1,251 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from timeit import default_timer
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCFB import CFBMode, CFB128Mode
+from blocks.aesOFB import OFBMode
+from blocks.aesCTR import CTRMode
+'''
+Benchmark harness for the block modes. Every mode is timed encrypting and
+decrypting payloads of several sizes under 16, 24 and 32 byte keys. For each
+case the throughput (MB/s, 10**6 bytes), the per call latency percentiles and
+the peak memory of one call are recorded.
+
+Results are written as JSON so runs can be compared between releases, and
+plotted when matplotlib is installed. Run from the repository root:
+
+    python -m blocks.benchmark --sizes 1,1K,1M,256M --json out.json
+'''
+
+IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+
+modeClasses = {
+    'ECB': lambda key: ECBMode(key),
+    'CBC': lambda key: CBCMode(key, IV),
+    'CFB': lambda key: CFBMode(key, IV),
+    'CFB128': lambda key: CFB128Mode(key, IV),
+    'OFB': lambda key: OFBMode(key, IV),
+    'CTR': lambda key: CTRMode(key, IV),
+}
+
+defaultSizes = '1,16,1K,64K,1M,16M'
+sizeUnits = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def parseSize(text):
+    '''
+    Turns a size such as 512, 64K or 256M into a number of bytes.
+    '''
+    text = text.strip().upper()
+    if (text[-1:] in sizeUnits):
+        return int(text[:-1]) * sizeUnits[text[-1]]
+    return int(text)
+
+
+def percentile(values, fraction):
+    '''
+    Returns the value at the given fraction of the sorted values, using the
+    nearest rank.
+    '''
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peakMemory(function, data):
+    '''
+    Returns the peak memory in bytes of one call and where the number comes
+    from. tracemalloc measures the call itself, without it the peak resident
+    size of the whole process is reported.
+    '''
+    try:
+        import tracemalloc
+    except ImportError:
+        import resource
+        function(data)
+        maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, OS X bytes
+        if (sys.platform != 'darwin'):
+            maxRss *= 1024
+        return maxRss, 'maxrss'
+    tracemalloc.start()
+    try:
+        function(data)
+        return tracemalloc.get_traced_memory()[1], 'tracemalloc'
+    finally:
+        tracemalloc.stop()
+
+
+def timeCalls(function, data, repeat, minTime):
+    '''
+    Calls function(data) at least repeat times, and keeps going until minTime
+    seconds have been spent (at most 1000 calls). Returns the latency of
+    every call in seconds.
+    '''
+    latencies = []
+    spent = 0.0
+    while (len(latencies) < repeat or
+            (spent < minTime and len(latencies) < 1000)):
+        start = default_timer()
+        function(data)
+        latency = default_timer() - start
+        latencies.append(latency)
+        spent += latency
+    return latencies
+
+
+def benchmarkCase(modeName, operation, keySize, size, repeat, minTime):
+    '''
+    Times one mode, operation, key size and payload size. Returns a result
+    dictionary.
+    '''
+    mode = modeClasses[modeName](os.urandom(keySize))
+    data = os.urandom(size)
+    if (operation == 'encrypt'):
+        function = mode.encrypt
+    else:
+        function = mode.decrypt
+        data = mode.encrypt(data)
+    # Warm up the cipher context cache before timing
+    function(data)
+    latencies = timeCalls(function, data, repeat, minTime)
+    memory, memorySource = peakMemory(function, data)
+    return {
+        'mode': modeName,
+        'operation': operation,
+        'keySize': keySize,
+        'size': size,
+        'calls': len(latencies),
+        'throughputMBs': size * len(latencies) / max(sum(latencies), 1e-9)
+            / 1e6,
+        'latency': {
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+        },
+        'peakMemoryBytes': memory,
+        'memorySource': memorySource,
+    }
+
+
+def runBenchmark(modes, keySizes, sizes, repeat=5, minTime=0.2,
+        report=None):
+    '''
+    Runs every combination of mode, operation, key size and payload size.
+    report, when given, is called with each result as it completes. Returns
+    the results with the details of the host.
+    '''
+    results = []
+    for modeName in modes:
+        for operation in ['encrypt', 'decrypt']:
+            for keySize in keySizes:
+                for size in sizes:
+                    result = benchmarkCase(modeName, operation, keySize, size,
+                            repeat, minTime)
+                    results.append(result)
+                    if (report is not None):
+                        report(result)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results,
+    }
+
+
+def plotResults(benchmark, path):
+    '''
+    Plots throughput against payload size, one line per mode and one panel
+    per operation, for the largest key size that was run. Needs matplotlib.
+    '''
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as pyplot
+
+    results = benchmark['results']
+    keySize = max(result['keySize'] for result in results)
+    figure, axes = pyplot.subplots(1, 2, figsize=(12, 5), sharey=True)
+    for axis, operation in zip(axes, ['encrypt', 'decrypt']):
+        for modeName in sorted(set(result['mode'] for result in results)):
+            points = sorted((result['size'], result['throughputMBs'])
+                    for result in results
+                    if result['mode'] == modeName and
+                    result['operation'] == operation and
+                    result['keySize'] == keySize)
+            axis.plot([point[0] for point in points],
+                    [point[1] for point in points], marker='o',
+                    label=modeName)
+        axis.set_xscale('log')
+        axis.set_yscale('log')
+        axis.set_xlabel('Payload size (bytes)')
+        axis.set_title('%s, %d byte key' % (operation, keySize))
+        axis.grid(True)
+    axes[0].set_ylabel('Throughput (MB/s)')
+    axes[0].legend()
+    figure.tight_layout()
+    figure.savefig(path)
+
+
+def printResult(result):
+    '''
+    Prints one result as a line of text.
+    '''
+    print('%-6s %-8s key=%-3d size=%-10d %10.3f MB/s  p50=%.6fs '
+          'p99=%.6fs  peak=%d bytes' % (
+              result['mode'], result['operation'], result['keySize'],
+              result['size'], result['throughputMBs'],
+              result['latency']['p50'], result['latency']['p99'],
+              result['peakMemoryBytes']))
+
+
+def main(argv=None):
+    '''
+    Command line entry point.
+    '''
+    parser = argparse.ArgumentParser(
+            description='Benchmark the AES block modes.')
+    parser.add_argument('--modes', default='ECB,CBC,CFB,OFB,CTR',
+            help='Comma separated modes to run.')
+    parser.add_argument('--key-sizes', default='16,24,32',
+            help='Comma separated key sizes in bytes.')
+    parser.add_argument('--sizes', default=defaultSizes,
+            help='Comma separated payload sizes, K/M/G suffixes allowed.')
+    parser.add_argument('--repeat', type=int, default=5,
+            help='Minimum calls per case.')
+    parser.add_argument('--min-time', type=float, default=0.2,
+            help='Minimum seconds spent per case.')
+    parser.add_argument('--json', help='Write the results to this file.')
+    parser.add_argument('--plot', help='Plot the results to this image.')
+    arguments = parser.parse_args(argv)
+
+    modes = [name.strip().upper() for name in arguments.modes.split(',')]
+    for modeName in modes:
+        if (modeName not in modeClasses):
+            parser.error('Unknown mode %s' % modeName)
+    keySizes = [int(size) for size in arguments.key_sizes.split(',')]
+    sizes = [parseSize(size) for size in arguments.sizes.split(',')]
+
+    benchmark = runBenchmark(modes, keySizes, sizes, arguments.repeat,
+            arguments.min_time, printResult)
+    if (arguments.json):
+        with open(arguments.json, 'w') as jsonFile:
+            json.dump(benchmark, jsonFile, indent=2, sort_keys=True)
+    if (arguments.plot):
+        try:
+            plotResults(benchmark, arguments.plot)
+        except ImportError:
+            sys.stderr.write('matplotlib is not installed, no plot written\n')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
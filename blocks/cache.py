@@ -0,0 +1,140 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+from .backends import getBackend
+
+
+class cipherCache(object):
+    '''
+    This class is used to keep the python cryptography ECB contexts for a key
+    around between encrypt and decrypt calls. Building the Cipher and the
+    encryptor or decryptor costs more than encrypting a short message, so the
+    contexts are stored per key and evicted least recently used first once
+    maxSize keys are held.
+
+    ECB contexts carry no state between block aligned update calls, so they
+    can be reused as long as finalize is never called on them. OpenSSL
+    contexts are not safe to share across threads, so every thread gets its
+    own entry for a key. The contexts of every backend, and the tables the
+    modes derive from the key (see getTable), are kept in the same entry.
+    '''
+    def __init__(self, maxSize=64):
+        '''
+        This constructor initializes the cache size and the hit and miss
+        counters, kept apart for the contexts and the tables.
+        '''
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.tableHits = 0
+        self.tableMisses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Input validation for the cache size
+    @property
+    def maxSize(self):
+        return self._maxSize
+
+    @maxSize.setter
+    def maxSize(self, maxSize):
+        if (maxSize < 1):
+            raise ValueError('The cache must hold at least one key.')
+        self._maxSize = maxSize
+
+    def __len__(self):
+        return len(self._entries)
+
+    def getContext(self, key, direction, backend='cryptography'):
+        '''
+        The getContext constructor returns the cached ECB context for the key,
+        building it on a miss. direction is either 'encrypt' or 'decrypt',
+        backend the name of a registered backend, see blocks/backends.py.
+        '''
+        entryKey = (key, threading.current_thread().ident)
+        with self._lock:
+            entry = self._entries.pop(entryKey, None)
+            if (entry is None):
+                entry = {}
+            self._entries[entryKey] = entry
+            if ((backend, direction) in entry):
+                self.hits += 1
+                return entry[(backend, direction)]
+            self.misses += 1
+            while (len(self._entries) > self.maxSize):
+                self._entries.popitem(last=False)
+
+        # Initilize the ECB mode of the backend
+        cipher = getBackend(backend).cipher(key)
+        if (direction == 'encrypt'):
+            context = cipher.encryptor()
+        elif (direction == 'decrypt'):
+            context = cipher.decryptor()
+        else:
+            raise ValueError('Direction must be encrypt or decrypt.')
+        entry[(backend, direction)] = context
+        return context
+
+    def getTable(self, key, name, build, backend='cryptography'):
+        '''
+        The getTable constructor returns a table derived from the key, such
+        as the GHASH multiplication tables of GCM, kept in the entry of the
+        key next to its contexts. build() is called to make it on a miss.
+        The lookups are counted in tableHits and tableMisses.
+        '''
+        entryKey = (key, threading.current_thread().ident)
+        with self._lock:
+            entry = self._entries.get(entryKey)
+            if (entry is not None and (backend, name) in entry):
+                self.tableHits += 1
+                return entry[(backend, name)]
+            self.tableMisses += 1
+        table = build()
+        with self._lock:
+            # build may have made the entry, or it may have been evicted
+            entry = self._entries.pop(entryKey, None)
+            if (entry is None):
+                entry = {}
+            self._entries[entryKey] = entry
+            entry[(backend, name)] = table
+            while (len(self._entries) > self.maxSize):
+                self._entries.popitem(last=False)
+        return table
+
+    def getEncryptor(self, key, backend='cryptography'):
+        '''
+        Returns the cached ECB encryptor for the key.
+        '''
+        return self.getContext(key, 'encrypt', backend)
+
+    def getDecryptor(self, key, backend='cryptography'):
+        '''
+        Returns the cached ECB decryptor for the key.
+        '''
+        return self.getContext(key, 'decrypt', backend)
+
+    def invalidate(self, key):
+        '''
+        The invalidate constructor drops every context built for the key, in
+        all threads.
+        '''
+        with self._lock:
+            for entryKey in list(self._entries):
+                if (entryKey[0] == key):
+                    del self._entries[entryKey]
+
+    def clear(self):
+        '''
+        Drops every cached context and resets the counters.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.tableHits = 0
+            self.tableMisses = 0
+
+
+# Shared by all of the mode classes
+contextCache = cipherCache()
@@ -1,5 +1,6 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
+from .compat import byteView
 
 
 class chunkData():
@@ -25,3 +26,94 @@ class chunkData():
         self.chunkRaw = [self.rawStr[i:i+self.blockSize] 
                 for i in range(0, len(self.rawStr), self.blockSize)]
         return self.chunkRaw
+
+
+class blockView(object):
+    '''
+    This class is used to look at bytes, a bytearray, a memoryview or any
+    other buffer as a sequence of 16 byte blocks without copying it. Blocks
+    are memoryview slices of the input and can be reached by index or
+    iteration. The last block may be short.
+
+    A padded tail block, which can not be a view of the input, can be added
+    with tail. It becomes the last block and the input must then be block
+    aligned.
+    '''
+    def __init__(self, data, tail=None, blockSize=16):
+        '''
+        This constructor takes the data to be viewed, the optional padded
+        tail block and the block size.
+        '''
+        self.blockSize = blockSize
+        self.view = byteView(data)
+        self.tail = tail
+        if (tail is not None and len(self.view) % blockSize != 0):
+            raise ValueError('Data before a tail block must be aligned.')
+
+    def __len__(self):
+        '''
+        Returns the number of blocks.
+        '''
+        count = -(-len(self.view) // self.blockSize)
+        if (self.tail is not None):
+            count += 1
+        return count
+
+    def __getitem__(self, index):
+        '''
+        Returns block number index, negative indexes count from the end.
+        '''
+        count = len(self)
+        if (index < 0):
+            index += count
+        if (index < 0 or index >= count):
+            raise IndexError('Block index out of range.')
+        if (self.tail is not None and index == count - 1):
+            return memoryview(self.tail)
+        start = index * self.blockSize
+        return self.view[start:start + self.blockSize]
+
+    def __iter__(self):
+        for start in range(0, len(self.view), self.blockSize):
+            yield self.view[start:start + self.blockSize]
+        if (self.tail is not None):
+            yield memoryview(self.tail)
+
+    def __eq__(self, other):
+        '''
+        Compares the blocks with another sequence of blocks, such as the list
+        returned by chunkData.getChunk.
+        '''
+        try:
+            if (len(self) != len(other)):
+                return False
+        except TypeError:
+            return False
+        for block, otherBlock in zip(self, other):
+            if (block.tobytes() != memoryview(otherBlock).tobytes()):
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def byteLength(self):
+        '''
+        Returns the total length of the blocks in bytes.
+        '''
+        length = len(self.view)
+        if (self.tail is not None):
+            length += len(self.tail)
+        return length
+
+    def slabs(self, slabBlocks):
+        '''
+        The slabs constructor yields runs of up to slabBlocks consecutive
+        blocks as single memoryviews, for handing to the backend in bulk.
+        The tail block comes last as a slab of its own.
+        '''
+        slabSize = slabBlocks * self.blockSize
+        for start in range(0, len(self.view), slabSize):
+            yield self.view[start:start + slabSize]
+        if (self.tail is not None):
+            yield memoryview(self.tail)
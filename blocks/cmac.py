@@ -0,0 +1,215 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import copy
+import hmac
+from .aesCBC import CBCMode
+from .backends import checkBackend, resolve
+from .batch import packMessages
+from .cache import contextCache
+from .compat import asBytes, byteView, bytesToInt, intToBytes
+from .multistream import CBCMultiStream
+from .xor import xorData
+'''
+AES-CMAC (NIST 800-38B, RFC 4493), the CBC-MAC of a message whose last
+block is xored with one of two subkeys derived from the key: K1 when the
+message ends on a whole block, K2 after it is padded with a 1 bit and zero
+bits. Unlike plain CBC-MAC it is safe for messages of any length.
+
+The chain is CBC encryption with a zero IV on the ECB contexts of the
+backend, of which only the last block is kept. A single message is fed in
+pieces through CMAC.stream(). mac_many runs the chains of many messages in
+lockstep with CBCMultiStream, one backend call per round for all of them,
+see blocks/multistream.py. The subkeys are computed once per key and kept
+in the context cache next to the ECB contexts.
+'''
+
+# The zero block, the IV of the chain and the input of the subkeys
+zeroBlock = b'\x00' * 16
+
+
+def doubleBlock(block):
+    '''
+    Returns the 16 byte block multiplied by x in GF(2^128), the shift left
+    and reduction of 800-38B.
+    '''
+    value = bytesToInt(block) << 1
+    if (value >> 128):
+        value ^= (1 << 128) | 0x87
+    return intToBytes(value, 16)
+
+
+class CMAC(object):
+    '''
+    This class is used to compute and check AES-CMAC tags for a key.
+    Educational purposes only.
+    '''
+    def __init__(self, key, backend='cryptography'):
+        '''
+        This constructor initilizes the key and the AES backend. The key can
+        be 16, 24, or 32 bytes long. backend is a name from
+        blocks/backends.py: cryptography, native, numpy or auto.
+        '''
+        if (len(key) not in [16, 24, 32]):
+            raise Exception('The key must be 16, 24, or 32 bytes long.')
+        checkBackend(backend)
+        self.key = asBytes(key)
+        self.backend = backend
+
+    def backendName(self):
+        '''
+        Returns the name of the backend. CMAC is a CBC chain, auto uses the
+        backend picked for CBC.
+        '''
+        return resolve(self.backend, 'cbc')
+
+    def buildSubkeys(self):
+        '''
+        Builds the subkeys K1 and K2 from the encryption of the zero block.
+        '''
+        encryptor = contextCache.getEncryptor(self.key, self.backendName())
+        k1 = doubleBlock(encryptor.update(zeroBlock))
+        return k1, doubleBlock(k1)
+
+    def subkeys(self):
+        '''
+        Returns the subkeys (K1, K2) of the key, cached with its contexts.
+        '''
+        return contextCache.getTable(self.key, 'cmac', self.buildSubkeys,
+                self.backendName())
+
+    def lastBlock(self, tail):
+        '''
+        Returns the last block of a message to chain: a whole block xored
+        with K1, or a short one (empty for an empty message) padded with
+        0x80 and zero bytes and xored with K2.
+        '''
+        k1, k2 = self.subkeys()
+        if (len(tail) == 16):
+            return xorData(tail, k1).getXor()
+        padded = asBytes(tail) + b'\x80' + b'\x00' * (15 - len(tail))
+        return xorData(padded, k2).getXor()
+
+    def split(self, message):
+        '''
+        Returns the block aligned front of a message, a view without
+        copying, and its last block ready to chain.
+        '''
+        view = byteView(message)
+        split = max(0, (len(view) - 1) // 16 * 16)
+        return view[:split], self.lastBlock(view[split:])
+
+    def chain(self, chainValue, blocks):
+        '''
+        Runs block aligned data through the CBC chain from chainValue and
+        returns the new chain value, the last ciphertext block.
+        '''
+        if (len(blocks) == 0):
+            return chainValue
+        mode = CBCMode(self.key, chainValue, 'none', self.backendName())
+        return mode.encrypt(blocks)[-16:]
+
+    def mac(self, message):
+        '''
+        The mac constructor returns the 16 byte tag of the message.
+        '''
+        front, last = self.split(message)
+        return self.chain(self.chain(zeroBlock, front), last)
+
+    def verify(self, message, tag):
+        '''
+        The verify constructor raises ValueError when tag is not the tag of
+        the message. The comparison takes the same time wherever they
+        differ.
+        '''
+        if (not hmac.compare_digest(self.mac(message), asBytes(tag))):
+            raise ValueError('The authentication tag does not match.')
+
+    def mac_many(self, messages):
+        '''
+        The mac_many constructor returns the tags of a sequence of
+        independent messages as a batchResult, see blocks/batch.py. The
+        chains of all messages advance in lockstep, each round encrypts the
+        next block of every message that still has one with a single
+        backend call.
+        '''
+        buffers = []
+        for message in messages:
+            front, last = self.split(message)
+            buffers.append(front.tobytes() + last)
+        multiStream = CBCMultiStream(self.key, [zeroBlock] * len(buffers),
+                padding='none', backend=self.backendName())
+        return packMessages(multiStream.lastBlocks(buffers))
+
+    def verify_many(self, messages, tags):
+        '''
+        The verify_many constructor checks a sequence of messages against
+        their tags with mac_many. Returns a list of booleans, True where the
+        tag matches.
+        '''
+        tags = list(tags)
+        if (len(tags) != len(messages)):
+            raise ValueError('There must be one tag per message.')
+        return [hmac.compare_digest(computed, asBytes(tag))
+                for computed, tag in zip(self.mac_many(messages), tags)]
+
+    def stream(self):
+        '''
+        The stream constructor returns a CMACStream that takes the message in
+        pieces.
+        '''
+        return CMACStream(self)
+
+
+class CMACStream(object):
+    '''
+    This class is used to compute the CMAC tag of a message fed in pieces
+    with update(data), ended with finalize() or verify(tag). Only the chain
+    value and the last block of input, which can not be chained until it is
+    known to be the last, are kept between calls.
+    '''
+    def __init__(self, cmac):
+        '''
+        This constructor takes the CMAC instance of the key.
+        '''
+        self.cmac = cmac
+        self._chainValue = zeroBlock
+        self._buffer = b''
+        self._finalized = False
+
+    def update(self, data):
+        '''
+        The update constructor chains every block of the message seen so far
+        but the last.
+        '''
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        buffered = self._buffer + asBytes(data)
+        split = max(0, (len(buffered) - 1) // 16 * 16)
+        self._chainValue = self.cmac.chain(self._chainValue,
+                buffered[:split])
+        self._buffer = buffered[split:]
+
+    def copy(self):
+        '''
+        Returns a copy of the stream, to take the tag of a prefix and go on
+        with the message.
+        '''
+        return copy.copy(self)
+
+    def finalize(self):
+        '''
+        The finalize constructor ends the stream and returns the tag.
+        '''
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        self._finalized = True
+        return self.cmac.chain(self._chainValue,
+                self.cmac.lastBlock(self._buffer))
+
+    def verify(self, tag):
+        '''
+        The verify constructor ends the stream and raises ValueError when
+        tag does not match.
+        '''
+        if (not hmac.compare_digest(self.finalize(), asBytes(tag))):
+            raise ValueError('The authentication tag does not match.')
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import sys
+from binascii import hexlify, unhexlify
+'''
+Helpers that let the modes run on Python 2 and Python 3. Every input can be
+any object with the buffer protocol: bytes (str on Python 2), bytearray,
+memoryview, or on Python 3 array.array and the like. The modes return bytes.
+'''
+
+PY3 = sys.version_info[0] >= 3
+
+
+def byteView(data):
+    '''
+    Returns a memoryview of data with one item per byte, without copying
+    it. On Python 3 a view of wider items, such as an array of ints, is
+    cast to bytes.
+    '''
+    view = memoryview(data)
+    if (PY3 and (view.format != 'B' or view.ndim != 1)):
+        view = view.cast('B')
+    return view
+
+
+def asBytes(data):
+    '''
+    Returns data as bytes. data is returned as it is when it already is
+    bytes, other buffers are copied once.
+    '''
+    if (isinstance(data, bytes)):
+        return data
+    return byteView(data).tobytes()
+
+
+def joinBytes(pieces):
+    '''
+    Joins a sequence of buffers into bytes. Python 3 joins any buffer
+    directly, Python 2 only joins strings.
+    '''
+    if (PY3):
+        return b''.join(pieces)
+    return b''.join([asBytes(piece) for piece in pieces])
+
+
+if (PY3):
+    def bytesToInt(data):
+        '''
+        Returns the big endian integer value of a buffer.
+        '''
+        return int.from_bytes(data, 'big')
+
+    def intToBytes(value, length):
+        '''
+        Returns value as length big endian bytes.
+        '''
+        return value.to_bytes(length, 'big')
+else:
+    def bytesToInt(data):
+        return int(hexlify(data), 16)
+
+    def intToBytes(value, length):
+        return unhexlify('%0*x' % (length * 2, value))
+
+
+def outputView(output, length, offset=0):
+    '''
+    Returns a byte view of the writable buffer output, such as a bytearray,
+    after checking that length bytes fit in it from offset.
+    '''
+    view = byteView(output)
+    if (view.readonly):
+        raise TypeError('The output buffer must be writable.')
+    if (offset < 0 or offset + length > len(view)):
+        raise ValueError('The output buffer is too small.')
+    return view
+
+
+def writeInto(pieces, output, offset=0):
+    '''
+    Copies a sequence of buffers into output one after the other starting
+    at offset. Raises ValueError when output is too small, before anything
+    is written. Returns the number of bytes written.
+    '''
+    length = sum([len(piece) for piece in pieces])
+    view = outputView(output, length, offset)
+    position = offset
+    for piece in pieces:
+        view[position:position + len(piece)] = piece
+        position += len(piece)
+    return length
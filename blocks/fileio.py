@@ -0,0 +1,209 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+from multiprocessing import cpu_count
+from .aesECB import ECBMode
+from .aesCTR import CTRMode
+from .aesGCM import GCMMode
+from .parallel import mapSegments
+from .xor import xorData
+'''
+Encrypts and decrypts files with the mode classes without reading the whole
+file into memory. The input is read into a fixed size buffer that is reused
+for every chunk, and the output goes through a second reusable buffer.
+
+ECB and CTR blocks are independent, so each chunk of those modes is split
+over a pool of worker threads (see blocks/parallel.py). ECB with ciphertext
+stealing, whose last two blocks depend on each other, and the chained modes
+and GCM run through their update/finalize streams (see blocks/stream.py). A
+GCM file is the ciphertext followed by the tag, and decrypt_file raises
+ValueError at the end of a file whose tag does not match; the plaintext
+written before then can not be trusted.
+
+The files written are byte identical to mode.encrypt and mode.decrypt of the
+whole file contents.
+'''
+
+
+def openFile(fileOrPath, fileMode):
+    '''
+    Returns an open file object and whether it was opened here. fileOrPath is
+    either a path or a file object that is already open in binary mode.
+    '''
+    if (hasattr(fileOrPath, 'read') or hasattr(fileOrPath, 'write')):
+        return fileOrPath, False
+    return open(fileOrPath, fileMode), True
+
+
+def readFull(source, buffer):
+    '''
+    Fills buffer from source, retrying short reads. Returns the number of
+    bytes read, which is less than len(buffer) only at the end of the file.
+    '''
+    view = memoryview(buffer)
+    total = 0
+    while (total < len(buffer)):
+        count = source.readinto(view[total:])
+        if (not count):
+            break
+        total += count
+    return total
+
+
+def cryptChunk(mode, data, outBuffer, offset, decrypting, workers):
+    '''
+    Runs a block aligned chunk of ECB or CTR data at byte offset of the file
+    through the mode and writes the result into outBuffer. The chunk is
+    split over the worker threads.
+    '''
+    segmentSize = max(16, -(-len(data) // workers // 16) * 16)
+    if (isinstance(mode, CTRMode)):
+        def cryptSegment(start, end):
+            xor = xorData(data[start:end],
+                    mode.keystream(offset + start, end - start))
+            xor.getXorInto(outBuffer, start)
+    else:
+        def cryptSegment(start, end):
+            if (decrypting):
+                context = mode.getDecryptor()
+            else:
+                context = mode.getEncryptor()
+            outBuffer[start:end] = context.update(data[start:end])
+    mapSegments(cryptSegment, len(data), segmentSize, workers)
+
+
+def encryptBlocks(mode, source, destination, bufferSize, workers):
+    '''
+    Encrypts a file with ECB or CTR mode, chunk by chunk in parallel. The
+    short tail block is padded like mode.encrypt does.
+    '''
+    inBuffer = bytearray(bufferSize)
+    outBuffer = bytearray(bufferSize)
+    offset = 0
+    while True:
+        count = readFull(source, inBuffer)
+        aligned = count - count % 16
+        cryptChunk(mode, memoryview(inBuffer)[:aligned], outBuffer, offset,
+                False, workers)
+        destination.write(memoryview(outBuffer)[:aligned])
+        offset += aligned
+        if (count < bufferSize):
+            break
+    if (offset + count == 0):
+        raise ValueError('Plaintext string can not be empty')
+    if (aligned != count):
+        shortBlock = mode.pad(bytes(inBuffer[aligned:count]))
+        cryptChunk(mode, shortBlock, outBuffer, offset, False, 1)
+        destination.write(memoryview(outBuffer)[:len(shortBlock)])
+
+
+def decryptBlocks(mode, source, destination, bufferSize, workers):
+    '''
+    Decrypts a file with ECB or CTR mode, chunk by chunk in parallel. One
+    chunk is read ahead so the last block can be unpadded.
+    '''
+    current = bytearray(bufferSize)
+    ahead = bytearray(bufferSize)
+    outBuffer = bytearray(bufferSize)
+    count = readFull(source, current)
+    # Without padding a CTR ciphertext can be shorter than a block
+    if (count == 0 or (count < 16 and mode.padding.padsTail) or
+            (isinstance(mode, ECBMode) and count % 16 != 0)):
+        raise ValueError('Invalid ciphertext byte length.')
+    offset = 0
+    while True:
+        nextCount = readFull(source, ahead) if count == bufferSize else 0
+        if (isinstance(mode, ECBMode) and nextCount % 16 != 0):
+            raise ValueError('Invalid ciphertext byte length.')
+        cryptChunk(mode, memoryview(current)[:count], outBuffer, offset,
+                True, workers)
+        if (nextCount == 0):
+            break
+        destination.write(memoryview(outBuffer)[:count])
+        offset += count
+        current, ahead = ahead, current
+        count = nextCount
+
+    # Only the last block of the file can hold padding
+    lastBlock = count - (count % 16 or 16)
+    destination.write(memoryview(outBuffer)[:lastBlock])
+    destination.write(mode.unPad(bytes(outBuffer[lastBlock:count])))
+
+
+def modeStream(mode, decrypting):
+    '''
+    Returns the update/finalize stream of the mode whose joined output
+    matches mode.encrypt or mode.decrypt of the whole input. A GCM
+    encryption returns the tag from finalize, a GCM decryption takes it
+    from the end of the input.
+    '''
+    if (decrypting):
+        return mode.decryptor()
+    if (isinstance(mode, GCMMode)):
+        return mode.encryptor(joined=True)
+    return mode.encryptor()
+
+
+def streamFile(stream, source, destination, bufferSize):
+    '''
+    Runs a file through an update/finalize stream of a chained mode.
+    '''
+    inBuffer = bytearray(bufferSize)
+    while True:
+        count = readFull(source, inBuffer)
+        if (count):
+            destination.write(stream.update(bytes(inBuffer[:count])))
+        if (count < bufferSize):
+            break
+    destination.write(stream.finalize())
+
+
+def processFile(mode, source, destination, bufferSize, workers, decrypting):
+    '''
+    Opens the files and picks the parallel chunk path for ECB and CTR or the
+    stream path for the other modes.
+    '''
+    if (bufferSize < 16 or bufferSize % 16 != 0):
+        raise ValueError('The buffer size must be a multiple of 16.')
+    if (workers is None):
+        workers = getattr(mode, 'workers', None) or cpu_count()
+    source, closeSource = openFile(source, 'rb')
+    try:
+        destination, closeDestination = openFile(destination, 'wb')
+        try:
+            if (isinstance(mode, (ECBMode, CTRMode)) and
+                    not mode.padding.stealing):
+                if (decrypting):
+                    decryptBlocks(mode, source, destination, bufferSize,
+                            workers)
+                else:
+                    encryptBlocks(mode, source, destination, bufferSize,
+                            workers)
+            else:
+                streamFile(modeStream(mode, decrypting), source,
+                        destination, bufferSize)
+        finally:
+            if (closeDestination):
+                destination.close()
+    finally:
+        if (closeSource):
+            source.close()
+
+
+def encrypt_file(mode, source, destination, bufferSize=1 << 20,
+        workers=None):
+    '''
+    Encrypts source into destination with an instance of one of the mode
+    classes. Both can be paths or binary file objects. bufferSize bytes are
+    read at a time, ECB and CTR chunks are split over workers threads (one
+    per core by default, or the workers of a parallel mode).
+    '''
+    processFile(mode, source, destination, bufferSize, workers, False)
+
+
+def decrypt_file(mode, source, destination, bufferSize=1 << 20,
+        workers=None):
+    '''
+    Decrypts source into destination with an instance of one of the mode
+    classes, the reverse of encrypt_file.
+    '''
+    processFile(mode, source, destination, bufferSize, workers, True)
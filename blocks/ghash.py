@@ -0,0 +1,118 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import struct
+from .compat import asBytes, bytesToInt, intToBytes
+'''
+GHASH, the universal hash GCM authenticates with (NIST 800-38D). Blocks are
+128 bit big endian integers, where the leftmost bit of the block is the
+coefficient of x^0. Multiplying by x is then a right shift, reduced by the
+field polynomial x^128 + x^7 + x^2 + x + 1 when a bit falls off the end.
+
+The multiplication by the hash key H uses the 8 bit tables of Shoup's
+method: one table of 256 entries per byte position of the block, entry b of
+table i being the product of H and b placed at byte i. A block times H is
+then the xor of 16 table lookups, without a shift or reduction per bit. The
+tables are built once per key, see GCMMode.hashTable in blocks/aesGCM.py.
+'''
+
+# x^128 reduced, as the right shift of the leftmost coefficient falls off
+reduction = 0xe1 << 120
+
+
+class ghashTable(object):
+    '''
+    This class is used to hold the multiplication tables of a hash key and
+    run whole blocks through GHASH.
+    '''
+    def __init__(self, hashKey):
+        '''
+        This constructor builds the 16 tables of 256 products for the 16 byte
+        hash key, the encryption of the zero block.
+        '''
+        if (len(hashKey) != 16):
+            raise ValueError('The hash key must be 16 bytes long.')
+        # H times x^j, for every bit j of a block
+        value = bytesToInt(hashKey)
+        powers = []
+        for j in range(0, 128):
+            powers.append(value)
+            value = (value >> 1) ^ (reduction if value & 1 else 0)
+        self.tables = []
+        for i in range(0, 16):
+            table = [0] * 256
+            for bit in range(0, 8):
+                table[0x80 >> bit] = powers[8 * i + bit]
+            # Every other entry is the xor of its lowest bit and the rest
+            for b in range(1, 256):
+                low = b & -b
+                if (low != b):
+                    table[b] = table[low] ^ table[b ^ low]
+            self.tables.append(table)
+        self.shifts = list(zip(self.tables, range(120, -8, -8)))
+
+    def multiply(self, value):
+        '''
+        Returns the 128 bit integer value multiplied by the hash key.
+        '''
+        result = 0
+        for table, shift in self.shifts:
+            result ^= table[(value >> shift) & 0xff]
+        return result
+
+    def update(self, value, data):
+        '''
+        The update constructor folds block aligned data into the running
+        hash value, a 128 bit integer, and returns the new value.
+        '''
+        if (len(data) % 16 != 0):
+            raise ValueError('The data must be a multiple of 16 bytes.')
+        words = struct.unpack('>%dQ' % (len(data) // 8), asBytes(data))
+        multiply = self.multiply
+        for i in range(0, len(words), 2):
+            value = multiply(value ^ ((words[i] << 64) | words[i + 1]))
+        return value
+
+
+class ghashState(object):
+    '''
+    This class is used to hash a message in pieces. The additional data and
+    the ciphertext are each zero padded to a whole block, digest appends
+    their bit lengths and returns the hash.
+    '''
+    def __init__(self, table):
+        '''
+        This constructor takes the ghashTable of the key.
+        '''
+        self.table = table
+        self.value = 0
+        self._buffer = b''
+
+    def update(self, data):
+        '''
+        Hashes every whole block of the data, buffering the rest.
+        '''
+        buffered = self._buffer + asBytes(data)
+        split = len(buffered) - len(buffered) % 16
+        self._buffer = buffered[split:]
+        if (split):
+            self.value = self.table.update(self.value, buffered[:split])
+
+    def pad(self):
+        '''
+        Ends a section of the message, hashing a short buffered block padded
+        with zero bytes.
+        '''
+        if (self._buffer):
+            tail = self._buffer + b'\x00' * (16 - len(self._buffer))
+            self.value = self.table.update(self.value, tail)
+            self._buffer = b''
+
+    def digest(self, aadLength, textLength):
+        '''
+        Ends the message and returns the 16 byte hash. The lengths are in
+        bytes.
+        '''
+        self.pad()
+        lengths = struct.pack('>QQ', 8 * aadLength, 8 * textLength)
+        self.value = self.table.update(self.value, lengths)
+        return intToBytes(self.value, 16)
@@ -0,0 +1,302 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import threading
+from functools import wraps
+from timeit import default_timer
+from .base import blockMode
+from .aesECB import ECBMode
+from .aesCBC import CBCMode
+from .aesCFB import CFBMode
+from .aesOFB import OFBMode
+from .aesCTR import CTRMode
+from .aesGCM import GCMMode
+from .aesXTS import XTSMode
+from .cache import cipherCache
+from .cmac import CMAC
+from .ghash import ghashTable
+from .parallel import ParallelCBCMode, ParallelCTRMode
+from .xor import xorData
+'''
+Opt-in per stage timing for the mode classes. enable() swaps timed wrappers
+in for the methods below and returns the modeStats object they record into.
+disable() puts the original methods back. Nothing is wrapped until enable()
+is called, so a program that never enables it runs the untouched code.
+
+The stages are:
+    encrypt, decrypt   a whole call of one of the modes, including the
+                       sector calls of XTS
+    mac                a whole CMAC call, one message or a batch
+    preProcess         padding and viewing the plaintext as blocks
+    postProcess        validating and viewing the ciphertext as blocks
+    pad, unPad         the padding scheme of the mode
+    kernel             the chaining kernel of the mode, encryptBlocks and
+                       decryptBlocks (see blocks/base.py)
+    keystream          building CTR keystream or the OFB feedback chain
+    ghash              hashing whole blocks with the GHASH tables of GCM
+    contextSetup       fetching the cached cipher context, building it on a
+                       miss
+    backend            update and update_into calls of the backend
+    xor                xorData.getXor calls
+
+Stage times are inclusive, encrypt and decrypt contain the stages they call.
+The counters hold the blocks and bytes passed to encrypt, decrypt and mac,
+the backend calls, and the buffers (and their bytes) allocated for backend, xor
+and padding output.
+
+The wrappers are process wide and apply to every instance of the modes,
+including subclasses such as the parallel modes.
+'''
+
+
+class modeStats(object):
+    '''
+    This class is used to collect the stage timings and counters. Safe to
+    update from several threads.
+    '''
+    counterNames = ['blocks', 'bytes', 'backendCalls', 'allocations',
+                    'allocatedBytes']
+
+    def __init__(self, callback=None):
+        '''
+        This constructor initializes the empty timings and counters.
+        callback, when given, is called with snapshot() after every encrypt
+        or decrypt call.
+        '''
+        self.callback = callback
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''
+        Zeroes the timings and counters.
+        '''
+        with self._lock:
+            self.stages = {}
+            self.counters = dict((name, 0) for name in self.counterNames)
+
+    def record(self, stage, seconds, **counts):
+        '''
+        Adds one call of stage taking seconds, and counts to the counters.
+        '''
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            for name in counts:
+                self.counters[name] += counts[name]
+
+    def snapshot(self):
+        '''
+        Returns a copy of the timings and counters as a dictionary:
+        {'stages': {stage: {'calls': n, 'seconds': s}}, 'counters': {...}}
+        '''
+        with self._lock:
+            return {
+                'stages': dict((stage, {'calls': entry[0],
+                                        'seconds': entry[1]})
+                               for stage, entry in self.stages.items()),
+                'counters': dict(self.counters),
+            }
+
+
+class timedContext(object):
+    '''
+    This class is used to wrap a cached cipher context, timing and counting
+    its update and update_into calls as the backend stage.
+    '''
+    def __init__(self, context, stats):
+        self.context = context
+        self.stats = stats
+
+    def update(self, data):
+        start = default_timer()
+        output = self.context.update(data)
+        self.stats.record('backend', default_timer() - start,
+                backendCalls=1, allocations=1, allocatedBytes=len(output))
+        return output
+
+    def update_into(self, data, output):
+        start = default_timer()
+        count = self.context.update_into(data, output)
+        self.stats.record('backend', default_timer() - start,
+                backendCalls=1)
+        return count
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+
+def timedCall(stage, function, stats, onOutput=None):
+    '''
+    Returns function wrapped to record each call as stage. onOutput, when
+    given, returns the counters for the arguments and the output of a call.
+    '''
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        start = default_timer()
+        output = function(*args, **kwargs)
+        counts = onOutput(args, output) if onOutput else {}
+        stats.record(stage, default_timer() - start, **counts)
+        return output
+    return wrapper
+
+
+def countAllocation(args, output):
+    return {'allocations': 1, 'allocatedBytes': len(output)}
+
+
+def countBlocks(args, output):
+    length = len(args[1])
+    return {'blocks': -(-length // 16), 'bytes': length}
+
+
+def countSectorBlocks(args, output):
+    # The sector calls of XTS take the sector number first
+    return countBlocks(args[1:], output)
+
+
+def countManyBlocks(args, output):
+    lengths = [len(message) for message in args[1]]
+    return {'blocks': sum([-(-length // 16) for length in lengths]),
+            'bytes': sum(lengths)}
+
+
+# The currently installed stats object and the replaced methods
+_active = None
+_originals = []
+_installLock = threading.Lock()
+
+
+def patch(owner, name, replacement):
+    '''
+    Replaces owner.name, remembering the original so disable can put it
+    back.
+    '''
+    _originals.append((owner, name, owner.__dict__[name]))
+    setattr(owner, name, replacement)
+
+
+def enable(callback=None):
+    '''
+    Installs the timed wrappers and returns the modeStats object they record
+    into. callback, when given, receives a snapshot after every encrypt or
+    decrypt call. Calling enable again while enabled returns the stats
+    object in use.
+    '''
+    global _active
+    with _installLock:
+        if (_active is not None):
+            return _active
+        stats = modeStats(callback)
+        # Only the outermost encrypt or decrypt of a thread is recorded, one
+        # mode calling another (ciphertext stealing, the parallel modes)
+        # would count the bytes twice
+        calls = threading.local()
+
+        def topLevel(operation, function, onOutput=countBlocks):
+            timed = timedCall(operation, function, stats, onOutput)
+
+            @wraps(function)
+            def wrapper(self, data, *args, **kwargs):
+                if (getattr(calls, 'depth', 0)):
+                    return function(self, data, *args, **kwargs)
+                calls.depth = 1
+                try:
+                    output = timed(self, data, *args, **kwargs)
+                finally:
+                    calls.depth = 0
+                if (stats.callback is not None):
+                    stats.callback(stats.snapshot())
+                return output
+            return wrapper
+
+        # The shared pipeline lives in blockMode, the kernels and the CFB
+        # calls in the mode classes, the parallel modes have their own
+        # encrypt and decrypt
+        for modeClass in [blockMode, ECBMode, CBCMode, CFBMode, OFBMode,
+                          CTRMode, GCMMode, XTSMode, ParallelCTRMode,
+                          ParallelCBCMode]:
+            members = modeClass.__dict__
+            for name in list(members):
+                if (name in ['encrypt', 'decrypt']):
+                    patch(modeClass, name, topLevel(name, members[name]))
+                elif (name in ['preProcess', 'postProcess', 'unPad']):
+                    patch(modeClass, name,
+                            timedCall(name, members[name], stats))
+                elif (name == 'pad'):
+                    patch(modeClass, name, timedCall(name, members[name],
+                            stats, countAllocation))
+                elif (name in ['encryptBlocks', 'decryptBlocks']):
+                    patch(modeClass, name,
+                            timedCall('kernel', members[name], stats))
+        for name in ['encrypt_sector', 'encrypt_sectors']:
+            patch(XTSMode, name, topLevel('encrypt', XTSMode.__dict__[name],
+                    countSectorBlocks))
+        for name in ['decrypt_sector', 'decrypt_sectors']:
+            patch(XTSMode, name, topLevel('decrypt', XTSMode.__dict__[name],
+                    countSectorBlocks))
+        patch(CMAC, 'mac', topLevel('mac', CMAC.__dict__['mac']))
+        patch(CMAC, 'mac_many', topLevel('mac', CMAC.__dict__['mac_many'],
+                countManyBlocks))
+        patch(CTRMode, 'keystream', timedCall('keystream',
+                CTRMode.__dict__['keystream'], stats))
+        patch(OFBMode, 'keystreamSlabs', timedCall('keystream',
+                OFBMode.__dict__['keystreamSlabs'], stats))
+        patch(ghashTable, 'update', timedCall('ghash',
+                ghashTable.__dict__['update'], stats))
+        patch(xorData, 'getXor', timedCall('xor',
+                xorData.__dict__['getXor'], stats, countAllocation))
+
+        getContext = cipherCache.__dict__['getContext']
+
+        @wraps(getContext)
+        def timedGetContext(self, key, direction, backend='cryptography'):
+            start = default_timer()
+            context = getContext(self, key, direction, backend)
+            stats.record('contextSetup', default_timer() - start)
+            return timedContext(context, stats)
+        patch(cipherCache, 'getContext', timedGetContext)
+
+        _active = stats
+        return stats
+
+
+def disable():
+    '''
+    Puts the original methods back and returns the stats object that was in
+    use, or None when instrumentation was not enabled.
+    '''
+    global _active
+    with _installLock:
+        while (_originals):
+            owner, name, original = _originals.pop()
+            setattr(owner, name, original)
+        stats, _active = _active, None
+        return stats
+
+
+def active():
+    '''
+    Returns the stats object in use, or None when disabled.
+    '''
+    return _active
+
+
+class instrumented(object):
+    '''
+    Context manager that enables the instrumentation for a with block and
+    disables it on exit:
+
+        with instrumented() as stats:
+            mode.encrypt(data)
+        print(stats.snapshot())
+    '''
+    def __init__(self, callback=None):
+        self.callback = callback
+
+    def __enter__(self):
+        return enable(self.callback)
+
+    def __exit__(self, *exc):
+        disable()
+        return False
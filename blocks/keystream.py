@@ -0,0 +1,254 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import struct
+import threading
+from collections import OrderedDict
+from .cache import contextCache
+from .compat import asBytes, bytesToInt
+
+
+class ctrKeystream(object):
+    '''
+    This class is used to build the CTR mode keystream. The IV is treated as a
+    128 bit big endian counter that wraps around at 2**128, following NIST
+    800-38A. The first block of the keystream is the encrypted IV, block n is
+    the encryption of IV + n.
+
+    Counter blocks are built in bulk and encrypted batchBlocks at a time with
+    one call to python cryptography. Any block or byte offset can be reached
+    directly, the earlier blocks are never computed.
+
+    counterBits is the number of low bits of the block that count. GCM only
+    counts in the low 32 bits (inc32 of NIST 800-38D), the bits above them
+    stay as they are in the IV.
+    '''
+    def __init__(self, key, iv, batchBlocks=4096, backend='cryptography',
+                 counterBits=128):
+        '''
+        This constructor initializes the key, the IV used as the starting
+        counter, the number of blocks encrypted per backend call, the AES
+        backend (see blocks/backends.py) and the width of the counter.
+        '''
+        if (counterBits not in range(1, 129)):
+            raise ValueError('The counter must be 1 to 128 bits wide.')
+        self.key = key
+        self.counterBits = counterBits
+        self.iv = iv
+        self.batchBlocks = batchBlocks
+        self.backend = backend
+
+    # Input validation for the IV
+    @property
+    def iv(self):
+        return self._iv
+
+    @iv.setter
+    def iv(self, iv):
+        if (len(iv) != 16):
+            raise ValueError('The counter block must be 16 bytes long.')
+        self._iv = asBytes(iv)
+        self._counter = bytesToInt(iv)
+
+    # Input validation for the batch size
+    @property
+    def batchBlocks(self):
+        return self._batchBlocks
+
+    @batchBlocks.setter
+    def batchBlocks(self, batchBlocks):
+        if (batchBlocks < 1):
+            raise ValueError('The batch must hold at least one block.')
+        self._batchBlocks = batchBlocks
+
+    def counterBlocks(self, index, count):
+        '''
+        The counterBlocks constructor returns count counter blocks starting
+        at block index, joined into one string.
+        '''
+        mask = (1 << self.counterBits) - 1
+        prefix = self._counter & ~mask
+        offset = ((self._counter & mask) + index) & mask
+        start = prefix | offset
+        high = start >> 64
+        low = start & 0xffffffffffffffff
+        if (offset + count <= mask + 1 and low + count <= 1 << 64):
+            # Neither the counter nor the low word wraps, pack every block
+            # in one call
+            values = [high, 0] * count
+            values[1::2] = range(low, low + count)
+            return struct.pack('>%dQ' % (2 * count), *values)
+        blockList = []
+        for i in range(0, count):
+            counter = prefix | ((offset + i) & mask)
+            blockList.append(struct.pack('>QQ', counter >> 64,
+                counter & 0xffffffffffffffff))
+        return b''.join(blockList)
+
+    def getBlocks(self, index, count):
+        '''
+        The getBlocks constructor returns count keystream blocks starting at
+        block index. The counters are encrypted batchBlocks at a time.
+        '''
+        encryptor = contextCache.getEncryptor(self.key, self.backend)
+        keystreamList = []
+        for i in range(index, index + count, self.batchBlocks):
+            batch = min(self.batchBlocks, index + count - i)
+            keystreamList.append(encryptor.update(
+                self.counterBlocks(i, batch)))
+        return b''.join(keystreamList)
+
+    def getKeystream(self, offset, length):
+        '''
+        The getKeystream constructor returns length bytes of keystream
+        starting at byte offset. Only the blocks covering the range are
+        encrypted.
+        '''
+        if (offset < 0 or length < 0):
+            raise ValueError('The offset and length can not be negative.')
+        if (length == 0):
+            return b''
+        firstBlock = offset // 16
+        lastBlock = (offset + length - 1) // 16
+        blocks = self.getBlocks(firstBlock, lastBlock - firstBlock + 1)
+        start = offset - firstBlock * 16
+        return blocks[start:start + length]
+
+
+class ofbKeystream(object):
+    '''
+    This class is used to build the OFB mode keystream, the chain of
+    encryptions of the IV. The chain is serial, but it only depends on the
+    key and IV, so it is kept in a buffer that grows on demand. Any byte
+    offset of the computed keystream can then be sliced out without running
+    the chain again.
+    '''
+    def __init__(self, key, iv, backend='cryptography'):
+        '''
+        This constructor initializes the key, the IV, the AES backend that
+        runs the chain (see blocks/backends.py) and the empty keystream
+        buffer.
+        '''
+        if (len(iv) != 16):
+            raise ValueError('The feedback block must be 16 bytes long.')
+        self.key = key
+        self.iv = iv
+        self.backend = backend
+        self._buffer = bytearray()
+        self._feedback = iv
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        '''
+        Returns the number of keystream bytes computed so far.
+        '''
+        return len(self._buffer)
+
+    def precompute(self, length):
+        '''
+        The precompute constructor runs the chain until at least length
+        bytes of keystream are buffered.
+        '''
+        with self._lock:
+            if (len(self._buffer) >= length):
+                return
+            encryptor = contextCache.getEncryptor(self.key, self.backend)
+            keystreamList = []
+            feedback = self._feedback
+            for i in range(len(self._buffer), length, 16):
+                feedback = encryptor.update(feedback)
+                keystreamList.append(feedback)
+            self._feedback = feedback
+            self._buffer += b''.join(keystreamList)
+
+    def getKeystream(self, offset, length):
+        '''
+        The getKeystream constructor returns length bytes of keystream
+        starting at byte offset, computing the chain as far as needed.
+        '''
+        if (offset < 0 or length < 0):
+            raise ValueError('The offset and length can not be negative.')
+        self.precompute(offset + length)
+        return bytes(self._buffer[offset:offset + length])
+
+
+class keystreamCache(object):
+    '''
+    This class is used to keep OFB keystreams per (key, IV, backend) between
+    calls.
+    The total size of the buffered keystreams is kept under maxBytes by
+    evicting the least recently used. A keystream longer than maxBytes is
+    computed without being cached.
+    '''
+    def __init__(self, maxBytes=16 << 20):
+        '''
+        This constructor initializes the byte budget and the hit and miss
+        counters.
+        '''
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cachedBytes(self):
+        '''
+        Returns the number of keystream bytes held by the cache.
+        '''
+        return sum(len(entry) for entry in self._entries.values())
+
+    def get(self, key, iv, length, backend='cryptography'):
+        '''
+        The get constructor returns the ofbKeystream for the key and IV on
+        backend, making room for length bytes of keystream. A new generator
+        is returned, not cached, when length is over the budget.
+        '''
+        if (length > self.maxBytes):
+            self.misses += 1
+            return ofbKeystream(key, iv, backend)
+        with self._lock:
+            entry = self._entries.pop((key, iv, backend), None)
+            if (entry is None):
+                self.misses += 1
+                entry = ofbKeystream(key, iv, backend)
+            else:
+                self.hits += 1
+            # Evict until the entry fits once it has grown to length
+            used = sum(len(other) for other in self._entries.values())
+            while (self._entries and
+                    used + max(length, len(entry)) > self.maxBytes):
+                used -= len(self._entries.popitem(last=False)[1])
+            self._entries[(key, iv, backend)] = entry
+            return entry
+
+    def getKeystream(self, key, iv, offset, length, backend='cryptography'):
+        '''
+        Returns length bytes of the keystream of the key and IV on backend
+        starting at byte offset.
+        '''
+        generator = self.get(key, iv, offset + length, backend)
+        return generator.getKeystream(offset, length)
+
+    def invalidate(self, key):
+        '''
+        The invalidate constructor drops every keystream of the key.
+        '''
+        with self._lock:
+            for entryKey in list(self._entries):
+                if (entryKey[0] == key):
+                    del self._entries[entryKey]
+
+    def clear(self):
+        '''
+        Drops every cached keystream and resets the counters.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by the OFB mode instances
+ofbCache = keystreamCache()
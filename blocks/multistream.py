@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+from .batch import batchResult, offsetsOf, padMessages
+from .cache import contextCache
+from .compat import asBytes
+from .padding import getPadding
+from .xor import xorData
+
+
+class CBCMultiStream(object):
+    '''
+    This class is used to encrypt many independent CBC messages together.
+    CBC encryption is serial within a message, but block i of every message
+    only waits on block i-1 of the same message. The chains are advanced in
+    lockstep: each round xors the next plaintext block of every message with
+    its previous ciphertext block in one pass, and encrypts them with one
+    backend call. Messages of different lengths drop out of the rounds as
+    they finish.
+    '''
+    def __init__(self, key, ivs, padding='pkcs7', backend='cryptography'):
+        '''
+        This constructor initilizes the key, one IV per stream, the padding
+        scheme and the AES backend (see blocks/backends.py). The key can be 16,
+        24, or 32 bytes long, every IV is 16 bytes.
+        '''
+        if (len(key) not in [16, 24, 32]):
+            raise Exception('The key must be 16, 24, or 32 bytes long.')
+        for iv in ivs:
+            if (len(iv) != 16):
+                raise Exception('The iv must be 16 bytes long.')
+        self.key = asBytes(key)
+        self.ivs = [asBytes(iv) for iv in ivs]
+        self.padding = getPadding(padding)
+        self.backend = backend
+
+    def pad(self, data):
+        '''
+        Pads a short tail block the way CBCMode does.
+        '''
+        return self.padding.padBlock(data)
+
+    def encryptBlocks(self, buffers):
+        '''
+        The encryptBlocks constructor encrypts one block aligned buffer per
+        stream and returns the ciphertexts in stream order.
+        '''
+        return [b''.join(output) for output in self.chainBlocks(buffers)]
+
+    def lastBlocks(self, buffers):
+        '''
+        The lastBlocks constructor encrypts one block aligned buffer per
+        stream like encryptBlocks, but only returns the last ciphertext block
+        of every stream (its IV for an empty buffer). This is the CBC-MAC of
+        the buffers, see blocks/cmac.py.
+        '''
+        return self.chainBlocks(buffers, keepAll=False)
+
+    def chainBlocks(self, buffers, keepAll=True):
+        '''
+        The chainBlocks constructor advances the chains of all streams in
+        lockstep. Returns the list of ciphertext blocks of every stream, or
+        with keepAll cleared only the last block of every stream.
+        '''
+        if (len(buffers) != len(self.ivs)):
+            raise ValueError('There must be one message per stream.')
+
+        # Streams sorted longest first, the active streams are then always
+        # the front of the list
+        order = sorted(range(0, len(buffers)),
+                       key=lambda i: len(buffers[i]), reverse=True)
+        blockCounts = [len(buffers[i]) // 16 for i in order]
+        previous = [self.ivs[i] for i in order]
+        outputs = [[] for i in order]
+
+        # Fetch the cached ECB mode context of the backend
+        encryptor = contextCache.getEncryptor(self.key, self.backend)
+        active = len(order)
+        for blockIndex in range(0, blockCounts[0] if blockCounts else 0):
+            while (blockCounts[active - 1] <= blockIndex):
+                active -= 1
+            start = blockIndex * 16
+            plaintext = b''.join([buffers[order[k]][start:start + 16]
+                                 for k in range(0, active)])
+            xor = xorData(b''.join(previous[:active]), plaintext)
+            ciphertext = encryptor.update(xor.getXor())
+            for k in range(0, active):
+                previous[k] = ciphertext[16 * k:16 * k + 16]
+                if (keepAll):
+                    outputs[k].append(previous[k])
+
+        results = [None] * len(order)
+        for k in range(0, len(order)):
+            results[order[k]] = outputs[k] if keepAll else previous[k]
+        return results
+
+    def encrypt(self, messages):
+        '''
+        The encrypt constructor pads every message like CBCMode.encrypt and
+        encrypts them together, one per stream. Returns a batchResult, see
+        blocks/batch.py.
+        '''
+        buffer, lengths = padMessages(self, messages)
+        offsets = offsetsOf(lengths)
+        buffers = [buffer[start:end] for start, end in offsets]
+        return batchResult(b''.join(self.encryptBlocks(buffers)), offsets)
@@ -1,20 +1,79 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-
-
-from cryptography.hazmat.primitives import padding
 '''
-Pads a given string with PKCS#7 padding algorithm provided by python
-cryptography padding function.
-https://cryptography.io/en/latest/hazmat/primitives/padding/
+Pads a given string with the PKCS#7 padding algorithm.
 https://tools.ietf.org/html/rfc5652#section-6.3
 
-Note: If the data passed is over 16 bytes python cryptograpy will try to step
-it up and treat it like multiple blocks. It tries to do the work for you.
-Bounds checking is needed to make sure my functions do the work.
+The pkcs7 functions work on whole buffers of any length. The padding is
+written straight into a preallocated output, and is checked and stripped
+without building a padder object. The check looks at every byte of the last
+block whatever the padding length, so it runs in constant time.
+
+The padding schemes a mode instance can be built with are paddingScheme
+subclasses, looked up by name with getPadding: pkcs7 (the default), x923,
+iso7816, zero, none and cts. none leaves CTR and OFB ciphertexts the length
+of the plaintext, cts (ciphertext stealing) does the same for ECB and CBC.
+
+Note: padData keeps the bounds checking of the original 16 byte interface.
 '''
 
 
+def pkcs7Pad(data, blockSize=16):
+    '''
+    Returns data with PKCS#7 padding appended as a string. A block aligned
+    input gets a whole block of padding.
+    '''
+    output = bytearray(len(data) + blockSize - len(data) % blockSize)
+    pkcs7PadInto(data, output, 0, blockSize)
+    return bytes(output)
+
+
+def pkcs7PadInto(data, output, offset=0, blockSize=16):
+    '''
+    Writes data followed by its PKCS#7 padding into the bytearray output at
+    offset. Returns the offset just past the padding.
+    '''
+    padLength = blockSize - len(data) % blockSize
+    end = offset + len(data) + padLength
+    if (end > len(output)):
+        raise ValueError('The output buffer is too small.')
+    output[offset:offset + len(data)] = data
+    output[end - padLength:end] = bytearray([padLength]) * padLength
+    return end
+
+
+def pkcs7PadSize(data, blockSize=16):
+    '''
+    Returns the number of PKCS#7 padding bytes at the end of data, or 0 when
+    the padding is not valid. data must be block aligned. Every byte of the
+    last block is checked, so the time taken does not depend on the padding.
+    '''
+    if (len(data) == 0 or len(data) % blockSize != 0):
+        return 0
+    lastBlock = bytearray(data[len(data) - blockSize:])
+    padLength = lastBlock[-1]
+    # 1 when padLength is 0 or over the block size
+    invalid = (((padLength - 1) | (blockSize - padLength)) >> 8) & 1
+    for i in range(1, blockSize + 1):
+        # All ones when byte -i is part of the padding, else 0
+        inPadding = ((i - padLength - 1) >> 8) & 0xff
+        invalid |= (lastBlock[-i] ^ padLength) & inPadding
+    # 0 when invalid is 0, else 0xff
+    validMask = ((invalid - 1) >> 8) & 0xff
+    return padLength & validMask
+
+
+def pkcs7UnPad(data, blockSize=16):
+    '''
+    Returns data with its PKCS#7 padding removed. Raises ValueError when the
+    padding is not valid.
+    '''
+    padLength = pkcs7PadSize(data, blockSize)
+    if (padLength == 0):
+        raise ValueError('Invalid padding bytes.')
+    return data[:len(data) - padLength]
+
+
 class padData():
     '''
     This class is used to pad the messages that are not 16 bytes in length.
@@ -30,30 +89,201 @@ class padData():
 
     def padString(self):
         '''
-        This padString constructor takes the aesBits and paddedStr passed to
-        it and calls the python cryptograpy library function to implement
-        PKC#7 padding. The padded string is returned.
+        This padString constructor takes the inputString passed to it and
+        implements PKC#7 padding with pkcs7Pad. The padded string is
+        returned.
         '''
         if (len(self.inputString) > 16 or len(self.inputString) == 0):
             raise ValueError(
                     'The input can not be null or greater than 16 bytes.')
         elif len(self.inputString) < 16:
-            padder = padding.PKCS7(self.aesBits).padder()
-            paddedData = padder.update(self.inputString)
-            paddedData += padder.finalize()
-            return paddedData
+            return pkcs7Pad(self.inputString, self.aesBits // 8)
         else:
             return self.inputString
 
     def unPadString(self):
         '''
-        This unPadString constructor takes the aesBits and paddedStr passed to
-        it and calls the python cryptograpy library function to remove PKC#7
-        padding. The unpadded string is returned.
+        This unPadString constructor takes the inputString passed to it and
+        removes PKC#7 padding with pkcs7UnPad. The unpadded string is
+        returned.
         '''
         if (len(self.inputString) != 16):
             raise ValueError('Invalid padding bytes.')
-        unpadder = padding.PKCS7(self.aesBits).unpadder()
-        unPaddedData = unpadder.update(self.inputString)
-        returnData = unPaddedData + unpadder.finalize()
-        return returnData
+        return pkcs7UnPad(self.inputString, self.aesBits // 8)
+
+
+class paddingScheme(object):
+    '''
+    This class is the base of the padding schemes a mode can be built with.
+    pad takes the short tail block of a message, unPad takes a decrypted
+    message and strips the padding from its last block. unPad is lenient:
+    data without valid padding is returned unchanged, since a block aligned
+    message is not padded.
+    '''
+    name = None
+    # Cleared for the schemes that leave the tail block short
+    padsTail = True
+    # Set for ciphertext stealing, which the block modes handle themselves
+    stealing = False
+
+    def pad(self, data, blockSize=16):
+        '''
+        Returns the short tail block data padded to blockSize bytes.
+        '''
+        raise NotImplementedError
+
+    def padSize(self, data, blockSize=16):
+        '''
+        Returns the number of padding bytes at the end of data, 0 when the
+        last block does not hold valid padding.
+        '''
+        return 0
+
+    def padBlock(self, data, blockSize=16):
+        '''
+        Pads the short tail block for the block modes, which can only
+        encrypt whole blocks.
+        '''
+        paddedData = self.pad(data, blockSize)
+        if (len(paddedData) % blockSize != 0):
+            raise ValueError('The plaintext must be a multiple of %d bytes '
+                    'with %s padding.' % (blockSize, self.name))
+        return paddedData
+
+    def unPad(self, data, blockSize=16):
+        '''
+        Returns data with the padding of its last block removed.
+        '''
+        return data[:len(data) - self.padSize(data, blockSize)]
+
+
+class pkcs7Padding(paddingScheme):
+    '''
+    PKCS#7, every padding byte holds the padding length.
+    '''
+    name = 'pkcs7'
+
+    def pad(self, data, blockSize=16):
+        return pkcs7Pad(data, blockSize)
+
+    def padSize(self, data, blockSize=16):
+        return pkcs7PadSize(data, blockSize)
+
+
+class x923Padding(paddingScheme):
+    '''
+    ANSI X.923, zero bytes followed by one byte holding the padding length.
+    '''
+    name = 'x923'
+
+    def pad(self, data, blockSize=16):
+        padLength = blockSize - len(data) % blockSize
+        output = bytearray(len(data) + padLength)
+        output[:len(data)] = data
+        output[-1] = padLength
+        return bytes(output)
+
+    def padSize(self, data, blockSize=16):
+        if (len(data) == 0 or len(data) % blockSize != 0):
+            return 0
+        lastBlock = bytearray(data[len(data) - blockSize:])
+        padLength = lastBlock[-1]
+        if (padLength == 0 or padLength > blockSize):
+            return 0
+        if (any(lastBlock[blockSize - padLength:-1])):
+            return 0
+        return padLength
+
+
+class iso7816Padding(paddingScheme):
+    '''
+    ISO/IEC 7816-4, one 0x80 byte followed by zero bytes.
+    '''
+    name = 'iso7816'
+
+    def pad(self, data, blockSize=16):
+        output = bytearray(len(data) + blockSize - len(data) % blockSize)
+        output[:len(data)] = data
+        output[len(data)] = 0x80
+        return bytes(output)
+
+    def padSize(self, data, blockSize=16):
+        if (len(data) == 0 or len(data) % blockSize != 0):
+            return 0
+        lastBlock = bytearray(data[len(data) - blockSize:])
+        end = len(lastBlock)
+        while (end > 0 and lastBlock[end - 1] == 0):
+            end -= 1
+        if (end == 0 or lastBlock[end - 1] != 0x80):
+            return 0
+        return blockSize - end + 1
+
+
+class zeroPadding(paddingScheme):
+    '''
+    Zero bytes. The padding can not be told apart from zero bytes at the
+    end of the message, so it is only suited to data that does not end in
+    zero bytes.
+    '''
+    name = 'zero'
+
+    def pad(self, data, blockSize=16):
+        output = bytearray(len(data) + blockSize - len(data) % blockSize)
+        output[:len(data)] = data
+        return bytes(output)
+
+    def padSize(self, data, blockSize=16):
+        if (len(data) == 0 or len(data) % blockSize != 0):
+            return 0
+        lastBlock = bytearray(data[len(data) - blockSize:])
+        # A message always leaves at least one byte in its last block
+        size = 0
+        while (size < blockSize - 1 and lastBlock[-size - 1] == 0):
+            size += 1
+        return size
+
+
+class noPadding(paddingScheme):
+    '''
+    No padding. CTR and OFB then keep the ciphertext the length of the
+    plaintext, ECB and CBC only take block aligned messages.
+    '''
+    name = 'none'
+    padsTail = False
+
+    def pad(self, data, blockSize=16):
+        return data
+
+
+class stealingPadding(noPadding):
+    '''
+    Ciphertext stealing for ECB and CBC (the CS2 variant of NIST SP 800-38A
+    addendum). The short tail block is completed with bytes stolen from the
+    ciphertext of the block before it, so the ciphertext is the length of
+    the plaintext. Block aligned messages are encrypted as they are.
+    '''
+    name = 'cts'
+    stealing = True
+
+
+paddingSchemes = {
+    'pkcs7': pkcs7Padding,
+    'x923': x923Padding,
+    'iso7816': iso7816Padding,
+    'zero': zeroPadding,
+    'none': noPadding,
+    'cts': stealingPadding,
+}
+
+
+def getPadding(padding):
+    '''
+    Returns the padding scheme for a name in paddingSchemes, or padding
+    itself when it is already a paddingScheme.
+    '''
+    if (isinstance(padding, paddingScheme)):
+        return padding
+    if (padding not in paddingSchemes):
+        raise ValueError('Unknown padding scheme %s, use one of %s.' % (
+            padding, ', '.join(sorted(paddingSchemes))))
+    return paddingSchemes[padding]()
@@ -0,0 +1,211 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import threading
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from .aesCBC import CBCMode
+from .aesCTR import CTRMode
+from .compat import byteView
+from .xor import xorData
+'''
+Multi core versions of the modes whose blocks can be processed independently:
+CTR in both directions and CBC decryption. The input is split into block
+aligned segments that are handed to a pool of worker threads, each worker
+writes its result straight into a shared output bytearray.
+
+Threads are used instead of processes so the segments do not have to be
+copied between interpreters. python cryptography releases the GIL while
+OpenSSL encrypts, which is where most of the time goes.
+'''
+
+
+# Worker pools are kept per size and reused, starting one costs more than
+# encrypting a megabyte
+workerPools = {}
+workerPoolsLock = threading.Lock()
+
+
+def workerPool(workers):
+    '''
+    Returns the shared thread pool with the given number of workers, starting
+    it on first use.
+    '''
+    with workerPoolsLock:
+        pool = workerPools.get(workers)
+        if (pool is None):
+            pool = ThreadPool(workers)
+            workerPools[workers] = pool
+        return pool
+
+
+def mapSegments(function, length, segmentSize, workers):
+    '''
+    Splits the range 0 to length into segments of segmentSize bytes and calls
+    function(start, end) for each, spread over a pool of workers threads.
+    Must not be called from inside a pool worker.
+    '''
+    segments = [(start, min(start + segmentSize, length))
+                for start in range(0, length, segmentSize)]
+    if (workers == 1 or len(segments) <= 1):
+        for start, end in segments:
+            function(start, end)
+        return
+    pool = workerPool(workers)
+    pool.map(lambda segment: function(*segment), segments)
+
+
+class workerSettings(object):
+    '''
+    This class holds the worker pool settings shared by the parallel modes.
+    '''
+    def initWorkers(self, workers, threshold, segmentSize):
+        '''
+        Sets the number of worker threads (one per core when workers is None),
+        the input size that switches to the parallel path and the bytes per
+        segment.
+        '''
+        if (workers is None):
+            workers = cpu_count()
+        self.workers = workers
+        self.threshold = threshold
+        self.segmentSize = segmentSize
+
+    # Input validation for the worker count
+    @property
+    def workers(self):
+        return self._workers
+
+    @workers.setter
+    def workers(self, workers):
+        if (workers < 1):
+            raise ValueError('There must be at least one worker.')
+        self._workers = workers
+
+    # Input validation for the segment size
+    @property
+    def segmentSize(self):
+        return self._segmentSize
+
+    @segmentSize.setter
+    def segmentSize(self, segmentSize):
+        if (segmentSize < 16 or segmentSize % 16 != 0):
+            raise ValueError('The segment size must be a multiple of 16.')
+        self._segmentSize = segmentSize
+
+
+class ParallelCTRMode(workerSettings, CTRMode):
+    '''
+    This class is used to run CTR mode over several cores. Each segment of
+    the message starts at a block aligned counter offset, so the segments are
+    encrypted independently and reassembled in place. Messages shorter than
+    threshold bytes are run on a single thread by CTRMode.
+    '''
+    def __init__(self, key, iv, workers=None, threshold=1 << 20,
+            segmentSize=1 << 20, padding='pkcs7', backend='cryptography'):
+        '''
+        This constructor initilizes the key and IV like CTRMode, plus the
+        number of worker threads (one per core by default), the message size
+        that switches to the parallel path and the bytes per segment. padding
+        and backend are those of CTRMode.
+        '''
+        CTRMode.__init__(self, key, iv, padding, backend)
+        self.initWorkers(workers, threshold, segmentSize)
+
+    def cryptInto(self, data, outBuffer, offset=0):
+        '''
+        The cryptInto constructor xors data with the keystream starting at
+        byte offset of the message and writes the result into outBuffer at
+        the same offset. The segments are spread over the worker threads.
+        '''
+        view = memoryview(data)
+
+        def cryptSegment(start, end):
+            xor = xorData(view[start:end],
+                    self.keystream(offset + start, end - start))
+            xor.getXorInto(outBuffer, offset + start)
+
+        mapSegments(cryptSegment, len(data), self.segmentSize, self.workers)
+
+    def encrypt(self, plaintext):
+        '''
+        This encrypt constructor pads the short tail block and encrypts the
+        aligned part of the plaintext in parallel segments.
+        Note: CTR does not normally use padding. See issue related to #12.
+        '''
+        plaintext = byteView(plaintext)
+        if (len(plaintext) < self.threshold):
+            return CTRMode.encrypt(self, plaintext)
+
+        # The tail block is padded on its own, the rest is not copied
+        plaintext = self.preProcess(plaintext)
+        ciphertext = bytearray(plaintext.byteLength())
+        self.cryptInto(plaintext.view, ciphertext)
+        if (plaintext.tail is not None):
+            self.cryptInto(plaintext.tail, ciphertext, len(plaintext.view))
+        return bytes(ciphertext)
+
+    def decrypt(self, ciphertext):
+        '''
+        This decrypt constructor decrypts the ciphertext in parallel segments
+        and unpads the last block.
+        Note: CTR does not normally use padding. See issue related to #12.
+        '''
+        ciphertext = byteView(ciphertext)
+        if (len(ciphertext) < self.threshold):
+            return CTRMode.decrypt(self, ciphertext)
+        plaintext = bytearray(len(ciphertext))
+        self.cryptInto(ciphertext, plaintext)
+
+        # Swap the last block for its unpadded version in place
+        lastBlock = len(plaintext) - (len(plaintext) % 16 or 16)
+        unPadded = self.unPad(bytes(plaintext[lastBlock:]))
+        del plaintext[lastBlock:]
+        plaintext += unPadded
+        return bytes(plaintext)
+
+
+class ParallelCBCMode(workerSettings, CBCMode):
+    '''
+    This class is used to run CBC decryption over several cores. CBC
+    encryption is serial and is left to CBCMode. Decrypting a segment only
+    needs the ciphertext block before it, so the segments are decrypted
+    independently and reassembled in place. Ciphertexts shorter than
+    threshold bytes are decrypted on a single thread by CBCMode.
+    '''
+    def __init__(self, key, iv, workers=None, threshold=1 << 20,
+            segmentSize=1 << 20, padding='pkcs7', backend='cryptography'):
+        '''
+        This constructor initilizes the key and IV like CBCMode, plus the
+        number of worker threads (one per core by default), the ciphertext
+        size that switches to the parallel path and the bytes per segment.
+        padding and backend are those of CBCMode.
+        '''
+        CBCMode.__init__(self, key, iv, padding, backend)
+        self.initWorkers(workers, threshold, segmentSize)
+
+    def decrypt(self, ciphertext):
+        '''
+        This decrypt constructor decrypts the ciphertext in parallel segments
+        with decryptSegment and unpads the last block. A stolen ciphertext
+        that ends in a short block is decrypted by CBCMode, which rebuilds
+        the last two blocks first.
+        '''
+        ciphertext = byteView(ciphertext)
+        if (len(ciphertext) < self.threshold or (self.padding.stealing and
+                len(ciphertext) % 16 != 0)):
+            return CBCMode.decrypt(self, ciphertext)
+        if (len(ciphertext) % 16 != 0):
+            raise ValueError('Invalid ciphertext byte length.')
+        plaintext = bytearray(len(ciphertext))
+
+        def decryptSegment(start, end):
+            plaintext[start:end] = self.decryptSegment(ciphertext, start, end)
+
+        mapSegments(decryptSegment, len(ciphertext), self.segmentSize,
+                self.workers)
+
+        # Swap the last block for its unpadded version in place
+        unPadded = self.unPad(bytes(plaintext[-16:]))
+        del plaintext[-16:]
+        plaintext += unPadded
+        return bytes(plaintext)
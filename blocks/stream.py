@@ -0,0 +1,403 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import copy
+from .compat import asBytes, byteView
+from .ghash import ghashState
+from .keystream import ctrKeystream
+from .xor import xorData
+'''
+Incremental encryptors and decryptors for the block modes. Each object takes
+the message in pieces through update(data) and ends it with finalize(). Only
+the chaining state and at most one block of buffered input are kept between
+calls, two with ciphertext stealing, so a stream of any length is processed
+in constant memory. The pieces can be any buffer, the output is bytes.
+
+The output of a stream is byte identical to the one shot encrypt and decrypt
+of the mode the stream was built from. Returned by the encryptor() and
+decryptor() methods of the mode classes.
+'''
+
+
+class blockStream(object):
+    '''
+    This class holds the buffering shared by the streams. Subclasses supply
+    processBlocks, which is called with block aligned data (and with the
+    final short block of a decryption, see processTail).
+    '''
+    # Set for the decryption streams, which hold back the last block
+    decrypting = False
+
+    def __init__(self, mode):
+        '''
+        This constructor takes the mode instance the stream is built from.
+        The key and IV are copied, later changes to the mode do not affect
+        the stream.
+        '''
+        self.mode = copy.copy(mode)
+        self.key = mode.key
+        self._buffer = b''
+        self._length = 0
+        self._finalized = False
+
+    def update(self, data):
+        '''
+        The update constructor takes the next piece of the message and
+        returns the output for every block that can be completed. Plaintext
+        short of a block and the last ciphertext block are buffered. With
+        ciphertext stealing the last two blocks are, the short last block
+        steals from the one before it.
+        '''
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        data = asBytes(data)
+        self._length += len(data)
+        buffered = self._buffer + data
+        if (self.mode.padding.stealing):
+            split = max(0, (len(buffered) - 17) // 16 * 16)
+        elif (self.decrypting):
+            # Keep the last block, it may have to be unpadded
+            split = ((len(buffered) - 1) // 16) * 16
+        else:
+            split = len(buffered) - len(buffered) % 16
+        self._buffer = buffered[split:]
+        if (split <= 0):
+            return b''
+        return self.processBlocks(buffered[:split])
+
+    def finalize(self):
+        '''
+        The finalize constructor ends the stream. An encryption pads and
+        processes the short tail block, a decryption processes and unpads
+        the last block. A message with ciphertext stealing that ends in a
+        short block is ended by the stealing of the mode.
+        '''
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        self._finalized = True
+        tail = self._buffer
+        self._buffer = b''
+        if (self.mode.padding.stealing and len(tail) % 16 != 0):
+            return self.processStealing(tail)
+        if (self.decrypting):
+            # Without padding a ciphertext can be shorter than a block
+            if (self._length == 0 or (self._length < 16 and
+                    self.mode.padding.padsTail)):
+                raise ValueError('Invalid ciphertext byte length.')
+            return self.mode.unPad(self.processTail(tail))
+        if (self._length == 0):
+            raise ValueError('Plaintext string can not be empty')
+        if (len(tail) == 0):
+            return b''
+        return self.processBlocks(self.mode.pad(tail))
+
+    def processTail(self, data):
+        '''
+        Processes the last block of a decryption, the last two with
+        ciphertext stealing. The block modes need whole blocks here.
+        '''
+        if (len(data) == 0 or len(data) % 16 != 0):
+            raise ValueError('Invalid ciphertext byte length.')
+        return self.processBlocks(data)
+
+    def processStealing(self, data):
+        '''
+        Processes the last two blocks of a message with ciphertext stealing,
+        the second one short, with encryptStealing or decryptStealing of the
+        mode.
+        '''
+        if (self.decrypting):
+            return self.mode.decryptStealing(data)
+        return self.mode.encryptStealing(data)
+
+
+class ECBEncryptStream(blockStream):
+    '''
+    Incremental ECB encryption.
+    '''
+    def processBlocks(self, data):
+        return self.mode.getEncryptor().update(data)
+
+
+class ECBDecryptStream(blockStream):
+    '''
+    Incremental ECB decryption.
+    '''
+    decrypting = True
+
+    def processBlocks(self, data):
+        return self.mode.getDecryptor().update(data)
+
+
+class CBCEncryptStream(blockStream):
+    '''
+    Incremental CBC encryption, the previous ciphertext block is carried
+    between calls.
+    '''
+    def __init__(self, mode):
+        blockStream.__init__(self, mode)
+        self._previous = mode.iv
+
+    def processStealing(self, data):
+        # The stolen blocks chain from the last ciphertext block
+        self.mode.iv = self._previous
+        return blockStream.processStealing(self, data)
+
+    def processBlocks(self, data):
+        encryptor = self.mode.getEncryptor()
+        ciphertextList = []
+        for i in range(0, len(data), 16):
+            xor = xorData(self._previous, data[i:i + 16])
+            self._previous = encryptor.update(xor.getXor())
+            ciphertextList.append(self._previous)
+        return b''.join(ciphertextList)
+
+
+class CBCDecryptStream(blockStream):
+    '''
+    Incremental CBC decryption, the previous ciphertext block is carried
+    between calls.
+    '''
+    decrypting = True
+
+    def __init__(self, mode):
+        blockStream.__init__(self, mode)
+        self._previous = mode.iv
+
+    def processStealing(self, data):
+        self.mode.iv = self._previous
+        return blockStream.processStealing(self, data)
+
+    def processBlocks(self, data):
+        decrypted = self.mode.getDecryptor().update(data)
+        xor = xorData(decrypted, self._previous + data[:-16])
+        self._previous = data[-16:]
+        return xor.getXor()
+
+
+class keystreamStream(blockStream):
+    '''
+    This class holds the decryption tail handling of the keystream modes. The
+    last block of a CTR or OFB ciphertext may be short.
+    '''
+    def processTail(self, data):
+        if (len(data) == 0):
+            return b''
+        return self.processBlocks(data)
+
+
+class CTRStream(keystreamStream):
+    '''
+    Incremental CTR encryption, the counter offset is carried between calls.
+    '''
+    def __init__(self, mode):
+        keystreamStream.__init__(self, mode)
+        self._keystream = ctrKeystream(mode.key, mode.iv,
+                backend=mode.backendName())
+        self._offset = 0
+
+    def processBlocks(self, data):
+        keystream = self._keystream.getKeystream(self._offset, len(data))
+        self._offset += len(data)
+        xor = xorData(data, keystream)
+        return xor.getXor()
+
+
+class CTRDecryptStream(CTRStream):
+    '''
+    Incremental CTR decryption.
+    '''
+    decrypting = True
+
+
+class OFBStream(keystreamStream):
+    '''
+    Incremental OFB encryption, the feedback block is carried between calls.
+    '''
+    def __init__(self, mode):
+        keystreamStream.__init__(self, mode)
+        self._feedback = mode.iv
+
+    def processBlocks(self, data):
+        encryptor = self.mode.getEncryptor()
+        keystreamList = []
+        for i in range(0, len(data), 16):
+            self._feedback = encryptor.update(self._feedback)
+            keystreamList.append(self._feedback)
+        xor = xorData(data, b''.join(keystreamList))
+        return xor.getXor()
+
+
+class OFBDecryptStream(OFBStream):
+    '''
+    Incremental OFB decryption.
+    '''
+    decrypting = True
+
+
+class CFBStream(blockStream):
+    '''
+    Incremental CFB encryption, the 16 byte shift register is carried
+    between calls. Input short of a segment is buffered, CFB8 buffers
+    nothing. There is no padding.
+    '''
+    def __init__(self, mode):
+        blockStream.__init__(self, mode)
+        self._register = mode.iv
+        self.segmentBytes = mode.segmentSize // 8
+
+    def update(self, data):
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        buffered = self._buffer + asBytes(data)
+        split = len(buffered) - len(buffered) % self.segmentBytes
+        self._buffer = buffered[split:]
+        if (split == 0):
+            return b''
+        output, self._register = self.processSegments(buffered[:split])
+        return output
+
+    def processSegments(self, data):
+        return self.mode.encryptSegments(self._register, data)
+
+    def finalize(self):
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        self._finalized = True
+        tail = self._buffer
+        self._buffer = b''
+        if (len(tail) == 0):
+            return b''
+        return self.processSegments(tail)[0]
+
+
+class CFBDecryptStream(CFBStream):
+    '''
+    Incremental CFB decryption.
+    '''
+    def processSegments(self, data):
+        return self.mode.decryptSegments(self._register, data)
+
+
+class GCMEncryptStream(object):
+    '''
+    Incremental GCM encryption. The additional data is passed with
+    authenticate_additional_data before the message, the message with
+    update(data). finalize() ends the stream and sets tag. The counter
+    offset and the running GHASH value are carried between calls, a short
+    block of ciphertext is buffered for the hash only.
+    '''
+    # Set for the decryption stream, which hashes its input
+    decrypting = False
+
+    def __init__(self, mode, joined=False):
+        '''
+        This constructor takes the GCMMode instance the stream is built from.
+        When joined is True finalize returns the tag, as encrypt appends it.
+        '''
+        self.mode = copy.copy(mode)
+        self.key = mode.key
+        self.joined = joined
+        self.tag = None
+        self._keystream = mode.counterStream()
+        self._hash = ghashState(mode.hashTable())
+        self._aadLength = 0
+        self._length = 0
+        self._started = False
+        self._finalized = False
+
+    def authenticate_additional_data(self, data):
+        '''
+        Adds data to the additional data, which is authenticated but not
+        encrypted. Must come before the first update.
+        '''
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        if (self._started):
+            raise ValueError('The additional data must come before the '
+                             'message.')
+        self._hash.update(data)
+        self._aadLength += len(data)
+
+    def update(self, data):
+        '''
+        The update constructor takes the next piece of the message and
+        returns its output, the same length as data.
+        '''
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        if (not self._started):
+            self._hash.pad()
+            self._started = True
+        data = byteView(data)
+        if (len(data) == 0):
+            return b''
+        self.mode.checkLength(self._length + len(data))
+        keystream = self._keystream.getKeystream(self._length, len(data))
+        self._length += len(data)
+        output = xorData(data, keystream).getXor()
+        self._hash.update(data if self.decrypting else output)
+        return output
+
+    def computeTag(self):
+        '''
+        Ends the hash and returns the tag, cut down to the tag length of the
+        mode.
+        '''
+        if (self._finalized):
+            raise ValueError('The stream has already been finalized.')
+        self._finalized = True
+        digest = self._hash.digest(self._aadLength, self._length)
+        return self.mode.tagFromHash(digest)
+
+    def finalize(self):
+        '''
+        The finalize constructor ends the stream and sets tag. GCM has no
+        padding, only the tag of a joined stream is left to return.
+        '''
+        self.tag = self.computeTag()
+        return self.tag if self.joined else b''
+
+
+class GCMDecryptStream(GCMEncryptStream):
+    '''
+    Incremental GCM decryption. The plaintext returned by update is not
+    authenticated until finalize() has checked the tag. Without a tag the
+    input ends with it, the last tagLength bytes seen are held back.
+    '''
+    decrypting = True
+
+    def __init__(self, mode, tag=None):
+        '''
+        This constructor takes the GCMMode instance and the tag the message
+        must match, None when the tag ends the input.
+        '''
+        GCMEncryptStream.__init__(self, mode, tag is None)
+        if (tag is not None):
+            self.tag = mode.checkTagLength(tag)
+        self._held = b''
+
+    def update(self, data):
+        '''
+        The update constructor decrypts the next piece of the message. A
+        joined stream keeps back the last tagLength bytes seen, they may be
+        the tag.
+        '''
+        if (not self.joined):
+            return GCMEncryptStream.update(self, data)
+        held = self._held + asBytes(data)
+        split = max(0, len(held) - self.mode.tagLength)
+        output = GCMEncryptStream.update(self, held[:split])
+        self._held = held[split:]
+        return output
+
+    def finalize(self):
+        '''
+        The finalize constructor ends the stream, raising ValueError when
+        the tag does not match.
+        '''
+        if (self.joined):
+            if (len(self._held) < self.mode.tagLength):
+                raise ValueError('Invalid ciphertext byte length.')
+            self.tag = self._held
+        self.mode.verifyTag(self.computeTag(), self.tag)
+        return b''
@@ -1,14 +1,20 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-from itertools import cycle, izip
+from .compat import asBytes, byteView, bytesToInt, intToBytes
 
 
 class xorData(object):
     '''
     This class is used to xor two strings of equal length, and return the
-    result. Often the result is a byte object (\x17\x04\x01\x18\x00) which
-    is represented as a str in python. To debug the result it is helpful to
-    print the representation (print repr(someString)).
+    result. Often the result is a byte object (\x17\x04\x01\x18\x00). To
+    debug the result it is helpful to print the representation
+    (print(repr(someString))). Both strings can be any buffer, such as bytes,
+    bytearray or memoryview, the result is bytes.
+
+    The xor is done on the whole buffer at once by converting both operands
+    to wide integers (int.from_bytes on Python 3), instead of looping over
+    the strings a byte at a time. If stringTwo is shorter than stringOne it
+    is repeated like a key.
     '''
 
     def __init__(self, stringOne, stringTwo):
@@ -39,11 +45,46 @@ class xorData(object):
             raise ValueError('String two cant not be empty')
         self._stringTwo = stringTwo
 
+    def keyStream(self):
+        '''
+        The keyStream constructor returns stringTwo stretched or trimmed to
+        the length of stringOne. A short stringTwo is repeated, the same way
+        itertools.cycle would walk over it.
+        '''
+        length = len(byteView(self.stringOne))
+        key = byteView(self.stringTwo)
+        if (len(key) < length):
+            key = asBytes(key) * (length // len(key) + 1)
+        return key[:length]
+
     def getXor(self):
         '''
-        Take the two strings, loops through them xoring them a byte at a time.
-        returns a string.
+        Take the two strings, convert them to integers and xor them in a
+        single operation. Returns a string the length of stringOne.
+        '''
+        stringOne = byteView(self.stringOne)
+        result = bytesToInt(stringOne) ^ bytesToInt(self.keyStream())
+        return intToBytes(result, len(stringOne))
+
+    def getXorInto(self, outBuffer, offset=0):
+        '''
+        The getXorInto constructor xors the two strings and writes the result
+        into a caller supplied bytearray starting at offset, so no result
+        string is handed back. Returns the number of bytes written.
+        '''
+        length = len(byteView(self.stringOne))
+        if (offset < 0 or offset + length > len(outBuffer)):
+            raise ValueError('Output buffer is too small.')
+        outBuffer[offset:offset + length] = self.getXor()
+        return length
+
+    def xorInPlace(self):
+        '''
+        The xorInPlace constructor overwrites stringOne with the xor result.
+        stringOne has to be a mutable buffer such as a bytearray. Returns the
+        same buffer.
         '''
-        xorString = ''.join(chr(ord(c) ^ ord(k)) for c, k in izip(
-            self.stringOne, cycle(self.stringTwo)))
-        return xorString
+        if (not isinstance(self.stringOne, bytearray)):
+            raise TypeError('String one must be a bytearray to xor in place')
+        self.getXorInto(self.stringOne)
+        return self.stringOne
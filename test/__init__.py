@@ -3,5 +3,20 @@ __all__ = ['test_testPrimitives',
            'test_cbc', 
            'test_ofb',
            'test_ctr',
-           'test_cfb']
+           'test_cfb',
+           'test_parallel',
+           'test_stream',
+           'test_fileio',
+           'test_benchmark',
+           'test_batch',
+           'test_multistream',
+           'test_padding',
+           'test_aio',
+           'test_instrument',
+           'test_compat',
+           'test_table',
+           'test_backends',
+           'test_gcm',
+           'test_cmac',
+           'test_xts']
 
@@ -0,0 +1,130 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesGCM import GCMMode
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+class bufferWriter(object):
+    '''
+    Stands in for an asyncio StreamWriter, collects the output and counts
+    the drains.
+    '''
+    def __init__(self):
+        self.chunks = []
+        self.drains = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def drain(self):
+        self.drains += 1
+        return asyncio.sleep(0)
+
+    def close(self):
+        self.closed = True
+
+
+@unittest.skipIf(asyncio is None, 'asyncio needs Python 3')
+class aioTestCase(unittest.TestCase):
+    '''
+    This class is used to test blocks/aio.py and the encrypt_async and
+    decrypt_async calls of the mode classes. The output must match the
+    blocking calls. When the code is pushed to the 'develop' branch on
+    github, the test files are run with TravisCI. The project can be view
+    at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use static IVs.
+    '''
+    key = b'\x00' * 16
+    IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+    testString = b'An event loop must not wait on a large payload. ' * 50
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def feedReader(self, data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return reader
+
+    def testCryptAsync(self):
+        '''
+        Testing encrypt_async and decrypt_async inline and on an executor.
+        '''
+        test = CBCMode(self.key, self.IV)
+        ciphertext = test.encrypt(self.testString)
+        run = self.loop.run_until_complete
+        assert run(test.encrypt_async(self.testString)) == ciphertext
+        assert run(test.decrypt_async(ciphertext)) == self.testString
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(2)
+        try:
+            assert run(test.encrypt_async(self.testString, executor,
+                threshold=0)) == ciphertext
+            assert run(test.decrypt_async(ciphertext, executor,
+                threshold=0)) == self.testString
+        finally:
+            executor.shutdown()
+
+    def testStreams(self):
+        '''
+        Testing encrypt_stream and decrypt_stream against the one shot calls,
+        with the writer drained after every chunk.
+        '''
+        from blocks.aio import decrypt_stream, encrypt_stream
+        for test in [CBCMode(self.key, self.IV), CTRMode(self.key, self.IV),
+                     GCMMode(self.key, self.IV[:12])]:
+            writer = bufferWriter()
+            written = self.loop.run_until_complete(encrypt_stream(test,
+                self.feedReader(self.testString), writer, chunkSize=100,
+                threshold=64))
+            ciphertext = b''.join(writer.chunks)
+            assert ciphertext == test.encrypt(self.testString)
+            assert written == len(ciphertext)
+            assert writer.drains == len(writer.chunks)
+            writer = bufferWriter()
+            self.loop.run_until_complete(decrypt_stream(test,
+                self.feedReader(ciphertext), writer, chunkSize=33))
+            assert b''.join(writer.chunks) == self.testString
+        changed = ciphertext[:-1] + bytes([ciphertext[-1] ^ 1])
+        self.assertRaises(ValueError, self.loop.run_until_complete,
+            decrypt_stream(test, self.feedReader(changed), bufferWriter()))
+
+    def testReaderWriter(self):
+        '''
+        Testing the CryptReader and CryptWriter wrappers.
+        '''
+        from blocks.aio import CryptReader, CryptWriter
+        test = CBCMode(self.key, self.IV)
+        writer = bufferWriter()
+        encrypting = CryptWriter(writer, test.encryptor())
+        for i in range(0, len(self.testString), 1000):
+            self.loop.run_until_complete(
+                encrypting.write(self.testString[i:i + 1000]))
+        self.loop.run_until_complete(encrypting.close())
+        assert writer.closed
+        ciphertext = b''.join(writer.chunks)
+        assert ciphertext == test.encrypt(self.testString)
+
+        decrypting = CryptReader(self.feedReader(ciphertext),
+                test.decryptor(), chunkSize=500)
+        plaintextList = []
+        while True:
+            output = self.loop.run_until_complete(decrypting.read())
+            if (not output and decrypting._done):
+                break
+            plaintextList.append(output)
+        assert b''.join(plaintextList) == self.testString
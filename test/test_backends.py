@@ -0,0 +1,161 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from blocks import backends
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesOFB import OFBMode
+from blocks.aesCFB import CFBMode, CFB128Mode
+from blocks.cmac import CMAC
+
+
+class missingBackend(backends.cryptographyBackend):
+    '''
+    A backend registered on a host that can not run it.
+    '''
+    name = 'missing'
+
+    def available(self):
+        return False
+
+
+class backendsTestCase(unittest.TestCase):
+    '''
+    This class is used to test the backend registry of blocks/backends.py:
+    the native backend must give the output of the default one, and auto
+    must probe once and reuse the saved choice. When the code is pushed to
+    the 'develop' branch on github, the test files are run with TravisCI.
+    The project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use a static IV.
+    '''
+    IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+    key = b'\x00' * 16
+    testString = (b'This is another example of a message that would be over'
+                  b' 16 bytes in length. Cool stuff.')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache', 'backends.json')
+        self.choices = backends._choices
+        self.probeBytes = backends.probeBytes
+        backends._choices = None
+        backends.probeBytes = 64
+
+    def tearDown(self):
+        backends._choices = self.choices
+        backends.probeBytes = self.probeBytes
+        shutil.rmtree(self.directory)
+
+    def testRegistry(self):
+        '''
+        Testing the registered names and that unknown names are refused.
+        '''
+        assert backends.backendNames()[:3] == ['cryptography', 'native',
+                                               'numpy']
+        assert backends.backendNames()[-1] == 'auto'
+        assert backends.getBackend('native').name == 'native'
+        self.assertRaises(ValueError, backends.getBackend, 'openssl')
+        self.assertRaises(ValueError, CBCMode, self.key, self.IV, 'pkcs7',
+                'openssl')
+        assert backends.getBackend('cryptography').modeContext(
+            CBCMode(self.key, self.IV), 'encrypt') is None
+
+    def testUnavailable(self):
+        '''
+        Testing that a registered backend that is not available is refused
+        when the mode is built, not on its first call.
+        '''
+        backends.register(missingBackend())
+        try:
+            assert 'missing' in backends.backendNames()
+            self.assertRaises(ValueError, ECBMode, self.key, 'pkcs7',
+                    'missing')
+            self.assertRaises(ValueError, CMAC, self.key, 'missing')
+            test = CBCMode(self.key, self.IV)
+            self.assertRaises(ValueError, setattr, test, 'backend',
+                    'missing')
+            assert test.backend == 'cryptography'
+        finally:
+            del backends.backends['missing']
+
+    def testNative(self):
+        '''
+        Testing that every mode gives the same output on the native backend,
+        including a CFB segment size python cryptography has no mode for.
+        '''
+        for build in [lambda backend: ECBMode(self.key, backend=backend),
+                lambda backend: CBCMode(self.key, self.IV, backend=backend),
+                lambda backend: CBCMode(self.key, self.IV, 'cts', backend),
+                lambda backend: CTRMode(self.key, self.IV, 'none', backend),
+                lambda backend: OFBMode(self.key, self.IV, backend=backend),
+                lambda backend: CFBMode(self.key, self.IV, backend=backend),
+                lambda backend: CFBMode(self.key, self.IV, 64, backend),
+                lambda backend: CFB128Mode(self.key, self.IV, backend)]:
+            test = build('cryptography')
+            other = build('native')
+            ciphertext = test.encrypt(self.testString)
+            assert other.encrypt(self.testString) == ciphertext
+            assert other.decrypt(ciphertext) == self.testString
+            if (test.padding.stealing):
+                continue
+            assert list(other.encrypt_many([self.testString, b'small'])) == \
+                list(test.encrypt_many([self.testString, b'small']))
+        mode = CFBMode(self.key, self.IV, 64, 'native')
+        assert mode.nativeContext('encrypt') is None
+
+    def testAuto(self):
+        '''
+        Testing that auto probes once, saves the choice, and that the saved
+        choice is reused by a later process without probing again.
+        '''
+        choices = backends.selectBackends(self.path)
+        assert sorted(choices) == ['cbc', 'cfb', 'ctr', 'ecb', 'ofb']
+        for name in choices.values():
+            assert name in backends.backends
+        with open(self.path) as cacheFile:
+            saved = json.load(cacheFile)
+        assert saved['choices'] == choices
+        assert saved['host'] == backends.hostKey()
+
+        # A new process starts without choices and loads the saved ones
+        backends._choices = None
+        probe = backends.probe
+        backends.probe = None
+        try:
+            assert backends.selectBackends(self.path) == choices
+        finally:
+            backends.probe = probe
+
+        # The saved choices are dropped when an older probe made them
+        del saved['host']['format']
+        with open(self.path, 'w') as cacheFile:
+            json.dump(saved, cacheFile)
+        assert backends.loadChoices(self.path) is None
+        saved['host']['format'] = backends.cacheFormat
+
+        # The saved choices are dropped when they were made elsewhere
+        saved['host']['python'] = '0.0'
+        with open(self.path, 'w') as cacheFile:
+            json.dump(saved, cacheFile)
+        assert backends.loadChoices(self.path) is None
+        assert backends.selectBackends(self.path, refresh=True) == \
+            backends.loadChoices(self.path)
+
+        for build in [lambda backend: ECBMode(self.key, backend=backend),
+                lambda backend: CBCMode(self.key, self.IV, backend=backend),
+                lambda backend: CTRMode(self.key, self.IV, backend=backend),
+                lambda backend: CFBMode(self.key, self.IV, backend=backend)]:
+            test = build('cryptography')
+            other = build('auto')
+            assert other.backend == 'auto'
+            assert other.backendName() == \
+                backends._choices[other.modeName]
+            ciphertext = test.encrypt(self.testString)
+            assert other.encrypt(self.testString) == ciphertext
+            assert other.decrypt(ciphertext) == self.testString
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesOFB import OFBMode
+from blocks.aesCFB import CFBMode, CFB128Mode
+
+
+class batchTestCase(unittest.TestCase):
+    '''
+    This class is used to test the encrypt_many and decrypt_many batch calls
+    of the mode classes, see blocks/batch.py. Every message of a batch must
+    match the one shot encrypt of the mode with the same IV. When the code is
+    pushed to the 'develop' branch on github, the test files are run with
+    TravisCI. The project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use static IVs.
+    '''
+    key = b'\x00' * 16
+    IVs = [b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f',
+           b'\x01' * 16,
+           b'\x00' * 15 + b'\xff',
+           b'\x7f' * 16]
+    messages = [b'small string', b'1' * 32, b'x',
+                b'This is another example of a message that would be over 16'
+                b' bytes in length. Cool stuff.']
+
+    def checkMode(self, modeClass):
+        '''
+        Checks a batch against one mode instance per IV.
+        '''
+        test = modeClass(self.key, self.IVs[0])
+        ciphertexts = test.encrypt_many(self.messages, self.IVs)
+        assert len(ciphertexts) == len(self.messages)
+        for i in range(0, len(self.messages)):
+            expected = modeClass(self.key, self.IVs[i]).encrypt(
+                self.messages[i])
+            assert ciphertexts[i] == expected
+        plaintexts = test.decrypt_many(list(ciphertexts), self.IVs)
+        assert list(plaintexts) == self.messages
+        self.assertRaises(ValueError, test.encrypt_many, self.messages,
+                self.IVs[:2])
+
+    def testECBBatch(self):
+        '''
+        Testing the batch calls of blocks/aesECB.py
+        '''
+        test = ECBMode(self.key)
+        ciphertexts = test.encrypt_many(self.messages)
+        for i in range(0, len(self.messages)):
+            assert ciphertexts[i] == test.encrypt(self.messages[i])
+        assert list(test.decrypt_many(ciphertexts)) == self.messages
+        self.assertRaises(ValueError, test.encrypt_many, [b'data', b''])
+
+    def testCBCBatch(self):
+        '''
+        Testing the batch calls of blocks/aesCBC.py
+        '''
+        self.checkMode(CBCMode)
+
+    def testCTRBatch(self):
+        '''
+        Testing the batch calls of blocks/aesCTR.py
+        '''
+        self.checkMode(CTRMode)
+
+    def testOFBBatch(self):
+        '''
+        Testing the batch calls of blocks/aesOFB.py
+        '''
+        self.checkMode(OFBMode)
+
+    def testCFBBatch(self):
+        '''
+        Testing the batch calls of blocks/aesCFB.py for CFB8 and CFB128.
+        '''
+        self.checkMode(CFBMode)
+        self.checkMode(CFB128Mode)
+
+    def testBatchResult(self):
+        '''
+        Testing the offsets and views of blocks/batch.py batchResult.
+        '''
+        test = CTRMode(self.key, self.IVs[0])
+        result = test.encrypt_many([b'a', b'b' * 20])
+        assert result.offsets == [(0, 16), (16, 48)]
+        assert len(result.buffer) == 48
+        assert result.view(1).tobytes() == result[1]
+        assert len(test.encrypt_many([])) == 0
+        assert len(test.decrypt_many([])) == 0
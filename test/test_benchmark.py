@@ -0,0 +1,58 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from blocks.benchmark import main, parseSize, percentile, runBenchmark
+
+
+class benchmarkTestCase(unittest.TestCase):
+    '''
+    This class is used to test the blocks/benchmark.py harness with tiny
+    payloads. When the code is pushed to the 'develop' branch on github, the
+    test files are run with TravisCI. The project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    '''
+    def testHelpers(self):
+        '''
+        Testing the size parser and percentiles of blocks/benchmark.py
+        '''
+        assert parseSize('512') == 512
+        assert parseSize('64k') == 64 * 1024
+        assert parseSize('256M') == 256 * 1024 * 1024
+        assert percentile([3, 1, 2, 5, 4], 0.5) == 3
+        assert percentile([3, 1, 2, 5, 4], 0.99) == 5
+
+    def testRunBenchmark(self):
+        '''
+        Testing that blocks/benchmark.py reports every case.
+        '''
+        benchmark = runBenchmark(['ECB', 'CFB'], [16, 32], [1, 100],
+                repeat=2, minTime=0)
+        results = benchmark['results']
+        assert len(results) == 2 * 2 * 2 * 2
+        for result in results:
+            assert result['calls'] >= 2
+            assert result['throughputMBs'] > 0
+            assert result['latency']['p50'] <= result['latency']['max']
+            assert result['peakMemoryBytes'] > 0
+
+    def testJsonOutput(self):
+        '''
+        Testing the command line entry point of blocks/benchmark.py writes
+        machine readable JSON.
+        '''
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'bench.json')
+            assert main(['--modes', 'ctr', '--key-sizes', '24', '--sizes',
+                    '1K', '--repeat', '1', '--min-time', '0',
+                    '--json', path]) == 0
+            with open(path) as jsonFile:
+                benchmark = json.load(jsonFile)
+            assert benchmark['results'][0]['mode'] == 'CTR'
+            assert benchmark['results'][1]['operation'] == 'decrypt'
+        finally:
+            shutil.rmtree(directory)
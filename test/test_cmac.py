@@ -0,0 +1,113 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import unittest
+from binascii import unhexlify
+from cryptography.hazmat.primitives import cmac
+from cryptography.hazmat.primitives.ciphers import algorithms
+from cryptography.hazmat.backends import default_backend
+from blocks.cache import contextCache
+from blocks.cmac import CMAC, doubleBlock
+
+
+class cmacTestCase(unittest.TestCase):
+    '''
+    This class is used to test blocks/cmac.py against the examples of RFC
+    4493 and python cryptography CMAC. When the code is pushed to the
+    'develop' branch on github, the test files are run with TravisCI. The
+    project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    '''
+    key = unhexlify(b'2b7e151628aed2a6abf7158809cf4f3c')
+    message = unhexlify(
+        b'6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51'
+        b'30c81c46a35ce411e5fbc1191a0a52eff69f2445df4f9b17ad2b417be66c3710')
+
+    def reference(self, key, message):
+        '''
+        Returns the tag of python cryptography CMAC.
+        '''
+        signer = cmac.CMAC(algorithms.AES(key), backend=default_backend())
+        signer.update(message)
+        return signer.finalize()
+
+    def testRfc4493(self):
+        '''
+        Testing the subkeys and the four examples of RFC 4493.
+        '''
+        test = CMAC(self.key)
+        k1, k2 = test.subkeys()
+        assert k1 == unhexlify(b'fbeed618357133667c85e08f7236a8de')
+        assert k2 == unhexlify(b'f7ddac306ae266ccf90bc11ee46d513b')
+        for length, tag in [
+                (0, b'bb1d6929e95937287fa37d129b756746'),
+                (16, b'070a16b46b4d4144f79bdd9dd04a287c'),
+                (40, b'dfa66747de9ae63030ca32611497c827'),
+                (64, b'51f0bebf7e3b9d92fc49741779363cfe')]:
+            assert test.mac(self.message[:length]) == unhexlify(tag)
+        assert doubleBlock(b'\x80' + b'\x00' * 15) == b'\x00' * 15 + b'\x87'
+
+    def testAgainstCryptography(self):
+        '''
+        Testing random keys and messages around the block boundaries against
+        python cryptography, one at a time, streamed and batched.
+        '''
+        lengths = [0, 1, 15, 16, 17, 31, 32, 33, 100]
+        for keySize in [16, 24, 32]:
+            key = os.urandom(keySize)
+            test = CMAC(key)
+            messages = [os.urandom(length) for length in lengths]
+            expected = [self.reference(key, message) for message in messages]
+            for message, tag in zip(messages, expected):
+                assert test.mac(message) == tag
+                assert test.mac(bytearray(message)) == tag
+                test.verify(message, tag)
+                stream = test.stream()
+                for start in range(0, len(message), 7):
+                    stream.update(message[start:start + 7])
+                assert stream.finalize() == tag
+            assert list(test.mac_many(messages)) == expected
+            assert test.mac_many([]).buffer == b''
+
+    def testVerify(self):
+        '''
+        Testing that wrong tags and changed messages are refused.
+        '''
+        test = CMAC(self.key)
+        tag = test.mac(self.message)
+        self.assertRaises(ValueError, test.verify, self.message[1:], tag)
+        self.assertRaises(ValueError, test.verify, self.message, tag[:-1])
+        stream = test.stream()
+        stream.update(self.message[:20])
+        prefix = stream.copy()
+        stream.update(self.message[20:])
+        stream.verify(tag)
+        self.assertRaises(ValueError, stream.update, b'more')
+        assert prefix.finalize() == test.mac(self.message[:20])
+        stream = test.stream()
+        stream.update(self.message)
+        self.assertRaises(ValueError, stream.verify, b'\x00' * 16)
+
+        messages = [self.message, b'', b'record']
+        tags = list(test.mac_many(messages))
+        tags[1] = b'\x00' * 16
+        assert test.verify_many(messages, tags) == [True, False, True]
+        self.assertRaises(ValueError, test.verify_many, messages, tags[:2])
+        self.assertRaises(Exception, CMAC, b'short')
+        self.assertRaises(ValueError, CMAC, self.key, 'openssl')
+
+    def testBackends(self):
+        '''
+        Testing that the subkeys are cached per key and that the native
+        backend gives the same tags.
+        '''
+        key = os.urandom(16)
+        test = CMAC(key)
+        assert test.subkeys() is CMAC(key).subkeys()
+        contextCache.invalidate(key)
+        assert test.subkeys() == CMAC(key).subkeys()
+        other = CMAC(key, 'native')
+        messages = [self.message, b'', b'record']
+        assert list(other.mac_many(messages)) == \
+            list(test.mac_many(messages))
+        assert other.mac(self.message) == test.mac(self.message)
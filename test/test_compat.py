@@ -0,0 +1,138 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import array
+import unittest
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesOFB import OFBMode
+from blocks.aesCFB import CFBMode, CFB128Mode
+from blocks.parallel import ParallelCBCMode, ParallelCTRMode
+from blocks.compat import PY3, asBytes, byteView, bytesToInt, intToBytes, \
+        writeInto
+
+
+class compatTestCase(unittest.TestCase):
+    '''
+    This class is used to test blocks/compat.py and the buffer inputs of the
+    mode classes. A bytearray or memoryview must give the same output as the
+    bytes it holds, and the output is always bytes. When the code is pushed
+    to the 'develop' branch on github, the test files are run with TravisCI.
+    The project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use a static IV.
+    '''
+    IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+    key = b'\x00' * 16
+    testString = (b'This is another example of a message that would be over'
+                  b' 16 bytes in length. Cool stuff.')
+
+    def modes(self, key, iv):
+        return [ECBMode(key), CBCMode(key, iv), CTRMode(key, iv),
+                OFBMode(key, iv), CFBMode(key, iv), CFB128Mode(key, iv),
+                ECBMode(key, 'cts'), CBCMode(key, iv, 'cts'),
+                CTRMode(key, iv, 'none')]
+
+    def testHelpers(self):
+        '''
+        Testing the conversions of blocks/compat.py.
+        '''
+        data = bytearray(b'\x01\x02\x03')
+        assert asBytes(data) == b'\x01\x02\x03'
+        assert isinstance(asBytes(memoryview(data)), bytes)
+        assert asBytes(self.key) is self.key
+        assert bytesToInt(memoryview(data)) == 0x010203
+        assert intToBytes(0x010203, 4) == b'\x00\x01\x02\x03'
+        output = bytearray(6)
+        assert writeInto([b'ab', memoryview(b'cd')], output, 1) == 4
+        assert output == bytearray(b'\x00abcd\x00')
+        self.assertRaises(ValueError, writeInto, [b'abc'], output, 4)
+        self.assertRaises(TypeError, writeInto, [b'a'], b'readonly')
+        if (PY3):
+            words = array.array('I', [1, 2])
+            assert len(byteView(words)) == 2 * words.itemsize
+
+    def testBufferInputs(self):
+        '''
+        Testing that every mode takes bytearray and memoryview plaintexts,
+        ciphertexts, keys and IVs, and returns bytes.
+        '''
+        for test, other in zip(self.modes(self.key, self.IV),
+                self.modes(bytearray(self.key), memoryview(self.IV))):
+            ciphertext = test.encrypt(self.testString)
+            for wrap in [bytearray, memoryview]:
+                output = other.encrypt(wrap(self.testString))
+                assert isinstance(output, bytes)
+                assert output == ciphertext
+                output = other.decrypt(wrap(ciphertext))
+                assert isinstance(output, bytes)
+                assert output == self.testString
+            if (test.padding.stealing):
+                continue
+            encryptor = other.encryptor()
+            output = encryptor.update(bytearray(self.testString[:20]))
+            output += encryptor.update(memoryview(self.testString)[20:])
+            assert output + encryptor.finalize() == ciphertext
+            batch = other.encrypt_many([bytearray(self.testString),
+                                        memoryview(b'small string')])
+            assert batch[0] == ciphertext
+            assert list(other.decrypt_many([memoryview(message)
+                for message in batch])) == [self.testString, b'small string']
+
+    def testWideBuffers(self):
+        '''
+        Testing that a buffer of items wider than a byte, an array of ints,
+        is taken as the bytes it holds, including by the CFB segments,
+        ciphertext stealing and the parallel modes. Python 3 only, Python 2
+        arrays have no memoryview.
+        '''
+        if (not PY3):
+            return
+        for length in [20, 88]:
+            words = array.array('i', range(0, length // 4))
+            data = words.tobytes()
+            for test in self.modes(self.key, self.IV) + [
+                    ParallelCTRMode(self.key, self.IV, 2, 0, 32),
+                    ParallelCBCMode(self.key, self.IV, 2, 0, 32, 'cts')]:
+                ciphertext = test.encrypt(data)
+                assert test.encrypt(words) == ciphertext
+                if (len(ciphertext) % 4 == 0):
+                    wide = array.array('i', ciphertext)
+                    assert test.decrypt(wide) == data
+                if (test.padding.stealing):
+                    continue
+                encryptor = test.encryptor()
+                output = encryptor.update(words) + encryptor.finalize()
+                assert output == ciphertext
+                assert test.encrypt_many([words])[0] == ciphertext
+
+    def testEncryptInto(self):
+        '''
+        Testing that encrypt_into and decrypt_into write the output of
+        encrypt and decrypt into a caller supplied bytearray.
+        '''
+        for test in self.modes(self.key, self.IV):
+            for testString in [b'small string', b'1' * 32, self.testString]:
+                if (test.padding.stealing and len(testString) < 16):
+                    continue
+                ciphertext = test.encrypt(testString)
+                output = bytearray(len(ciphertext) + 3)
+                assert test.encrypt_into(testString, output) == \
+                    len(ciphertext)
+                assert output[:len(ciphertext)] == bytearray(ciphertext)
+                view = memoryview(output)[:len(ciphertext)]
+                assert test.encrypt_into(bytearray(testString), view) == \
+                    len(ciphertext)
+                assert output[:len(ciphertext)] == bytearray(ciphertext)
+                plaintext = bytearray(len(ciphertext))
+                assert test.decrypt_into(ciphertext, plaintext) == \
+                    len(testString)
+                assert plaintext[:len(testString)] == bytearray(testString)
+
+        test = ECBMode(self.key)
+        output = bytearray(len(self.testString))
+        self.assertRaises(ValueError, test.encrypt_into, self.testString,
+                output)
+        assert output == bytearray(len(self.testString))
+        self.assertRaises(TypeError, test.encrypt_into, self.testString,
+                b'\x00' * 128)
@@ -1,7 +1,10 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 import unittest
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
 from blocks.aesCTR import CTRMode
+from blocks.keystream import ctrKeystream
 
 class ctrTestCase(unittest.TestCase):
     '''
@@ -15,59 +18,59 @@ class ctrTestCase(unittest.TestCase):
         '''
         Testing blocks/aesCTR.py for a small string of information < 16 bytes.
         '''
-        IV = '\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
-        key = '\x00' * 16
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
         test = CTRMode(key, IV)
-        ciphertext = test.encrypt('small string')
+        ciphertext = test.encrypt(b'small string')
         plaintext = test.decrypt(ciphertext)
-        assert ciphertext == 'F\x89\xe5n~J\x88\xdbS\xa3\x94Z\x1f\x90=\x8b'
-        assert plaintext == 'small string'
+        assert ciphertext == b'F\x89\xe5n~J\x88\xdbS\xa3\x94Z\x1f\x90=\x8b'
+        assert plaintext == b'small string'
 
     def testEvenBlockString(self):
         '''
         Testing blocks/aesCTR.py with a string that is 16 bytes in length.
         '''
-        IV = '\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
-        key = '\x00' * 16
-        testString = '1111111111111111'
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
+        testString = b'1111111111111111'
         test = CTRMode(key, IV)
         ciphertext = test.encrypt(testString)
         plaintext = test.decrypt(ciphertext)
         assert len(testString) == 16
         assert ciphertext == (
-                '\x04\xd5\xb53#[\xca\x9e\x10\xfb\xcb\x0c*\xa5\x08\xbe')
-        assert plaintext == '1111111111111111'
+                b'\x04\xd5\xb53#[\xca\x9e\x10\xfb\xcb\x0c*\xa5\x08\xbe')
+        assert plaintext == b'1111111111111111'
     
     def testEvenTwoBlockString(self):
         '''
         Testing blocks/aesCTR.py with a string that is 32 bytes in length.
         '''
-        IV = '\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
-        key = '\x00' * 16
-        testString = '1' * 32
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
+        testString = b'1' * 32
         test = CTRMode(key, IV)
         ciphertext = test.encrypt(testString)
         plaintext = test.decrypt(ciphertext)
         assert len(testString) == 32 
         assert ciphertext == (
-                '\x04\xd5\xb53#[\xca\x9e\x10\xfb\xcb\x0c*\xa5\x08\xbe\x8bB:hc'
-                '\xb25\x9ezQ\x16x\x16\xfa\x1c\xb2')
+                b'\x04\xd5\xb53#[\xca\x9e\x10\xfb\xcb\x0c*\xa5\x08\xbe\x8bB:hc'
+                b'\xb25\x9ezQ\x16x\x16\xfa\x1c\xb2')
         
     def testLargeString(self):
         '''
         Testing blocks/aesCTR.py with a large string greater than 16 bytes.
         '''
-        IV = '\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
-        key = '\x00' * 16
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
         testString = (
-                'This is another example of a message that would be over 16'
-                ' bytes in length. Cool stuff.')
+                b'This is another example of a message that would be over 16'
+                b' bytes in length. Cool stuff.')
         returnedCiphertext = (
-                'a\x8c\xedq2\x03\x88\x8f@\xa4\x95Is\xf1K\xaf\xdf\x0bj4"\xefa'
-                '\x8f$\x06\x07(\x07\xa6H\xf0\xab\x07v\x85\xcd\xadyT\x00E\x90'
-                '\x9e\xefE\xc1\xf7\xb7\xac:\xf0\x14\x95\xbb\xa0\t\x87\x8aG>'
-                '\x1b%\xd5\x9b\xdc\x9e\x98&*\xca.\xc0\xf2\x0bR)\xfa\x82\x04'
-                '\xd8dQ\'\xd1,\xbd\xa4\xa4q\xda\xe1\x82\xfa\xc1\xd9')
+                b'a\x8c\xedq2\x03\x88\x8f@\xa4\x95Is\xf1K\xaf\xdf\x0bj4"\xefa'
+                b'\x8f$\x06\x07(\x07\xa6H\xf0\xab\x07v\x85\xcd\xadyT\x00E\x90'
+                b'\x9e\xefE\xc1\xf7\xb7\xac:\xf0\x14\x95\xbb\xa0\t\x87\x8aG>'
+                b'\x1b%\xd5\x9b\xdc\x9e\x98&*\xca.\xc0\xf2\x0bR)\xfa\x82\x04'
+                b'\xd8dQ\'\xd1,\xbd\xa4\xa4q\xda\xe1\x82\xfa\xc1\xd9')
         test = CTRMode(key, IV)
         ciphertext = test.encrypt(testString)
         plaintext = test.decrypt(ciphertext)
@@ -78,24 +81,26 @@ class ctrTestCase(unittest.TestCase):
         '''
         Testing blocks/aesCTR.py with a very large string of data.
         '''
-        IV = '\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
-        key = '\x00' * 16
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
         testString = (
-                'This is a super secret message that just happens to'
-                ' be very long as well. I hope there is not a charlie'
-                ' sniffing data from the wire. Hopefully Alice and Bob'
-                ' move to a better block mode')
+                b'This is a super secret message that just happens to'
+                b' be very long as well. I hope there is not a charlie'
+                b' sniffing data from the wire. Hopefully Alice and Bob'
+                b' move to a better block mode')
         returnedCiphertext = (
-                'a\x8c\xedq2\x03\x88\x8f@\xea\x89Hk\xf1K\xaf\xc9\x16h+7\xf7$'
-                '\xc2.\x13T(@\xae\r\xf7\xb0\x07e\xc0\x87\xacbAT\r\x86\x81\xeaL'
-                '\xcb\xa4\xf5\xbdu\xbf\x00\x95\xe9\xf6]\xc3\xd3\x05+\x00.\xc1'
-                '\x9b\xd4\x83\x98=*\xc8%\x9a\xbalR\x02\xfa\x9d\r\xd8cM7\xc5/'
-                '\xb3\xc4\xdeX\xbd\x87\xff\xd3\xa9\xf0\x1dx\x88\xbb\x13\xb7'
-                '\xb1\x83\x13H\xf7N\x16\xd0\x17\xec\xcb\xe9\xe7[K<\xf4y\x9e'
-                '\xa5Xp\x9c\x1b-\xfaW\xa7V\x16k\xc2\x19\xa9H(\xda\xab\xb6\xdd'
-                '\x843\x02\xb9d\xca\x01\xe1\xd9\x02\x98\x942\x11)E\xa7-Kd(;'
-                '\x81G\xc5\xc4\xed\xa0>n\xb1S\x92\xfe\xa5\x97h\xb8\xf6180u\xff'
-                '\xff\xa4\xbf\x19t\xe0')
+                b'a\x8c\xedq2\x03\x88\x8f@\xea\x89Hk\xf1K\xaf\xc9\x16h+7\xf7$'
+                b'\xc2.\x13T(@\xae\r\xf7\xb0\x07e\xc0\x87\xacbAT\r\x86\x81'
+                b'\xeaL'
+                b'\xcb\xa4\xf5\xbdu\xbf\x00\x95\xe9\xf6]\xc3\xd3\x05+\x00.\xc1'
+                b'\x9b\xd4\x83\x98=*\xc8%\x9a\xbalR\x02\xfa\x9d\r\xd8cM7\xc5/'
+                b'\xb3\xc4\xdeX\xbd\x87\xff\xd3\xa9\xf0\x1dx\x88\xbb\x13\xb7'
+                b'\xb1\x83\x13H\xf7N\x16\xd0\x17\xec\xcb\xe9\xe7[K<\xf4y\x9e'
+                b'\xa5Xp\x9c\x1b-\xfaW\xa7V\x16k\xc2\x19\xa9H(\xda\xab\xb6\xdd'
+                b'\x843\x02\xb9d\xca\x01\xe1\xd9\x02\x98\x942\x11)E\xa7-Kd(;'
+                b'\x81G\xc5\xc4\xed\xa0>n\xb1S\x92\xfe\xa5\x97h\xb8\xf6180u'
+                b'\xff'
+                b'\xff\xa4\xbf\x19t\xe0')
         test = CTRMode(key, IV)
         ciphertext = test.encrypt(testString)
         plaintext = test.decrypt(returnedCiphertext)
@@ -111,24 +116,24 @@ class ctrTestCase(unittest.TestCase):
         Note: This test is repetitive and will be trimmed out once issue #9
         is addressed. This would also be removed once issue #12 is addressed.
         '''
-        IV = '\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
-        key = '\x00' * 16
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
         test = CTRMode(key, IV)
         preProcessedData = test.preProcess(
-                'This data should be split into a list with 16 byte'
-                ' elements. The element that is not 16 bytes gets sent'
-                ' to the padding function and then appended to the list')
+                b'This data should be split into a list with 16 byte'
+                b' elements. The element that is not 16 bytes gets sent'
+                b' to the padding function and then appended to the list')
         returnedList = [
-                'This data should',
-                ' be split into a',
-                ' list with 16 by',
-                'te elements. The',
-                ' element that is',
-                ' not 16 bytes ge',
-                'ts sent to the p',
-                'adding function ',
-                'and then appende',
-                'd to the list\x03\x03\x03']
+                b'This data should',
+                b' be split into a',
+                b' list with 16 by',
+                b'te elements. The',
+                b' element that is',
+                b' not 16 bytes ge',
+                b'ts sent to the p',
+                b'adding function ',
+                b'and then appende',
+                b'd to the list\x03\x03\x03']
         # Loop through the list, making sure each element is 16 bytes
         for i in range(0, len(returnedList)):
             assert len(returnedList[i]) == 16
@@ -141,23 +146,63 @@ class ctrTestCase(unittest.TestCase):
         Note: This test is repetitive and will be trimmed out once issue #9
         is addressed. This would also be removed once issue #12 is addressed.
         '''
-        IV = '\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
-        key = '\x00' * 16
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
         test = CTRMode(key, IV)
         postProcessData = test.postProcess(
-                'x\xf5\xf8\xa8-\x99\xd4\x84\xc2\x94\xd09\x16\xe5\t\x96\xde\xe0'
-                '\xb4o~\x17)\xb1\x86:\xef\xc4\xbc:n\xb0\xe0K1^\x1cPA\x89\xc2'
-                '\xdfr(lZ&\xd4\x15U\xc0\xd3\xfb\xb7\x18\xb1e\xdd\xe9\x84<w'
-                "\xf9(\xe7\xa6\xd6\x17\\\xb4[x\xbc'Be\x10\x16\xac\xf2\x81S"
-                '\x05{\x04\xc8tkN\xc4ON\xb7\t\xcaA')
+                b'x\xf5\xf8\xa8-\x99\xd4\x84\xc2\x94\xd09\x16\xe5\t\x96\xde'
+                b'\xe0'
+                b'\xb4o~\x17)\xb1\x86:\xef\xc4\xbc:n\xb0\xe0K1^\x1cPA\x89\xc2'
+                b'\xdfr(lZ&\xd4\x15U\xc0\xd3\xfb\xb7\x18\xb1e\xdd\xe9\x84<w'
+                b"\xf9(\xe7\xa6\xd6\x17\\\xb4[x\xbc'Be\x10\x16\xac\xf2\x81S"
+                b'\x05{\x04\xc8tkN\xc4ON\xb7\t\xcaA')
         returnedList = [
-                'x\xf5\xf8\xa8-\x99\xd4\x84\xc2\x94\xd09\x16\xe5\t\x96',
-                '\xde\xe0\xb4o~\x17)\xb1\x86:\xef\xc4\xbc:n\xb0',
-                '\xe0K1^\x1cPA\x89\xc2\xdfr(lZ&\xd4',
-                '\x15U\xc0\xd3\xfb\xb7\x18\xb1e\xdd\xe9\x84<w\xf9(',
-                "\xe7\xa6\xd6\x17\\\xb4[x\xbc'Be\x10\x16\xac\xf2",
-                '\x81S\x05{\x04\xc8tkN\xc4ON\xb7\t\xcaA']
+                b'x\xf5\xf8\xa8-\x99\xd4\x84\xc2\x94\xd09\x16\xe5\t\x96',
+                b'\xde\xe0\xb4o~\x17)\xb1\x86:\xef\xc4\xbc:n\xb0',
+                b'\xe0K1^\x1cPA\x89\xc2\xdfr(lZ&\xd4',
+                b'\x15U\xc0\xd3\xfb\xb7\x18\xb1e\xdd\xe9\x84<w\xf9(',
+                b"\xe7\xa6\xd6\x17\\\xb4[x\xbc'Be\x10\x16\xac\xf2",
+                b'\x81S\x05{\x04\xc8tkN\xc4ON\xb7\t\xcaA']
         # Loop through the list, making sure each element is 16 bytes
         for i in range(0, len(returnedList)):
             assert len(returnedList[i]) == 16
         assert postProcessData == returnedList
+
+    def testCounterCarry(self):
+        '''
+        Testing blocks/aesCTR.py with a message long enough for the counter
+        to carry past the last byte of the IV. The output is checked against
+        the CTR mode of python cryptography.
+        '''
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xff\xfe'
+        key = b'\x00' * 16
+        testString = b'Counter carry test ' * 300
+        test = CTRMode(key, IV)
+        ciphertext = test.encrypt(testString)
+        cipher = Cipher(algorithms.AES(key), modes.CTR(IV),
+                backend = default_backend())
+        encryptor = cipher.encryptor()
+        assert ciphertext[:len(testString)] == encryptor.update(testString)
+        assert test.decrypt(ciphertext) == testString
+
+    def testCounterWrap(self):
+        '''
+        Testing that the 128 bit counter in blocks/keystream.py wraps around
+        to zero.
+        '''
+        generator = ctrKeystream(b'\x00' * 16, b'\xff' * 16)
+        assert generator.counterBlocks(0, 2) == b'\xff' * 16 + b'\x00' * 16
+        assert generator.counterBlocks(2, 1) == b'\x00' * 15 + b'\x01'
+
+    def testDecryptRange(self):
+        '''
+        Testing that blocks/aesCTR.py can decrypt a slice of a ciphertext
+        that starts and ends inside a block.
+        '''
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
+        testString = b'Random access into a long CTR ciphertext. ' * 20
+        test = CTRMode(key, IV)
+        ciphertext = test.encrypt(testString)
+        assert test.decryptRange(ciphertext[37:501], 37) == testString[37:501]
+        assert test.keystream(0, 48) == test.keystream(0, 100)[:48]
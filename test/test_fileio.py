@@ -0,0 +1,113 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesOFB import OFBMode
+from blocks.aesCFB import CFBMode
+from blocks.aesGCM import GCMMode
+from blocks.fileio import encrypt_file, decrypt_file
+
+
+class fileTestCase(unittest.TestCase):
+    '''
+    This class is used to test blocks/fileio.py. Files are read in buffers
+    smaller than the file, the output must match the one shot encrypt and
+    decrypt of the mode. When the code is pushed to the 'develop' branch on
+    github, the test files are run with TravisCI. The project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use a static IV.
+    '''
+    IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+    key = b'\x00' * 16
+
+    def checkMode(self, test):
+        '''
+        Encrypts and decrypts in memory files of several lengths through
+        64 byte buffers and compares with the mode.
+        '''
+        for length in [1, 16, 64, 100, 128, 1000]:
+            testString = (b'File contents. ' * 70)[:length]
+            ciphertext = BytesIO()
+            encrypt_file(test, BytesIO(testString), ciphertext, 64, 3)
+            assert ciphertext.getvalue() == test.encrypt(testString)
+            plaintext = BytesIO()
+            decrypt_file(test, BytesIO(ciphertext.getvalue()), plaintext,
+                    64, 3)
+            assert plaintext.getvalue() == testString
+
+    def testECBFile(self):
+        '''
+        Testing blocks/fileio.py with blocks/aesECB.py
+        '''
+        self.checkMode(ECBMode(self.key))
+
+    def testCBCFile(self):
+        '''
+        Testing blocks/fileio.py with blocks/aesCBC.py
+        '''
+        self.checkMode(CBCMode(self.key, self.IV))
+
+    def testCTRFile(self):
+        '''
+        Testing blocks/fileio.py with blocks/aesCTR.py
+        '''
+        self.checkMode(CTRMode(self.key, self.IV))
+
+    def testOFBFile(self):
+        '''
+        Testing blocks/fileio.py with blocks/aesOFB.py
+        '''
+        self.checkMode(OFBMode(self.key, self.IV))
+
+    def testCFBFile(self):
+        '''
+        Testing blocks/fileio.py with blocks/aesCFB.py
+        '''
+        self.checkMode(CFBMode(self.key, self.IV))
+
+    def testGCMFile(self):
+        '''
+        Testing blocks/fileio.py with blocks/aesGCM.py, the file ends with
+        the tag and a changed file is refused.
+        '''
+        test = GCMMode(self.key, self.IV[:12])
+        self.checkMode(test)
+        ciphertext = BytesIO()
+        encrypt_file(test, BytesIO(b''), ciphertext, 64)
+        assert ciphertext.getvalue() == test.encrypt(b'')
+        changed = bytearray(test.encrypt(b'File contents. ' * 10))
+        changed[20] ^= 1
+        self.assertRaises(ValueError, decrypt_file, test,
+                BytesIO(bytes(changed)), BytesIO(), 64)
+        self.assertRaises(ValueError, decrypt_file, test,
+                BytesIO(b'short'), BytesIO(), 64)
+
+    def testFilePaths(self):
+        '''
+        Testing blocks/fileio.py with paths instead of file objects, and
+        the errors for an empty file and a bad buffer size.
+        '''
+        directory = tempfile.mkdtemp()
+        try:
+            plainPath = os.path.join(directory, 'plain')
+            cipherPath = os.path.join(directory, 'cipher')
+            outPath = os.path.join(directory, 'out')
+            with open(plainPath, 'wb') as plainFile:
+                plainFile.write(b'On disk. ' * 500)
+            test = CTRMode(self.key, self.IV)
+            encrypt_file(test, plainPath, cipherPath, 1024)
+            decrypt_file(test, cipherPath, outPath, 1024)
+            with open(outPath, 'rb') as outFile:
+                assert outFile.read() == b'On disk. ' * 500
+            self.assertRaises(ValueError, encrypt_file, test, BytesIO(),
+                    BytesIO())
+            self.assertRaises(ValueError, encrypt_file, test, plainPath,
+                    outPath, 100)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,226 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import unittest
+from binascii import unhexlify
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+from blocks import instrument
+from blocks.aesGCM import GCMMode
+from blocks.cache import contextCache
+from blocks.keystream import ctrKeystream
+
+
+class gcmTestCase(unittest.TestCase):
+    '''
+    This class is used to test the blocks/aesGCM.py class against the
+    examples of the GCM specification and python cryptography GCM. When the
+    code is pushed to the 'develop' branch on github, the test files are run
+    with TravisCI. The project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use a static IV.
+    '''
+    IV = b'\xca\xfe\xba\xbe\xfa\xce\xdb\xad\xde\xca\xf8\x88'
+    key = b'\x00' * 16
+    testString = (b'This is another example of a message that would be over'
+                  b' 16 bytes in length. Cool stuff.')
+
+    def reference(self, key, iv, plaintext, aad):
+        '''
+        Returns the ciphertext and tag of python cryptography GCM.
+        '''
+        encryptor = Cipher(algorithms.AES(key), modes.GCM(iv),
+                backend=default_backend()).encryptor()
+        encryptor.authenticate_additional_data(aad)
+        ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+        return ciphertext + encryptor.tag
+
+    def testSpecification(self):
+        '''
+        Testing test cases 2 and 4 of the GCM specification.
+        '''
+        test = GCMMode(self.key, b'\x00' * 12)
+        assert test.encrypt(b'\x00' * 16) == unhexlify(
+            b'0388dace60b6a392f328c2b971b2fe78'
+            b'ab6e47d42cec13bdf53a67b21257bddf')
+        key = unhexlify(b'feffe9928665731c6d6a8f9467308308')
+        plaintext = unhexlify(
+            b'd9313225f88406e5a55909c5aff5269a86a7a9531534f7da2e4c303d8a318a72'
+            b'1c3c0c95956809532fcf0e2449a6b525b16aedf5aa0de657ba637b39')
+        aad = unhexlify(b'feedfacedeadbeeffeedfacedeadbeefabaddad2')
+        test = GCMMode(key, self.IV)
+        assert test.encrypt(plaintext, aad) == unhexlify(
+            b'42831ec2217774244b7221b784d0d49ce3aa212f2c02a4e035c17e2329aca12e'
+            b'21d514b25466931c7d8f6a5aac84aa051ba30b396a0aac973d58e091'
+            b'5bc94fbc3221a5db94fae95ae7121a47')
+
+    def testAgainstCryptography(self):
+        '''
+        Testing random keys, IV lengths, messages and additional data
+        against python cryptography, and that decrypt reverses encrypt.
+        '''
+        for keySize in [16, 24, 32]:
+            for ivSize in [12, 8, 16, 60]:
+                for length in [0, 1, 16, 17, 100, 1000]:
+                    key = os.urandom(keySize)
+                    iv = os.urandom(ivSize)
+                    plaintext = os.urandom(length)
+                    aad = os.urandom(length // 3)
+                    test = GCMMode(key, iv)
+                    ciphertext = test.encrypt(plaintext, aad)
+                    assert ciphertext == self.reference(key, iv, plaintext,
+                                                        aad)
+                    assert test.decrypt(ciphertext, aad) == plaintext
+        test = GCMMode(self.key, self.IV, tagLength=12)
+        ciphertext = test.encrypt(self.testString)
+        assert ciphertext == self.reference(self.key, self.IV,
+                                            self.testString, b'')[:-4]
+        assert test.decrypt(bytearray(ciphertext)) == self.testString
+
+    def testTampering(self):
+        '''
+        Testing that a changed ciphertext, tag or additional data is refused.
+        '''
+        test = GCMMode(self.key, self.IV)
+        ciphertext = test.encrypt(self.testString, b'header')
+        for changed, aad in [
+                (b'\x01' + ciphertext[1:], b'header'),
+                (ciphertext[:-1] + b'\x00', b'header'),
+                (ciphertext, b'Header'),
+                (ciphertext[:-1], b'header')]:
+            self.assertRaises(ValueError, test.decrypt, changed, aad)
+        self.assertRaises(ValueError, test.decrypt, b'short')
+        self.assertRaises(ValueError, GCMMode, self.key, b'')
+        self.assertRaises(ValueError, GCMMode, self.key, self.IV, 10)
+
+    def testStream(self):
+        '''
+        Testing that the streams give the output of encrypt and decrypt for
+        the message and additional data fed in pieces.
+        '''
+        test = GCMMode(self.key, self.IV)
+        aad = b'header bytes that take more than one block'
+        expected = test.encrypt(self.testString, aad)
+        encryptor = test.encryptor()
+        encryptor.authenticate_additional_data(aad[:5])
+        encryptor.authenticate_additional_data(aad[5:])
+        output = b''
+        for start in range(0, len(self.testString), 7):
+            output += encryptor.update(self.testString[start:start + 7])
+        assert encryptor.finalize() == b''
+        assert output + encryptor.tag == expected
+        self.assertRaises(ValueError, encryptor.update, b'more')
+
+        decryptor = test.decryptor(encryptor.tag)
+        decryptor.authenticate_additional_data(aad)
+        plaintext = decryptor.update(output[:20])
+        self.assertRaises(ValueError,
+                decryptor.authenticate_additional_data, b'late')
+        plaintext += decryptor.update(output[20:])
+        assert decryptor.finalize() == b''
+        assert plaintext == self.testString
+
+        decryptor = test.decryptor(b'\x00' * 16)
+        decryptor.update(output)
+        self.assertRaises(ValueError, decryptor.finalize)
+        self.assertRaises(ValueError, test.decryptor, b'\x00' * 12)
+
+        # The joined streams match encrypt and decrypt, tag included
+        encryptor = test.encryptor(joined=True)
+        encryptor.authenticate_additional_data(aad)
+        output = encryptor.update(self.testString) + encryptor.finalize()
+        assert output == expected
+        decryptor = test.decryptor()
+        decryptor.authenticate_additional_data(aad)
+        plaintext = b''
+        for start in range(0, len(output), 5):
+            plaintext += decryptor.update(output[start:start + 5])
+        assert decryptor.finalize() == b''
+        assert plaintext == self.testString
+        decryptor = test.decryptor()
+        decryptor.update(output[:10])
+        self.assertRaises(ValueError, decryptor.finalize)
+
+    def testBatchAndInto(self):
+        '''
+        Testing the batch calls, which take one IV per message, and
+        encrypt_into and decrypt_into.
+        '''
+        test = GCMMode(self.key, self.IV)
+        ivs = [os.urandom(12) for i in range(0, 3)]
+        messages = [self.testString, b'', b'small string']
+        aads = [b'one', b'two', b'']
+        batch = test.encrypt_many(messages, ivs, aads)
+        for message, iv, aad, ciphertext in zip(messages, ivs, aads, batch):
+            assert ciphertext == GCMMode(self.key, iv).encrypt(message, aad)
+        assert list(test.decrypt_many(list(batch), ivs, aads)) == messages
+        self.assertRaises(ValueError, test.encrypt_many, messages, None)
+        self.assertRaises(ValueError, test.decrypt_many, list(batch), ivs)
+
+        ciphertext = test.encrypt(self.testString, b'aad')
+        output = bytearray(len(ciphertext))
+        assert test.encrypt_into(self.testString, output, b'aad') == \
+            len(ciphertext)
+        assert output == bytearray(ciphertext)
+        plaintext = bytearray(len(self.testString))
+        assert test.decrypt_into(ciphertext, plaintext, b'aad') == \
+            len(self.testString)
+        assert plaintext == bytearray(self.testString)
+
+    def testCachedTables(self):
+        '''
+        Testing that the GHASH tables are built once per key and dropped
+        with its contexts, and that GHASH is timed by the instrumentation.
+        '''
+        key = os.urandom(16)
+        test = GCMMode(key, self.IV)
+        test.hashTable()
+        hits, misses = contextCache.hits, contextCache.misses
+        tableHits = contextCache.tableHits
+        assert test.hashTable() is GCMMode(key, os.urandom(12)).hashTable()
+        assert contextCache.tableHits == tableHits + 2
+        assert (contextCache.hits, contextCache.misses) == (hits, misses)
+
+        # A table built before any context of the key is kept as well
+        other = os.urandom(16)
+        built = []
+        table = contextCache.getTable(other, 'test',
+                lambda: built.append(other) or object())
+        assert contextCache.getTable(other, 'test', object) is table
+        assert built == [other]
+
+        contextCache.invalidate(key)
+        table = test.hashTable()
+        assert table is test.hashTable()
+        with instrument.instrumented() as stats:
+            test.encrypt(self.testString)
+        assert 'ghash' in stats.snapshot()['stages']
+
+    def testLengthLimit(self):
+        '''
+        Testing that messages past maxLength are refused before the counter
+        can wrap, in the one shot calls and the streams.
+        '''
+        test = GCMMode(self.key, self.IV)
+        assert test.maxLength == ((1 << 32) - 2) * 16
+        test.maxLength = 32
+        assert len(test.encrypt(b'1' * 32)) == 48
+        self.assertRaises(ValueError, test.encrypt, b'1' * 33)
+        self.assertRaises(ValueError, test.decrypt, b'1' * 49)
+        encryptor = test.encryptor()
+        encryptor.update(b'1' * 20)
+        self.assertRaises(ValueError, encryptor.update, b'1' * 13)
+
+    def testCounterWidth(self):
+        '''
+        Testing that a 32 bit counter wraps without carrying into the bits
+        above it, as GCM counts.
+        '''
+        iv = b'\x11' * 12 + b'\xff\xff\xff\xfe'
+        generator = ctrKeystream(self.key, iv, counterBits=32)
+        assert generator.counterBlocks(0, 3) == (iv + b'\x11' * 12 +
+            b'\xff\xff\xff\xff' + b'\x11' * 12 + b'\x00\x00\x00\x00')
+        assert generator.counterBlocks(2, 1) == \
+            b'\x11' * 12 + b'\x00\x00\x00\x00'
+        self.assertRaises(ValueError, ctrKeystream, self.key, iv,
+                counterBits=0)
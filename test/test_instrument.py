@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+from blocks import instrument
+from blocks.aesECB import ECBMode
+from blocks.base import blockMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesOFB import OFBMode
+from blocks.aesCFB import CFBMode
+from blocks.aesXTS import XTSMode
+from blocks.cmac import CMAC
+from blocks.parallel import ParallelCBCMode, ParallelCTRMode
+from blocks.xor import xorData
+
+
+class instrumentTestCase(unittest.TestCase):
+    '''
+    This class is used to test the stage timing of blocks/instrument.py.
+    When the code is pushed to the 'develop' branch on github, the test files
+    are run with TravisCI. The project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use static IVs.
+    '''
+    key = b'\x00' * 16
+    IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+    testString = b'This is an example of a large string greater than 16 bytes'
+
+    def tearDown(self):
+        instrument.disable()
+
+    def testStages(self):
+        '''
+        Testing that every mode records its stages and counters, and that
+        the output does not change.
+        '''
+        modes = [ECBMode(self.key), CBCMode(self.key, self.IV),
+                 CTRMode(self.key, self.IV), OFBMode(self.key, self.IV),
+                 CFBMode(self.key, self.IV)]
+        expected = [test.encrypt(self.testString) for test in modes]
+        snapshots = []
+        stats = instrument.enable(snapshots.append)
+        assert instrument.enable() is stats
+        for test, ciphertext in zip(modes, expected):
+            assert test.encrypt(self.testString) == ciphertext
+            assert test.decrypt(ciphertext) == self.testString
+        snapshot = stats.snapshot()
+        for stage in ['encrypt', 'decrypt', 'preProcess', 'postProcess',
+                      'pad', 'unPad', 'kernel', 'keystream', 'contextSetup',
+                      'backend', 'xor']:
+            assert stage in snapshot['stages'], stage
+        assert snapshot['stages']['encrypt']['calls'] == len(modes)
+        assert snapshot['counters']['bytes'] == \
+            len(self.testString) * len(modes) + sum(map(len, expected))
+        assert snapshot['counters']['backendCalls'] > 0
+        assert len(snapshots) == 2 * len(modes)
+        assert snapshots[-1]['counters'] == snapshot['counters']
+        stats.reset()
+        assert stats.snapshot()['stages'] == {}
+
+    def testSubclassesAndEntryPoints(self):
+        '''
+        Testing that the parallel modes, the XTS sector calls and CMAC are
+        counted once per call.
+        '''
+        testString = self.testString * 100
+        parallel = ParallelCTRMode(self.key, self.IV, 2, 0, 256)
+        cbc = ParallelCBCMode(self.key, self.IV, 2, 0, 256)
+        ciphertext = cbc.encrypt(testString)
+        xts = XTSMode(self.key + b'\x01' * 16, 64)
+        with instrument.instrumented() as stats:
+            parallel.encrypt(testString)
+            cbc.decrypt(ciphertext)
+            xts.encrypt_sector(3, testString[:100])
+            xts.decrypt_sectors(0, testString[:128])
+            CMAC(self.key).mac_many([testString[:20], testString[:40]])
+        snapshot = stats.snapshot()
+        assert snapshot['stages']['encrypt']['calls'] == 2
+        assert snapshot['stages']['decrypt']['calls'] == 2
+        assert snapshot['stages']['mac']['calls'] == 1
+        assert snapshot['counters']['bytes'] == \
+            len(testString) + len(ciphertext) + 100 + 128 + 60
+        assert snapshot['counters']['blocks'] == \
+            (len(testString) // 16 + 1) + len(ciphertext) // 16 + 7 + 8 + 5
+
+    def testDisable(self):
+        '''
+        Testing that disable puts back the original methods.
+        '''
+        originals = [blockMode.__dict__['encrypt'],
+                     xorData.__dict__['getXor']]
+        with instrument.instrumented() as stats:
+            assert instrument.active() is stats
+            assert blockMode.__dict__['encrypt'] is not originals[0]
+        assert instrument.active() is None
+        assert [blockMode.__dict__['encrypt'],
+                xorData.__dict__['getXor']] == originals
+        assert instrument.disable() is None
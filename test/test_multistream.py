@@ -0,0 +1,44 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+from blocks.aesCBC import CBCMode
+from blocks.multistream import CBCMultiStream
+
+
+class multiStreamTestCase(unittest.TestCase):
+    '''
+    This class is used to test blocks/multistream.py. Every stream must match
+    CBCMode with the same IV. When the code is pushed to the 'develop' branch
+    on github, the test files are run with TravisCI. The project can be view
+    at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use static IVs.
+    '''
+    key = b'\x00' * 16
+    IVs = [b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f',
+           b'\x01' * 16, b'\x02' * 16, b'\x03' * 16, b'\x04' * 16]
+
+    def testStreams(self):
+        '''
+        Testing blocks/multistream.py with streams of different lengths,
+        given out of length order.
+        '''
+        messages = [b'small string', b'a' * 100, b'1' * 32, b'b' * 47,
+                    b'c' * 100]
+        test = CBCMultiStream(self.key, self.IVs)
+        ciphertexts = test.encrypt(messages)
+        for i in range(0, len(messages)):
+            expected = CBCMode(self.key, self.IVs[i]).encrypt(messages[i])
+            assert ciphertexts[i] == expected
+            assert CBCMode(self.key, self.IVs[i]).decrypt(
+                ciphertexts[i]) == messages[i]
+
+    def testStreamErrors(self):
+        '''
+        Testing the validation in blocks/multistream.py
+        '''
+        test = CBCMultiStream(self.key, self.IVs[:2])
+        self.assertRaises(ValueError, test.encrypt, [b'one'])
+        self.assertRaises(ValueError, test.encrypt, [b'one', b''])
+        self.assertRaises(Exception, CBCMultiStream, self.key, [b'\x00'])
+        assert len(CBCMultiStream(self.key, []).encrypt([])) == 0
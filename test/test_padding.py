@@ -0,0 +1,182 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import unittest
+from io import BytesIO
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesOFB import OFBMode
+from blocks.fileio import decrypt_file, encrypt_file
+from blocks.parallel import ParallelCBCMode
+from blocks.padding import getPadding
+
+
+class paddingTestCase(unittest.TestCase):
+    '''
+    This class is used to test the padding schemes of blocks/padding.py and
+    the padding option of the mode classes. When the code is pushed to the
+    'develop' branch on github, the test files are run with TravisCI. The
+    project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use static IVs.
+    '''
+    key = b'\x00' * 16
+    IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+    lengths = [1, 15, 16, 17, 33, 100]
+
+    def modes(self, padding):
+        return [ECBMode(self.key, padding),
+                CBCMode(self.key, self.IV, padding),
+                CTRMode(self.key, self.IV, padding),
+                OFBMode(self.key, self.IV, padding)]
+
+    def testSchemes(self):
+        '''
+        Testing the padding bytes of each scheme and that they are removed
+        again.
+        '''
+        expected = {
+            'pkcs7': b'abc' + b'\x0d' * 13,
+            'x923': b'abc' + b'\x00' * 12 + b'\x0d',
+            'iso7816': b'abc\x80' + b'\x00' * 12,
+            'zero': b'abc' + b'\x00' * 13,
+        }
+        for name in expected:
+            scheme = getPadding(name)
+            assert scheme.pad(b'abc') == expected[name]
+            assert scheme.unPad(expected[name]) == b'abc'
+            assert scheme.unPad(b'a' * 16) == b'a' * 16
+        assert getPadding('x923').unPad(b'abc' + b'\x01' * 12 + b'\x0d') == \
+            b'abc' + b'\x01' * 12 + b'\x0d'
+        assert getPadding('iso7816').unPad(b'abc' + b'\x00' * 13) == \
+            b'abc' + b'\x00' * 13
+        self.assertRaises(ValueError, getPadding, 'unknown')
+
+    def testRoundTrip(self):
+        '''
+        Testing every scheme with every mode on and off the block boundary.
+        '''
+        for name in ['pkcs7', 'x923', 'iso7816', 'zero', 'none']:
+            for test in self.modes(name):
+                for length in self.lengths:
+                    if (name == 'none' and length % 16 != 0 and
+                            isinstance(test, (ECBMode, CBCMode))):
+                        self.assertRaises(ValueError, test.encrypt,
+                                b'b' * length)
+                        continue
+                    ciphertext = test.encrypt(b'b' * length)
+                    assert test.decrypt(ciphertext) == b'b' * length
+                    decryptor = test.decryptor()
+                    plaintext = decryptor.update(ciphertext)
+                    assert plaintext + decryptor.finalize() == b'b' * length
+
+    def testNoPadding(self):
+        '''
+        Testing that CTR and OFB without padding match python cryptography,
+        the ciphertext is the length of the plaintext.
+        '''
+        for modeClass, backendMode in [(CTRMode, modes.CTR),
+                                       (OFBMode, modes.OFB)]:
+            test = modeClass(self.key, self.IV, 'none')
+            for length in self.lengths:
+                cipher = Cipher(algorithms.AES(self.key), backendMode(self.IV),
+                        backend=default_backend())
+                encryptor = cipher.encryptor()
+                expected = encryptor.update(b'c' * length)
+                assert test.encrypt(b'c' * length) == expected
+                assert test.decrypt(expected) == b'c' * length
+            batch = test.encrypt_many([b'short', b'c' * 17])
+            assert [len(ciphertext) for ciphertext in batch] == [5, 17]
+            assert list(test.decrypt_many(list(batch))) == [b'short',
+                                                           b'c' * 17]
+        self.assertRaises(ValueError, CTRMode, self.key, self.IV, 'cts')
+
+    def testStealingCBC(self):
+        '''
+        Testing CBC ciphertext stealing against zero padded CBC with the last
+        two blocks swapped and the last one cut down (CBC-CS2).
+        '''
+        test = CBCMode(self.key, self.IV, 'cts')
+        for length in self.lengths[2:]:
+            plaintext = b'd' * length
+            ciphertext = test.encrypt(plaintext)
+            assert len(ciphertext) == length
+            assert test.decrypt(ciphertext) == plaintext
+            if (length % 16 == 0):
+                assert ciphertext == CBCMode(self.key, self.IV).encrypt(
+                    plaintext)[:length]
+                continue
+            padded = CBCMode(self.key, self.IV, 'zero').encrypt(plaintext)
+            split = length - length % 16
+            assert ciphertext == (padded[:split - 16] + padded[split:] +
+                    padded[split - 16:length - 16])
+        self.assertRaises(ValueError, test.encrypt, b'short')
+        self.assertRaises(ValueError, test.encryptor().finalize)
+
+    def testStealingECB(self):
+        '''
+        Testing ECB ciphertext stealing, the short block is completed with
+        the end of the ciphertext of the block before it.
+        '''
+        test = ECBMode(self.key, 'cts')
+        plain = ECBMode(self.key, 'none')
+        for length in self.lengths[2:]:
+            plaintext = b'e' * (length - 1) + b'f'
+            ciphertext = test.encrypt(plaintext)
+            assert len(ciphertext) == length
+            assert test.decrypt(ciphertext) == plaintext
+            if (length % 16 == 0):
+                assert ciphertext == plain.encrypt(plaintext)
+                continue
+            split = length - length % 16
+            stolen = plain.encrypt(plaintext[split - 16:split])
+            last = plain.encrypt(plaintext[split:] + stolen[length - split:])
+            assert ciphertext[split - 16:split] == last
+            assert ciphertext[split:] == stolen[:length - split]
+
+    def testStealingCalls(self):
+        '''
+        Testing that the streams, the batch calls and the file calls give the
+        output of encrypt and decrypt with ciphertext stealing.
+        '''
+        for test in [ECBMode(self.key, 'cts'),
+                     CBCMode(self.key, self.IV, 'cts'),
+                     ParallelCBCMode(self.key, self.IV, 2, 0, 32, 'cts')]:
+            messages = [os.urandom(length) for length in
+                        [16, 17, 31, 32, 33, 47, 100]]
+            ciphertexts = [test.encrypt(message) for message in messages]
+            for message, ciphertext in zip(messages, ciphertexts):
+                for piece in [1, 5, 16, 17]:
+                    encryptor = test.encryptor()
+                    decryptor = test.decryptor()
+                    output = b''
+                    plaintext = b''
+                    for start in range(0, len(message), piece):
+                        output += encryptor.update(
+                            message[start:start + piece])
+                        plaintext += decryptor.update(
+                            ciphertext[start:start + piece])
+                    assert output + encryptor.finalize() == ciphertext
+                    assert plaintext + decryptor.finalize() == message
+                output = BytesIO()
+                encrypt_file(test, BytesIO(message), output, 16, 2)
+                assert output.getvalue() == ciphertext
+                plaintext = BytesIO()
+                decrypt_file(test, BytesIO(ciphertext), plaintext, 16, 2)
+                assert plaintext.getvalue() == message
+            ivs = None
+            if (test.usesIv):
+                ivs = [os.urandom(16) for message in messages]
+            batch = test.encrypt_many(messages, ivs)
+            for i in range(0, len(messages)):
+                if (ivs is not None):
+                    test.iv = ivs[i]
+                assert batch[i] == test.encrypt(messages[i])
+            assert list(test.decrypt_many(list(batch), ivs)) == messages
+            encryptor = test.encryptor()
+            encryptor.update(b'short')
+            self.assertRaises(ValueError, encryptor.finalize)
+            self.assertRaises(ValueError, test.encrypt_many, [b'short'])
@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.parallel import ParallelCBCMode, ParallelCTRMode
+
+
+class parallelTestCase(unittest.TestCase):
+    '''
+    This class is used to test the blocks/parallel.py classes. The parallel
+    modes must give the same output as the single threaded modes. When the
+    code is pushed to the 'develop' branch on github, the test files are run
+    with TravisCI. The project can be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use a static IV.
+    '''
+    def testParallelCTR(self):
+        '''
+        Testing blocks/parallel.py CTR mode against blocks/aesCTR.py with a
+        message split over several segments and a short tail block.
+        '''
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
+        testString = b'Segments of this message go to different workers. ' * 99
+        test = ParallelCTRMode(key, IV, workers=4, threshold=0,
+                segmentSize=256)
+        ciphertext = test.encrypt(testString)
+        assert ciphertext == CTRMode(key, IV).encrypt(testString)
+        assert test.decrypt(ciphertext) == testString
+
+    def testParallelCTRThreshold(self):
+        '''
+        Testing that blocks/parallel.py CTR mode stays on one thread below
+        the threshold and validates its settings.
+        '''
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
+        test = ParallelCTRMode(key, IV)
+        ciphertext = test.encrypt(b'small string')
+        assert ciphertext == b'F\x89\xe5n~J\x88\xdbS\xa3\x94Z\x1f\x90=\x8b'
+        assert test.decrypt(ciphertext) == b'small string'
+        self.assertRaises(ValueError, ParallelCTRMode, key, IV, 0)
+        self.assertRaises(ValueError, ParallelCTRMode, key, IV, 2, 0, 100)
+
+    def testParallelCBCDecrypt(self):
+        '''
+        Testing blocks/parallel.py CBC decryption against blocks/aesCBC.py
+        with a ciphertext split over several segments.
+        '''
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
+        testString = (b'Each segment needs the ciphertext block before it. '
+                      * 99)
+        ciphertext = CBCMode(key, IV).encrypt(testString)
+        test = ParallelCBCMode(key, IV, workers=4, threshold=0,
+                segmentSize=256)
+        assert test.encrypt(testString) == ciphertext
+        assert test.decrypt(ciphertext) == testString
+        self.assertRaises(ValueError, test.decrypt, ciphertext[:-1])
+
+    def testParallelStealing(self):
+        '''
+        Testing blocks/parallel.py with ciphertext stealing and no padding
+        above the threshold, set through the constructors.
+        '''
+        IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+        key = b'\x00' * 16
+        testString = b'1' * ((1 << 12) + 5)
+        test = ParallelCBCMode(key, IV, 4, 1 << 10, 256, 'cts')
+        ciphertext = CBCMode(key, IV, 'cts').encrypt(testString)
+        assert len(ciphertext) == len(testString)
+        assert test.encrypt(testString) == ciphertext
+        assert test.decrypt(ciphertext) == testString
+        aligned = CBCMode(key, IV, 'cts').encrypt(testString[:1 << 12])
+        assert test.decrypt(aligned) == testString[:1 << 12]
+
+        test = ParallelCTRMode(key, IV, 4, 1 << 10, 256, padding='none',
+                backend='native')
+        ciphertext = CTRMode(key, IV, 'none').encrypt(testString)
+        assert len(ciphertext) == len(testString)
+        assert test.encrypt(testString) == ciphertext
+        assert test.decrypt(ciphertext) == testString
@@ -2,8 +2,16 @@
 # -*- coding: utf-8 -*-
 import unittest
 from blocks.xor import xorData
-from blocks.padding import padData
-from blocks.chunk import chunkData
+from blocks.padding import padData, pkcs7Pad, pkcs7PadInto, pkcs7PadSize, \
+        pkcs7UnPad
+from blocks.chunk import chunkData, blockView
+from blocks.cache import cipherCache, contextCache
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCFB import CFBMode
+from blocks.aesOFB import OFBMode
+from blocks.aesCTR import CTRMode
+from blocks.base import blockMode
 
 
 class blockTestCase(unittest.TestCase):
@@ -19,36 +27,170 @@ class blockTestCase(unittest.TestCase):
         '''
         Testing blocks/xor.py
         '''
-        xorTest1 = xorData('tested', 'crypto')
-        assert xorTest1.getXor() == '\x17\x17\n\x04\x11\x0b' 
-        xorTest2 = xorData('tested', '\x17\x17\n\x04\x11\x0b')
-        assert xorTest2.getXor() == 'crypto'
+        xorTest1 = xorData(b'tested', b'crypto')
+        assert xorTest1.getXor() == b'\x17\x17\n\x04\x11\x0b' 
+        xorTest2 = xorData(b'tested', b'\x17\x17\n\x04\x11\x0b')
+        assert xorTest2.getXor() == b'crypto'
     
+    def testXorRepeatingKey(self):
+        '''
+        Testing blocks/xor.py with a second string shorter than the first,
+        which is repeated like a key.
+        '''
+        xorTest = xorData(b'\x00\x01\x02\x03\x04', b'\x0f')
+        assert xorTest.getXor() == b'\x0f\x0e\r\x0c\x0b'
+        xorTest = xorData(b'\x00\x00', b'\x01\x02\x03')
+        assert xorTest.getXor() == b'\x01\x02'
+
+    def testXorIntoBuffer(self):
+        '''
+        Testing the output buffer and in place variants of blocks/xor.py
+        '''
+        outBuffer = bytearray(8)
+        xorTest = xorData(b'tested', b'crypto')
+        assert xorTest.getXorInto(outBuffer, 2) == 6
+        assert outBuffer == bytearray(b'\x00\x00\x17\x17\n\x04\x11\x0b')
+        self.assertRaises(ValueError, xorTest.getXorInto, outBuffer, 3)
+        inPlace = bytearray(b'tested')
+        xorTest = xorData(inPlace, b'crypto')
+        assert xorTest.xorInPlace() is inPlace
+        assert inPlace == bytearray(b'\x17\x17\n\x04\x11\x0b')
+
     def testPad(self):
         '''
         Testing the pad function of strings <= 16 bytes in length.
         '''
-        padTest1 = padData('secret message')
-        assert padTest1.padString() == 'secret message\x02\x02'
+        padTest1 = padData(b'secret message')
+        assert padTest1.padString() == b'secret message\x02\x02'
         assert len(padTest1.padString()) == 16
 
     def testUnPad(self):
         '''
         Testing the unpad function of strings exactly 16 bytes in lenght.
         '''
-        unPadTest2 = padData('secret message\x02\x02')
-        assert unPadTest2.unPadString() == 'secret message'
+        unPadTest2 = padData(b'secret message\x02\x02')
+        assert unPadTest2.unPadString() == b'secret message'
+
+    def testPkcs7(self):
+        '''
+        Testing the whole buffer padding functions against python
+        cryptography PKCS7 for lengths on and off the block boundary.
+        '''
+        from cryptography.hazmat.primitives import padding
+        for length in [0, 1, 15, 16, 17, 100]:
+            data = b'a' * length
+            padder = padding.PKCS7(128).padder()
+            expected = padder.update(data) + padder.finalize()
+            assert pkcs7Pad(data) == expected
+            assert pkcs7UnPad(expected) == data
+            output = bytearray(len(expected) + 2)
+            assert pkcs7PadInto(data, output, 2) == len(output)
+            assert output[2:] == expected
+        self.assertRaises(ValueError, pkcs7PadInto, b'a' * 16, bytearray(16))
+
+    def testPkcs7Invalid(self):
+        '''
+        Testing that pkcs7PadSize rejects bad padding without raising, and
+        pkcs7UnPad raises.
+        '''
+        for block in [b'secret message\x00\x02', b'secret message\x02\x00',
+                      b'a' * 15 + b'\x11', b'a' * 14 + b'\x03\x03', b'a' * 15]:
+            assert pkcs7PadSize(block) == 0
+            self.assertRaises(ValueError, pkcs7UnPad, block)
+        assert pkcs7PadSize(b'\x10' * 16) == 16
+        assert pkcs7PadSize(b'a' * 16 + b'b' * 15 + b'\x01') == 1
     
     def testChunk(self):
         '''
         Testing the chunk function to see if it properly splits up large data
         sets
         '''
-        testString = 'This is an example of a large string greater than 16 bytes'
+        testString = (b'This is an example of a large string greater than 16'
+                      b' bytes')
         expectedResult = [
-                'This is an examp',
-                'le of a large st',
-                'ring greater tha',
-                'n 16 bytes']
+                b'This is an examp',
+                b'le of a large st',
+                b'ring greater tha',
+                b'n 16 bytes']
         testChunk1 = chunkData(testString)
         assert testChunk1.getChunk() == expectedResult
+
+    def testCipherCache(self):
+        '''
+        Testing the hit and miss counters and the least recently used
+        eviction of blocks/cache.py
+        '''
+        cache = cipherCache(maxSize=2)
+        first = cache.getEncryptor(b'\x00' * 16)
+        assert cache.getEncryptor(b'\x00' * 16) is first
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.getDecryptor(b'\x00' * 16)
+        cache.getEncryptor(b'\x01' * 16)
+        cache.getEncryptor(b'\x02' * 16)
+        assert len(cache) == 2
+        assert cache.getEncryptor(b'\x00' * 16) is not first
+        assert (cache.hits, cache.misses) == (1, 5)
+        self.assertRaises(ValueError, cipherCache, 0)
+
+    def testCipherCacheKeyChange(self):
+        '''
+        Testing that changing the key of a mode drops the cached contexts of
+        the old key.
+        '''
+        test = ECBMode(b'\x03' * 16)
+        ciphertext = test.encrypt(b'small string')
+        encryptor = contextCache.getEncryptor(b'\x03' * 16)
+        test.key = b'\x04' * 16
+        assert contextCache.getEncryptor(b'\x03' * 16) is not encryptor
+        assert test.decrypt(test.encrypt(b'small string')) == b'small string'
+        assert test.encrypt(b'small string') != ciphertext
+
+    def testBlockView(self):
+        '''
+        Testing that blocks/chunk.py blockView gives the same blocks as
+        chunkData without copying the input.
+        '''
+        testString = (b'This is an example of a large string greater than 16'
+                      b' bytes')
+        view = blockView(testString)
+        assert len(view) == 4
+        assert view == chunkData(testString).getChunk()
+        assert view[1].tobytes() == b'le of a large st'
+        assert view[-1].tobytes() == b'n 16 bytes'
+        self.assertRaises(IndexError, view.__getitem__, 4)
+        slabs = [slab.tobytes() for slab in view.slabs(3)]
+        assert slabs == [testString[:48], testString[48:]]
+
+        buffer = bytearray(b'1' * 32)
+        view = blockView(buffer, tail=b'2' * 16)
+        buffer[0:1] = b'3'
+        assert view[0].tobytes() == b'3' + b'1' * 15
+        assert view[-1].tobytes() == b'2' * 16
+        assert view.byteLength() == 48
+        assert view == [b'3' + b'1' * 15, b'1' * 16, b'2' * 16]
+        self.assertRaises(ValueError, blockView, b'1' * 20, b'2' * 16)
+
+    def testBlockMode(self):
+        '''
+        Testing that blocks/base.py runs the padding and validation around the
+        kernels of a mode, here ones that copy the blocks unchanged.
+        '''
+        class copyMode(blockMode):
+            usesIv = False
+
+            def __init__(self, key):
+                self.key = key
+                self.padding = 'pkcs7'
+
+            def encryptBlocks(self, blocks):
+                return [slab.tobytes() for slab in blocks.slabs(2)]
+            decryptBlocks = encryptBlocks
+
+        test = copyMode(b'\x00' * 16)
+        assert test.encrypt(b'small string') == b'small string' + b'\x04' * 4
+        assert test.decrypt(b'small string' + b'\x04' * 4) == b'small string'
+        assert test.decrypt(b'1' * 48) == b'1' * 48
+        self.assertRaises(ValueError, test.encrypt, b'')
+        self.assertRaises(ValueError, test.decrypt, b'1' * 20)
+        for mode in [ECBMode, CBCMode, CFBMode, OFBMode, CTRMode]:
+            assert issubclass(mode, blockMode)
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesOFB import OFBMode
+from blocks.aesCFB import CFBMode, CFB128Mode
+
+
+class streamTestCase(unittest.TestCase):
+    '''
+    This class is used to test the blocks/stream.py classes. A message fed to
+    a stream in uneven pieces must give the same output as the one shot
+    encrypt and decrypt of the mode. When the code is pushed to the 'develop'
+    branch on github, the test files are run with TravisCI. The project can
+    be view at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use a static IV.
+    '''
+    IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+    key = b'\x00' * 16
+
+    def feed(self, stream, data, pieces):
+        '''
+        Feeds data to the stream in pieces of the given sizes and returns the
+        joined output.
+        '''
+        outputList = []
+        start = 0
+        for size in pieces:
+            outputList.append(stream.update(data[start:start + size]))
+            start += size
+        outputList.append(stream.update(data[start:]))
+        outputList.append(stream.finalize())
+        return b''.join(outputList)
+
+    def checkMode(self, test):
+        '''
+        Checks the streams of a mode against its encrypt and decrypt for
+        short, block aligned and long messages.
+        '''
+        for testString in [b'small string', b'1' * 32,
+                b'This is another example of a message that would be over'
+                b' 16 bytes in length. Cool stuff.']:
+            ciphertext = test.encrypt(testString)
+            streamed = self.feed(test.encryptor(), testString, [3, 0, 20, 7])
+            assert streamed == ciphertext
+            streamed = self.feed(test.decryptor(), ciphertext, [16, 5, 11])
+            assert streamed == test.decrypt(ciphertext)
+
+    def testECBStream(self):
+        '''
+        Testing the streams of blocks/aesECB.py
+        '''
+        self.checkMode(ECBMode(self.key))
+
+    def testCBCStream(self):
+        '''
+        Testing the streams of blocks/aesCBC.py
+        '''
+        self.checkMode(CBCMode(self.key, self.IV))
+
+    def testCTRStream(self):
+        '''
+        Testing the streams of blocks/aesCTR.py
+        '''
+        self.checkMode(CTRMode(self.key, self.IV))
+
+    def testOFBStream(self):
+        '''
+        Testing the streams of blocks/aesOFB.py
+        '''
+        self.checkMode(OFBMode(self.key, self.IV))
+
+    def testCFBStream(self):
+        '''
+        Testing the streams of blocks/aesCFB.py
+        '''
+        self.checkMode(CFBMode(self.key, self.IV))
+        self.checkMode(CFB128Mode(self.key, self.IV))
+        self.checkMode(CFBMode(self.key, self.IV, 40))
+
+    def testFinalizedStream(self):
+        '''
+        Testing that a stream can not be used after finalize, and that empty
+        and short messages are rejected like the one shot calls.
+        '''
+        test = CBCMode(self.key, self.IV)
+        encryptor = test.encryptor()
+        self.assertRaises(ValueError, encryptor.finalize)
+        self.assertRaises(ValueError, encryptor.update, b'data')
+        decryptor = test.decryptor()
+        decryptor.update(b'\x00' * 20)
+        self.assertRaises(ValueError, decryptor.finalize)
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import unittest
+from binascii import unhexlify
+from blocks import aesTable
+from blocks.aesECB import ECBMode
+from blocks.aesCBC import CBCMode
+from blocks.aesCTR import CTRMode
+from blocks.aesOFB import OFBMode
+from blocks.aesCFB import CFBMode, CFB128Mode
+from blocks.cache import contextCache
+from blocks.parallel import ParallelCTRMode
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+
+@unittest.skipIf(not aesTable.available(), 'numpy is not installed')
+class tableTestCase(unittest.TestCase):
+    '''
+    This class is used to test the table driven AES core of
+    blocks/aesTable.py against the FIPS-197 examples and python
+    cryptography, and the modes built with backend='numpy' against the
+    default backend. When the code is pushed to the 'develop' branch on
+    github, the test files are run with TravisCI. The project can be view
+    at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    Note: Test cases use a static IV.
+    '''
+    IV = b'\xb0\xc8\xbc\xa6\xf2Z\x85~\xe5\x9f\xa3m\x17C\xc9\x7f'
+    key = b'\x00' * 16
+    testString = (b'This is another example of a message that would be over'
+                  b' 16 bytes in length. Cool stuff.')
+
+    def testFips197(self):
+        '''
+        Testing the example vectors of FIPS-197 appendix C for 16, 24 and
+        32 byte keys.
+        '''
+        plaintext = unhexlify(b'00112233445566778899aabbccddeeff')
+        for keyHex, ciphertextHex in [
+                (b'000102030405060708090a0b0c0d0e0f',
+                 b'69c4e0d86a7b0430d8cdb78070b4c55a'),
+                (b'000102030405060708090a0b0c0d0e0f1011121314151617',
+                 b'dda97ca4864cdfe06eaf70a0ec0d7191'),
+                (b'000102030405060708090a0b0c0d0e0f101112131415161718191a1b'
+                 b'1c1d1e1f', b'8ea2b7ca516745bfeafc49904b496089')]:
+            cipher = aesTable.tableCipher(unhexlify(keyHex))
+            ciphertext = cipher.encryptor().update(plaintext)
+            assert ciphertext == unhexlify(ciphertextHex)
+            assert cipher.decryptor().update(ciphertext) == plaintext
+
+    def testAgainstCryptography(self):
+        '''
+        Testing the table driven core against python cryptography ECB on
+        random keys and data, over several array batches.
+        '''
+        batchBlocks = aesTable.batchBlocks
+        aesTable.batchBlocks = 7
+        try:
+            for keySize in [16, 24, 32]:
+                key = os.urandom(keySize)
+                data = os.urandom(16 * 50)
+                cipher = Cipher(algorithms.AES(key), modes.ECB(),
+                        backend=default_backend())
+                expected = cipher.encryptor().update(data)
+                table = aesTable.tableCipher(key)
+                assert table.encryptor().update(data) == expected
+                assert table.decryptor().update(expected) == data
+                output = bytearray(len(data))
+                assert table.encryptor().update_into(
+                        memoryview(data), output) == len(data)
+                assert bytes(output) == expected
+        finally:
+            aesTable.batchBlocks = batchBlocks
+        table = aesTable.tableCipher(self.key)
+        self.assertRaises(ValueError, table.encryptor().update, b'1' * 20)
+        self.assertRaises(ValueError, aesTable.tableCipher, b'1' * 15)
+
+    def testModes(self):
+        '''
+        Testing that the modes give the same output with the numpy backend.
+        '''
+        for build in [lambda backend: ECBMode(self.key, backend=backend),
+                lambda backend: CBCMode(self.key, self.IV, backend=backend),
+                lambda backend: CTRMode(self.key, self.IV, backend=backend),
+                lambda backend: OFBMode(self.key, self.IV, backend=backend),
+                lambda backend: CFBMode(self.key, self.IV, backend=backend),
+                lambda backend: CFB128Mode(self.key, self.IV, backend)]:
+            test = build('cryptography')
+            other = build('numpy')
+            assert other.backend == 'numpy'
+            ciphertext = test.encrypt(self.testString)
+            assert other.encrypt(self.testString) == ciphertext
+            assert other.decrypt(ciphertext) == self.testString
+            encryptor = other.encryptor()
+            output = encryptor.update(self.testString[:20])
+            output += encryptor.update(self.testString[20:])
+            assert output + encryptor.finalize() == ciphertext
+            batch = test.encrypt_many([self.testString, b'small string'])
+            assert list(other.encrypt_many([self.testString,
+                    b'small string'])) == list(batch)
+            assert list(other.decrypt_many(list(batch))) == \
+                [self.testString, b'small string']
+
+        test = ParallelCTRMode(self.key, self.IV, workers=2, threshold=0,
+                segmentSize=32)
+        ciphertext = test.encrypt(self.testString)
+        test.backend = 'numpy'
+        assert test.encrypt(self.testString) == ciphertext
+        assert contextCache.getEncryptor(self.key, 'numpy') is not \
+            contextCache.getEncryptor(self.key)
+
+    def testUnknownBackend(self):
+        '''
+        Testing that an unknown backend name is refused.
+        '''
+        self.assertRaises(ValueError, ECBMode, self.key, 'pkcs7', 'openssl')
+        self.assertRaises(ValueError, contextCache.getEncryptor, self.key,
+                'openssl')
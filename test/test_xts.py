@@ -0,0 +1,163 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import io
+import os
+import struct
+import unittest
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+from blocks import aesXTS
+from blocks.aesXTS import XTSMode
+
+
+class recordingImage(io.BytesIO):
+    '''
+    An in memory image that records the byte ranges read and written.
+    '''
+    def __init__(self, data):
+        io.BytesIO.__init__(self, data)
+        self.reads = []
+        self.writes = []
+
+    def read(self, size=-1):
+        start = self.tell()
+        data = io.BytesIO.read(self, size)
+        self.reads.append((start, start + len(data)))
+        return data
+
+    def write(self, data):
+        start = self.tell()
+        self.writes.append((start, start + len(data)))
+        return io.BytesIO.write(self, data)
+
+
+class xtsTestCase(unittest.TestCase):
+    '''
+    This class is used to test the blocks/aesXTS.py class against python
+    cryptography XTS. When the code is pushed to the 'develop' branch on
+    github, the test files are run with TravisCI. The project can be view
+    at:
+    https://travis-ci.org/dennisme/AESBlockCiphers
+    '''
+    key = bytes(bytearray(range(0, 32)))
+    sectorSize = 64
+
+    def reference(self, key, sector, data, decrypting=False):
+        '''
+        Returns the output of python cryptography XTS for one sector, the
+        tweak being the little endian sector number.
+        '''
+        tweak = struct.pack('<QQ', sector & 0xffffffffffffffff, sector >> 64)
+        cipher = Cipher(algorithms.AES(key), modes.XTS(tweak),
+                backend=default_backend())
+        context = cipher.decryptor() if decrypting else cipher.encryptor()
+        return context.update(data) + context.finalize()
+
+    def testSectors(self):
+        '''
+        Testing single sectors of every length class, including ciphertext
+        stealing, for both key sizes against python cryptography.
+        '''
+        for keySize in [32, 64]:
+            key = os.urandom(keySize)
+            test = XTSMode(key, self.sectorSize)
+            for length in [16, 17, 31, 32, 33, 48, 63, 64]:
+                for sector in [0, 1, 255, 1 << 70]:
+                    plaintext = os.urandom(length)
+                    ciphertext = test.encrypt_sector(sector, plaintext)
+                    assert ciphertext == self.reference(key, sector,
+                                                        plaintext)
+                    assert test.decrypt_sector(sector,
+                        bytearray(ciphertext)) == plaintext
+        test = XTSMode(self.key)
+        self.assertRaises(ValueError, test.encrypt_sector, 0, b'1' * 15)
+        self.assertRaises(ValueError, test.encrypt_sector, -1, b'1' * 16)
+        self.assertRaises(ValueError, XTSMode, b'\x00' * 32)
+        self.assertRaises(Exception, XTSMode, b'1' * 16)
+        self.assertRaises(ValueError, XTSMode, self.key, 100)
+
+    def testSectorRanges(self):
+        '''
+        Testing runs of consecutive sectors, with and without a short last
+        sector, on one thread and split over workers.
+        '''
+        plaintext = os.urandom(self.sectorSize * 21 + 20)
+        expected = b''.join([self.reference(self.key, 9 + i,
+            plaintext[self.sectorSize * i:self.sectorSize * (i + 1)])
+            for i in range(0, 22)])
+        for workers, threshold in [(1, 1 << 20), (3, 0)]:
+            test = XTSMode(self.key, self.sectorSize, workers, threshold,
+                           segmentSize=3 * self.sectorSize + 10)
+            assert test.segmentSize == 3 * self.sectorSize
+            ciphertext = test.encrypt_sectors(9, plaintext)
+            assert ciphertext == expected
+            assert test.decrypt_sectors(9, ciphertext) == plaintext
+            whole = self.sectorSize * 21
+            assert test.encrypt(plaintext[:whole], 9) == expected[:whole]
+            assert test.decrypt(expected[:whole], 9) == plaintext[:whole]
+        self.assertRaises(ValueError, test.encrypt_sectors, 0,
+                b'1' * (self.sectorSize + 8))
+        self.assertRaises(ValueError, test.encrypt_sectors, 0, b'')
+
+        batch = test.encrypt_many([plaintext[:64], plaintext[64:100]],
+                                  [5, 1000])
+        assert batch[0] == self.reference(self.key, 5, plaintext[:64])
+        assert batch[1] == self.reference(self.key, 1000, plaintext[64:100])
+        assert list(test.decrypt_many(list(batch), [5, 1000])) == \
+            [plaintext[:64], plaintext[64:100]]
+        output = bytearray(64)
+        assert test.encrypt_into(plaintext[:64], output, 5) == 64
+        assert output == bytearray(batch[0])
+
+    def testImage(self):
+        '''
+        Testing that reading and writing sectors of an image only touches
+        the bytes of those sectors.
+        '''
+        test = XTSMode(self.key, self.sectorSize)
+        plaintext = os.urandom(self.sectorSize * 8)
+        image = recordingImage(test.encrypt_sectors(0, plaintext))
+        before = image.getvalue()
+        assert test.read_sectors(image, 3, 2) == \
+            plaintext[3 * self.sectorSize:5 * self.sectorSize]
+        assert image.reads == [(3 * self.sectorSize, 5 * self.sectorSize)]
+
+        update = os.urandom(self.sectorSize)
+        assert test.write_sectors(image, 6, update) == self.sectorSize
+        assert image.writes == [(6 * self.sectorSize, 7 * self.sectorSize)]
+        after = image.getvalue()
+        assert after[:6 * self.sectorSize] == before[:6 * self.sectorSize]
+        assert after[7 * self.sectorSize:] == before[7 * self.sectorSize:]
+        assert test.read_sectors(image, 5, 3) == (
+            plaintext[5 * self.sectorSize:6 * self.sectorSize] + update +
+            plaintext[7 * self.sectorSize:])
+        self.assertRaises(ValueError, test.write_sectors, image, 0, b'1' * 16)
+        self.assertRaises(ValueError, test.read_sectors, image, 8)
+        self.assertRaises(TypeError, test.encryptor)
+        self.assertRaises(TypeError, test.decryptor)
+
+    def testTweakPaths(self):
+        '''
+        Testing that the numpy and python tweaks give the output of python
+        cryptography, on sectors of more blocks than one numpy step and on
+        calls too small for numpy.
+        '''
+        plaintext = os.urandom(4096 * 3)
+        expected = b''.join([self.reference(self.key, (1 << 64) - 2 + i,
+            plaintext[4096 * i:4096 * (i + 1)]) for i in range(0, 3)])
+        test = XTSMode(self.key, 4096)
+        paths = [aesXTS.numpy, None] if aesXTS.numpy else [None]
+        try:
+            for path in paths:
+                aesXTS.numpy = path
+                assert test.encrypt_sectors((1 << 64) - 2, plaintext) == \
+                    expected
+                assert test.encrypt_sector(7, plaintext[:48]) == \
+                    self.reference(self.key, 7, plaintext[:48])
+        finally:
+            aesXTS.numpy = paths[0]
+        if (aesXTS.numpy):
+            firstTweaks = os.urandom(16 * 5)
+            for blocks in [1, 55, 56, 57, 200]:
+                assert aesXTS.numpyTweaks(firstTweaks, blocks) == \
+                    aesXTS.pythonTweaks(firstTweaks, blocks)